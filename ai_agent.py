@@ -1,15 +1,24 @@
 import paho.mqtt.client as mqtt
 import json
+import threading
+import time
+import uuid
+
+from cancellation import CancelRegistry
+from intent_router import IntentRouter, SensorSnapshot
+from payload_codec import WireCodec, decode
+from worker_pool import KeyedWorkerPool
 
 # --- IMPORT YOUR REAL AI SCRIPT ---
 try:
-    # We ONLY need the chat function and cleanup
-    from ai_agent_test_code import get_chat_response, cleanup
+    # We ONLY need the chat functions and cleanup
+    from ai_agent_test_code import (get_chat_response, stream_chat_response, cleanup, warm_up,
+                                    remember_exchange)
     print("Successfully imported REAL AI chat module.")
 except ImportError:
     print("WARNING: 'get_chat_response' or 'cleanup' not found. Using placeholder.")
     # Create a basic placeholder
-    def get_chat_response(text):
+    def get_chat_response(text, session_id=None):
         text = text.lower()
         if "hello" in text:
             return "Hello there! How can I help?"
@@ -17,48 +26,219 @@ except ImportError:
             return "I am feeling great, thanks for asking."
         else:
             return "I'm not sure how to answer that yet."
+    def stream_chat_response(text, session_id=None):
+        yield get_chat_response(text)
     def cleanup(): 
         pass
+    def warm_up():
+        return {}
+    def remember_exchange(text, reply, session_id=None):
+        pass
 
 # --- MQTT Settings ---
 BROKER_ADDRESS = "localhost"
 CLIENT_ID = "plant_ai_agent"
 TOPIC_UI_UPDATE = "plant/ui/update"
-TOPIC_CHAT_REQUEST = "plant/chat/request" # <-- This is the only topic we listen to
+TOPIC_CHAT_REQUEST = "plant/chat/request"
+TOPIC_CHAT_CANCEL = "plant/chat/cancel"   # {"client_id": ...} when the chat is closed
+TOPIC_SENSOR_DATA = "plant/sensor/data"          # latest readings, for the
+TOPIC_POT_SENSOR_DATA = "plant/+/sensor/data"    # fast-path answers
+TOPIC_AI_METRICS = "plant/ai/metrics"     # cold-load vs warm latency, retained
+# UI updates go out in the most compact format the other clients accept
+CODEC = WireCodec(CLIENT_ID)
+
+# Send the reply to the UI piece by piece as the model generates it, so the
+# user sees the first words right away instead of waiting for the whole reply
+STREAM_RESPONSES = True
+
+# Generations run on this many worker threads, off the MQTT network thread.
+# Requests from one client are answered in order; different clients don't
+# wait for each other.
+CHAT_WORKERS = 2
+MAX_PENDING_PER_CLIENT = 5
+ANONYMOUS_CLIENT = "anonymous"
+
+# "Are you thirsty?" and friends are answered from the latest reading
+# instead of the model (see intent_router.py)
+SENSORS = SensorSnapshot()
+ROUTER = IntentRouter(SENSORS)
+
+# A newer message from the same client, or the UI closing the chat, stops
+# the generation in progress so the model works on what the user wants now
+CANCELS = CancelRegistry()
+
+def plant_id_from_topic(topic):
+    """plant/sensor/data -> 'default', plant/<pot_id>/sensor/data -> pot_id."""
+    parts = topic.split("/")
+    return parts[1] if len(parts) == 4 else "default"
+
+def parse_chat_request(payload):
+    """
+    Turns a plant/chat/request payload into the request envelope:
+        {"request_id": ..., "client_id": ..., "text": ...}
+    Older UIs publish the bare message text; those get a fresh request id.
+    """
+    text = payload.decode()
+    try:
+        request = json.loads(text)
+    except ValueError:
+        request = None
+    if not isinstance(request, dict) or "text" not in request:
+        request = {"text": text}
+    return {
+        "request_id": str(request.get("request_id") or uuid.uuid4().hex),
+        "client_id": str(request.get("client_id") or ANONYMOUS_CLIENT),
+        "text": str(request["text"]),
+    }
+
+def reply_envelope(request, **fields):
+    """Every reply carries the ids of the request it answers."""
+    return dict(fields, request_id=request["request_id"], client_id=request["client_id"])
+
+def publish_streamed_reply(client, request, pieces=None, stop=None):
+    """
+    Publishes the reply as a series of chunks on the UI topic:
+        {"message_id": ..., "seq": 0, "delta": "Hel"}
+        {"message_id": ..., "seq": 1, "delta": "lo!"}
+        ...
+        {"message_id": ..., "seq": N, "done": true, "speech": "Hello!"}
+    The message id is the request id, and every chunk carries the request
+    and client ids too. The final message carries the whole reply, so the UI
+    can fix up any chunk it missed. `pieces` defaults to the model's
+    stream for the request. Returns the full reply text.
+
+    If `stop` (a threading.Event) gets set, the model is stopped at the
+    next piece and the final message has "cancelled": true and the reply
+    so far. Returns None in that case.
+    """
+    if pieces is None:
+        pieces = stream_chat_response(request["text"], request["client_id"])
+    message_id = request["request_id"]
+    seq = 0
+    sent = []
+    for piece in pieces:
+        if stop is not None and stop.is_set():
+            # Closing the generator closes the HTTP stream, which makes
+            # Ollama stop generating
+            if hasattr(pieces, "close"):
+                pieces.close()
+            final = reply_envelope(request, message_id=message_id, seq=seq, done=True,
+                                   cancelled=True, speech="".join(sent))
+            client.publish(TOPIC_UI_UPDATE, CODEC.encode_update(final))
+            print(f"AI Chat Response cancelled after {seq} chunks.")
+            return None
+        sent.append(piece)
+        chunk = reply_envelope(request, message_id=message_id, seq=seq, delta=piece)
+        client.publish(TOPIC_UI_UPDATE, CODEC.encode_update(chunk))
+        seq += 1
+    response_text = "".join(sent)
+    final = reply_envelope(request, message_id=message_id, seq=seq, done=True, speech=response_text)
+    client.publish(TOPIC_UI_UPDATE, CODEC.encode_update(final))
+    print(f"AI Chat Response (streamed in {seq} chunks): '{response_text}'")
+    return response_text
+
+def handle_chat(client_id, item):
+    """Runs on a worker thread: generate the reply to one chat request."""
+    client, request = item
+    stop = CANCELS.start(client_id, request["seq"])
+    try:
+        if stop is None:
+            print(f"Skipping chat {request['request_id']} from {client_id}, a newer one replaced it.")
+            skipped = reply_envelope(request, message_id=request["request_id"], seq=0,
+                                     done=True, cancelled=True, speech="")
+            client.publish(TOPIC_UI_UPDATE, CODEC.encode_update(skipped))
+            return
+        answer_chat(client, request, stop)
+    finally:
+        # Also for skipped requests, so the session is forgotten once the
+        # last one is done
+        CANCELS.finish(client_id, request["seq"])
 
-def connect_mqtt():
+def answer_chat(client, request, stop):
+    """Replies to one request. Only streamed replies can be stopped part way."""
+    print(f"Processing chat {request['request_id']} from {request['client_id']}: '{request['text']}'")
+
+    # 1. Sensor questions are answered straight from the latest reading
+    answer = ROUTER.route(request["text"])
+    if answer is not None:
+        print(f"Answered from sensor data: '{answer}'")
+        remember_exchange(request["text"], answer, request["client_id"])
+        if STREAM_RESPONSES:
+            publish_streamed_reply(client, request, [answer])
+        else:
+            client.publish(TOPIC_UI_UPDATE, CODEC.encode_update(reply_envelope(request, speech=answer)))
+        return
+
+    # 2. Everything else goes to the CHAT "brain"
+    start = time.perf_counter()
+    if STREAM_RESPONSES:
+        if publish_streamed_reply(client, request, stop=stop) is not None:
+            ROUTER.record_llm(time.perf_counter() - start)
+        return
+    response_text = get_chat_response(request["text"], request["client_id"])
+    ROUTER.record_llm(time.perf_counter() - start)
+    print(f"AI Chat Response: '{response_text}'")
+    
+    # 3. Prepare a SPEECH-ONLY payload
+    ui_payload = reply_envelope(request, speech=response_text)
+    # Note: We are not sending mood, moisture, or light
+    
+    # 4. Publish the chat response
+    client.publish(TOPIC_UI_UPDATE, CODEC.encode_update(ui_payload))
+    print(f"Published SPEECH-ONLY update to {TOPIC_UI_UPDATE}")
+
+def connect_mqtt(pool):
     """Connects to the MQTT broker."""
     def on_connect(client, userdata, flags, rc, properties=None):
         if rc == 0:
             print("AI Chat Agent connected to MQTT Broker.")
-            # Subscribe ONLY to the chat topic
-            client.subscribe(TOPIC_CHAT_REQUEST) 
-            print(f"Subscribed to {TOPIC_CHAT_REQUEST}")
+            # Chat requests, plus the sensor data the fast path answers from
+            client.subscribe([(TOPIC_CHAT_REQUEST, 0), (TOPIC_CHAT_CANCEL, 0),
+                              (TOPIC_SENSOR_DATA, 0), (TOPIC_POT_SENSOR_DATA, 0)])
+            print(f"Subscribed to {TOPIC_CHAT_REQUEST}, {TOPIC_CHAT_CANCEL} and the sensor data topics")
+            CODEC.announce(client)
         else:
             print(f"Failed to connect, return code {rc}")
 
     def on_message(client, userdata, msg):
-        """Called ONLY when a chat message is published."""
-        
+        """Called when a chat message or a sensor reading is published."""
+        if CODEC.handle(msg):
+            return
+
+        if msg.topic == TOPIC_CHAT_CANCEL:
+            try:
+                client_id = str(json.loads(msg.payload).get("client_id") or ANONYMOUS_CLIENT)
+            except (ValueError, AttributeError):
+                print(f"Error: Received bad cancel message: {msg.payload}")
+                return
+            if CANCELS.cancel(client_id):
+                print(f"Cancelled the chat in progress for {client_id}")
+            return
+
+        if msg.topic != TOPIC_CHAT_REQUEST:
+            # Just remember the reading, no logging: this arrives every second
+            try:
+                SENSORS.update(plant_id_from_topic(msg.topic), decode(msg.payload))
+            except ValueError as e:
+                print(f"Error: Received unreadable sensor message ({e}): {msg.payload}")
+            return
+
         print(f"Received CHAT data on {msg.topic}")
         try:
-            # 1. Get the chat message
-            chat_message = msg.payload.decode()
-            print(f"Processing chat: '{chat_message}'")
-            
-            # 2. Run the CHAT "brain"
-            response_text = get_chat_response(chat_message)
-            print(f"AI Chat Response: '{response_text}'")
-            
-            # 3. Prepare a SPEECH-ONLY payload
-            ui_payload = {
-                "speech": response_text
-                # Note: We are not sending mood, moisture, or light
-            }
-            
-            # 4. Publish the chat response
-            client.publish(TOPIC_UI_UPDATE, json.dumps(ui_payload))
-            print(f"Published SPEECH-ONLY update to {TOPIC_UI_UPDATE}")
+            # Get the chat request and hand it to the workers, so this
+            # (network) thread never waits on the model
+            request = parse_chat_request(msg.payload)
+            request["seq"] = CANCELS.submit(request["client_id"])
+            if pool.submit(request["client_id"], (client, request)):
+                # Only a queued request replaces the one being answered
+                CANCELS.supersede(request["client_id"], request["seq"])
+            else:
+                CANCELS.withdraw(request["client_id"], request["seq"])
+                print(f"Too many pending chats from {request['client_id']}, rejecting.")
+                busy = reply_envelope(request, speech="I'm still thinking about your other questions!")
+                client.publish(TOPIC_UI_UPDATE, CODEC.encode_update(busy))
+            pool.maybe_report()
+            ROUTER.maybe_report()
             
         except Exception as e:
             print(f"Error processing chat message: {e}")
@@ -66,17 +246,35 @@ def connect_mqtt():
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID)
     client.on_connect = on_connect
     client.on_message = on_message
+    CODEC.attach(client)
     client.connect(BROKER_ADDRESS)
     return client
 
+def warm_up_and_report(client):
+    """Runs on its own thread, so MQTT keeps working during the model load."""
+    warmup = warm_up()
+    client.publish(TOPIC_AI_METRICS, json.dumps(warmup), retain=True)
+
 def main():
-    client = connect_mqtt()
+    pool = KeyedWorkerPool(handle_chat, workers=CHAT_WORKERS, latest_only=False,
+                           max_pending=MAX_PENDING_PER_CLIENT, name="Chat workers")
+    client = connect_mqtt(pool)
+
+    # Load the model now so the first chat doesn't pay for it. Chats that
+    # come in meanwhile are queued as usual and wait on the same load.
+    threading.Thread(target=warm_up_and_report, args=(client,), name="warm-up", daemon=True).start()
+
     print("Starting AI Chat Agent loop (listening for chat)...")
     try:
         client.loop_forever()
     except KeyboardInterrupt:
         print("Shutting down AI Agent.")
+        pool.shutdown(wait=False)
+        print(f"(Chat workers): {pool.format_metrics()}")
+        print(f"(Intent router): {ROUTER.format_metrics()}")
+        print(f"(Cancellations): {CANCELS.format_metrics()}")
         cleanup() # Call your AI cleanup
+        CODEC.withdraw(client)
         client.disconnect()
 
 if __name__ == "__main__":
@@ -1,63 +1,254 @@
 # This is your new file: ai_agent_test_code.py
 
+import os
+import threading
+import time
+
 import ollama
 
+from conversation import ConversationStore, DEFAULT_SESSION, extractive_summary
+from mood_rules import MOOD_ENGINE
+from response_cache import ResponseCache
+
+# Make sure you have pulled this model! (ollama pull gemma:2b)
+MODEL_NAME = 'gemma:2b'
+ERROR_REPLY = "I'm having trouble connecting to my AI brain (Ollama)."
+
+# Replies to prompts we've already answered ("hello", "how are you"...)
+# come from here instead of the model. The disk tier keeps them across
+# restarts; set PLANT_RESPONSE_CACHE="" to keep the cache in memory only.
+RESPONSE_CACHE_PATH = os.environ.get(
+    "PLANT_RESPONSE_CACHE", os.path.expanduser("~/.cache/plantai/responses.sqlite3"))
+RESPONSE_CACHE = ResponseCache(disk_path=RESPONSE_CACHE_PATH or None)
+
+# --- MODEL WARM-UP SETTINGS ---
+# OLLAMA_HOST points at the Ollama server (or the stand-in in benchmarks/).
+OLLAMA = ollama.Client(host=os.environ.get("OLLAMA_HOST"))
+# How long Ollama keeps the model loaded after each request ("30m", "-1" = forever).
+KEEP_ALIVE = os.environ.get("PLANT_KEEP_ALIVE", "30m")
+# Seconds between warm pings that keep the model resident (0 = off).
+WARM_PING_INTERVAL = float(os.environ.get("PLANT_WARM_PING", "0"))
+# --- END MODEL WARM-UP SETTINGS ---
+
+# Cold-load vs warm latency, filled in by warm_up() and every chat
+WARMUP_METRICS = {
+    "cold_load_ms": None,     # wall time of the preload request
+    "server_load_ms": None,   # load_duration Ollama reported for it
+    "warm_latency_ms": None,  # wall time of a 1-token request once loaded
+    "warm_pings": 0,
+    "ping_errors": 0,
+    "chats": 0,
+    "cold_chats": 0,          # chats that had to (re)load the model
+    "chat_load_ms": 0.0,
+}
+_metrics_lock = threading.Lock()
+_ping_stop = threading.Event()
+_ping_thread = None
+
+def _record_chat(response):
+    """Counts a chat as cold if Ollama had to load the model for it."""
+    load_ms = (response.get('load_duration') or 0) / 1e6
+    with _metrics_lock:
+        WARMUP_METRICS["chats"] += 1
+        # Ollama reports a few ms of load_duration even when resident
+        if load_ms > 100:
+            WARMUP_METRICS["cold_chats"] += 1
+            WARMUP_METRICS["chat_load_ms"] += round(load_ms, 1)
+    if load_ms > 100:
+        print(f"(Gemma-2B): Cold start, model load took {load_ms:.0f} ms")
+
+def _warm_ping_loop(interval):
+    while not _ping_stop.wait(interval):
+        try:
+            # An empty prompt only loads the model / refreshes its keep-alive
+            OLLAMA.generate(model=MODEL_NAME, prompt="", keep_alive=KEEP_ALIVE)
+            with _metrics_lock:
+                WARMUP_METRICS["warm_pings"] += 1
+        except Exception as e:
+            with _metrics_lock:
+                WARMUP_METRICS["ping_errors"] += 1
+            print(f"(Gemma-2B): Warm ping failed: {e}")
+
+def warm_up(ping_interval=None):
+    """
+    Loads the model before the first chat and keeps it resident for
+    KEEP_ALIVE. Measures the cold load and the warm latency afterwards,
+    and starts the warm ping thread if an interval is set.
+    Returns a copy of WARMUP_METRICS.
+    """
+    global _ping_thread
+    ping_interval = WARM_PING_INTERVAL if ping_interval is None else ping_interval
+    print(f"(Gemma-2B): Warming up '{MODEL_NAME}' (keep_alive={KEEP_ALIVE})...")
+    try:
+        start = time.perf_counter()
+        response = OLLAMA.generate(model=MODEL_NAME, prompt="", keep_alive=KEEP_ALIVE)
+        cold_ms = (time.perf_counter() - start) * 1000
+
+        # Also gets the system prompt processed, so chats start from it.
+        # Built by hand so no "warm-up" session is left in the store.
+        start = time.perf_counter()
+        OLLAMA.chat(model=MODEL_NAME, keep_alive=KEEP_ALIVE, options={"num_predict": 1},
+                    messages=[{"role": "system", "content": CONVERSATIONS.system_prompt},
+                              {"role": "user", "content": "hi"}])
+        warm_ms = (time.perf_counter() - start) * 1000
+
+        with _metrics_lock:
+            WARMUP_METRICS["cold_load_ms"] = round(cold_ms, 1)
+            WARMUP_METRICS["server_load_ms"] = round((response.get('load_duration') or 0) / 1e6, 1)
+            WARMUP_METRICS["warm_latency_ms"] = round(warm_ms, 1)
+        print(f"(Gemma-2B): Model ready. Cold load {cold_ms:.0f} ms, warm latency {warm_ms:.0f} ms")
+    except Exception as e:
+        print(f"(Gemma-2B): Warm-up failed, the first chat will load the model: {e}")
+
+    if ping_interval > 0 and _ping_thread is None:
+        _ping_stop.clear()
+        _ping_thread = threading.Thread(target=_warm_ping_loop, args=(ping_interval,),
+                                        name="warm-ping", daemon=True)
+        _ping_thread.start()
+        print(f"(Gemma-2B): Warm ping every {ping_interval:g} s")
+    return get_warmup_metrics()
+
+def get_warmup_metrics():
+    with _metrics_lock:
+        return dict(WARMUP_METRICS)
+
+# --- CONVERSATION MEMORY ---
+def summarize_turns(previous, messages, max_tokens):
+    """Folds old turns into the running summary, using the model itself."""
+    transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages)
+    prompt = (
+        "Summarize this conversation between a user and their houseplant in a "
+        "few short sentences, keeping names, facts and anything promised.\n\n"
+        f"Summary so far: {previous or '(none)'}\n\n{transcript}\n\nNew summary:"
+    )
+    try:
+        response = OLLAMA.generate(model=MODEL_NAME, prompt=prompt, keep_alive=KEEP_ALIVE,
+                                   options={"num_predict": max_tokens})
+        return response['response'].strip()
+    except Exception as e:
+        print(f"(Gemma-2B): Summary failed, keeping the first sentences instead: {e}")
+        return extractive_summary(previous, messages, max_tokens)
+
+# One bounded history per chat session (the UI's client id)
+CONVERSATIONS = ConversationStore(summarizer=summarize_turns)
+
+def remember_exchange(text, reply, session_id=DEFAULT_SESSION):
+    """
+    Adds a reply that didn't come from the model (a sensor answer) to the
+    session, so the model sees it on the next turn.
+    """
+    CONVERSATIONS.record(session_id, text, reply)
+
 # --- THIS IS THE CHAT FUNCTION YOUR AI AGENT IS LOOKING FOR ---
-def get_chat_response(text):
+def get_chat_response(text, session_id=DEFAULT_SESSION):
     """
-    Takes the user's text, sends it to Ollama, and returns the response.
+    Takes the user's text, sends it to Ollama along with the session's
+    conversation so far, and returns the response.
     """
     print(f"\n(Gemma-2B): Received prompt: '{text}'")
+
+    # A cached reply is only right when there's no conversation it depends on
+    first_turn = not CONVERSATIONS.has_history(session_id)
+    cached = RESPONSE_CACHE.get(text, MODEL_NAME) if first_turn else None
+    if cached is not None:
+        print(f"(Gemma-2B): Cached response: '{cached}'")
+        CONVERSATIONS.record(session_id, text, cached)
+        return cached
     
     try:
         # Send the prompt to the Gemma-2B model
-        # Make sure you have pulled this model! (ollama pull gemma:2b)
-        response = ollama.chat(model='gemma:2b', messages=[
-            {
-                'role': 'user',
-                'content': text,
-            },
-        ])
+        response = OLLAMA.chat(model=MODEL_NAME, keep_alive=KEEP_ALIVE,
+                               messages=CONVERSATIONS.build_messages(session_id, text))
+        _record_chat(response)
         
         # Extract the text content from the response
         reply = response['message']['content']
         
         print(f"(Gemma-2B): Generated response: '{reply}'")
+        if first_turn:
+            RESPONSE_CACHE.put(text, MODEL_NAME, reply)
+        CONVERSATIONS.record(session_id, text, reply, response.get('prompt_eval_count'))
         return reply
 
     except Exception as e:
         print(f"(Gemma-2B): CRITICAL ERROR: {e}")
-        return "I'm having trouble connecting to my AI brain (Ollama)."
+        return ERROR_REPLY
+
+# --- STREAMING VERSION, USED WHEN THE AGENT STREAMS TO THE UI ---
+def stream_chat_response(text, session_id=DEFAULT_SESSION):
+    """
+    Same as get_chat_response, but yields the reply piece by piece as
+    Ollama generates it, so the first words can be shown right away.
+    """
+    print(f"\n(Gemma-2B): Received prompt (streaming): '{text}'")
+
+    first_turn = not CONVERSATIONS.has_history(session_id)
+    cached = RESPONSE_CACHE.get(text, MODEL_NAME) if first_turn else None
+    if cached is not None:
+        print(f"(Gemma-2B): Cached response: '{cached}'")
+        CONVERSATIONS.record(session_id, text, cached)
+        yield cached
+        return
+    
+    try:
+        stream = OLLAMA.chat(model=MODEL_NAME, stream=True, keep_alive=KEEP_ALIVE,
+                             messages=CONVERSATIONS.build_messages(session_id, text))
+        pieces = []
+        prompt_tokens = None
+        try:
+            for chunk in stream:
+                piece = chunk['message']['content']
+                if piece:
+                    pieces.append(piece)
+                    yield piece
+                if chunk.get('done'):
+                    _record_chat(chunk)
+                    prompt_tokens = chunk.get('prompt_eval_count')
+        except GeneratorExit:
+            # The caller stopped reading (the chat was cancelled). Closing
+            # the stream drops the connection, and Ollama stops generating.
+            stream.close()
+            print(f"(Gemma-2B): Generation cancelled after {len(pieces)} pieces.")
+            raise
+        print("(Gemma-2B): Finished streaming response.")
+        reply = "".join(pieces)
+        if first_turn:
+            RESPONSE_CACHE.put(text, MODEL_NAME, reply)
+        CONVERSATIONS.record(session_id, text, reply, prompt_tokens)
+
+    except Exception as e:
+        print(f"(Gemma-2B): CRITICAL ERROR: {e}")
+        yield ERROR_REPLY
 
 # --- THIS IS THE CLEANUP FUNCTION IT'S LOOKING FOR ---
 def cleanup():
     """
     Called when the AI agent is shutting down.
     """
-    print("(Gemma-2B): Cleanup called. Nothing to do.")
-    pass
+    global _ping_thread
+    print(f"(Gemma-2B): Cleanup called. Response cache: {RESPONSE_CACHE.format_metrics()}")
+    print(f"(Gemma-2B): Warm-up: {get_warmup_metrics()}")
+    print(f"(Gemma-2B): Conversations: {CONVERSATIONS.format_metrics()}")
+    RESPONSE_CACHE.close()
+
+    _ping_stop.set()
+    if _ping_thread is not None:
+        _ping_thread.join(timeout=2)
+        _ping_thread = None
+
+    # Free the model's memory now instead of waiting out the keep-alive
+    try:
+        OLLAMA.generate(model=MODEL_NAME, prompt="", keep_alive=0)
+        print(f"(Gemma-2B): Unloaded '{MODEL_NAME}'.")
+    except Exception as e:
+        print(f"(Gemma-2B): Could not unload the model: {e}")
 
 # --- THIS IS THE MOOD FUNCTION YOUR MOOD_AGENT.PY SCRIPT NEEDS ---
 def get_plant_status(data):
     """
     This is the placeholder for your *mood* agent.
-    It now uses the CORRECT keys from your sensor script.
+    The thresholds live in the rule table in mood_rules.py, which uses the
+    same keys as your sensor script ('soil_perc', 'lux', 'temp').
     """
     print(f"(Mood Agent): Processing sensor data: {data}")
-    
-    # <--- THIS IS THE FIX ---
-    # We are now using 'soil_perc' and 'lux', which match your sensor script.
-    soil = data.get("soil_perc", 50)
-    light = data.get("lux", 1000)
-    temp = data.get("temp", 25)
-    # --- END OF FIX ---
-
-    # Now the logic will work correctly
-    if soil < 30:
-        return "thirsty", "I'm so thirsty! My soil is very dry."
-    elif light < 500:
-        return "sad", "It's so dark in here. I need more light."
-    elif temp > 30:
-        return "sad", "Phew, it is getting hot."
-    else:
-        return "happy", "I'm feeling great! My light and water are perfect."
+    return MOOD_ENGINE.evaluate(data)
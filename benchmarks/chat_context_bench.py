@@ -0,0 +1,76 @@
+"""
+Per-turn prompt cost of a long chat, against the Ollama stand-in server.
+
+Run from the repo root:
+    python -m benchmarks.chat_context_bench [--turns 40]
+
+Plays the same conversations twice through get_chat_response():
+  - naive:   the whole history is resent every turn (no token budget)
+  - bounded: the default ConversationStore budget and summary folding
+and prints the prompt tokens the server had to process on each turn.
+
+Two sessions take turns talking, like two phones on the same pot. The
+server only keeps one processed prompt around, so each turn has to process
+that session's whole prompt again: naive grows with the history, bounded
+levels off at the budget. (A single session mostly hits the prefix cache
+either way; see --sessions 1.)
+"""
+import argparse
+import importlib
+import os
+
+from benchmarks import ollama_standin
+from conversation import ConversationStore, extractive_summary
+from response_cache import ResponseCache
+
+QUESTIONS = [
+    "Hi plant, my name is Sam and I just moved you next to the window.",
+    "How much water do you like during the summer months?",
+    "Do you mind the cat sleeping in your pot sometimes?",
+    "What is your favourite time of day and why?",
+]
+
+
+def run(agent, server, store, turns, sessions):
+    agent.CONVERSATIONS = store
+    server.RequestHandlerClass.model.last_prompt = ""
+    counts = []
+    for turn in range(turns):
+        text = f"{QUESTIONS[turn % len(QUESTIONS)]} (turn {turn})"
+        before = store.metrics["prompt_tokens"]
+        for session in range(sessions):
+            agent.get_chat_response(f"[phone {session}] {text}", f"bench-{session}")
+        counts.append(store.metrics["prompt_tokens"] - before)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--sessions", type=int, default=2)
+    args = parser.parse_args()
+
+    server, host = ollama_standin.start_in_thread(load_seconds=0.0, token_seconds=0.0)
+    os.environ["OLLAMA_HOST"] = host
+    os.environ["PLANT_RESPONSE_CACHE"] = ""
+    os.environ["PLANT_WARM_PING"] = "0"
+    import ai_agent_test_code as agent
+    agent = importlib.reload(agent)
+    agent.RESPONSE_CACHE = ResponseCache(max_entries=0)  # every turn must reach the model
+
+    naive = run(agent, server, ConversationStore(history_budget=10 ** 9), args.turns, args.sessions)
+    bounded_store = ConversationStore(summarizer=extractive_summary)
+    bounded = run(agent, server, bounded_store, args.turns, args.sessions)
+
+    print()
+    print(f" prompt tokens processed per turn ({args.sessions} sessions)")
+    print(" turn   naive  bounded")
+    for turn, (a, b) in enumerate(zip(naive, bounded)):
+        print(f" {turn:4d} {a:7d} {b:8d}")
+    print(f"\n total  {sum(naive):6d} {sum(bounded):8d}")
+    print(f" bounded: {bounded_store.format_metrics()}")
+    server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
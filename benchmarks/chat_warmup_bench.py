@@ -0,0 +1,74 @@
+"""
+Cold-start vs warm chat latency, against the Ollama stand-in server.
+
+Run from the repo root:
+    python -m benchmarks.chat_warmup_bench [--load-seconds 2] [--keep-alive 2s]
+
+Measures the time to the first streamed piece of a chat:
+  - cold:      no warm-up, the chat pays for the model load
+  - warm:      after warm_up()
+  - unloaded:  after the keep-alive ran out (what idle unloads cost)
+Set --host to run it against a real Ollama instead.
+"""
+import argparse
+import importlib
+import os
+import time
+
+from benchmarks import ollama_standin
+
+
+def first_piece_ms(agent, text):
+    start = time.perf_counter()
+    first = None
+    for _ in agent.stream_chat_response(text):
+        if first is None:
+            first = (time.perf_counter() - start) * 1000
+    return first
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", help="real Ollama URL (default: start the stand-in)")
+    parser.add_argument("--load-seconds", type=float, default=2.0)
+    parser.add_argument("--keep-alive", default="2s", help="short, so the 'unloaded' case is quick")
+    args = parser.parse_args()
+
+    server = None
+    host = args.host
+    if host is None:
+        server, host = ollama_standin.start_in_thread(load_seconds=args.load_seconds)
+        print(f"Stand-in Ollama at {host} (load {args.load_seconds}s)")
+
+    os.environ["OLLAMA_HOST"] = host
+    os.environ["PLANT_KEEP_ALIVE"] = args.keep_alive
+    os.environ["PLANT_RESPONSE_CACHE"] = ""  # every chat must reach the model
+    import ai_agent_test_code as agent
+    agent = importlib.reload(agent)
+
+    # Make sure we start from an unloaded model
+    agent.OLLAMA.generate(model=agent.MODEL_NAME, prompt="", keep_alive=0)
+
+    results = {}
+    results["cold"] = first_piece_ms(agent, "cold question")
+    agent.OLLAMA.generate(model=agent.MODEL_NAME, prompt="", keep_alive=0)
+
+    metrics = agent.warm_up(ping_interval=0)
+    results["warm"] = first_piece_ms(agent, "warm question")
+
+    time.sleep(ollama_standin.parse_keep_alive(args.keep_alive) + 0.5)
+    results["unloaded"] = first_piece_ms(agent, "question after idle")
+
+    print()
+    for name, ms in results.items():
+        print(f"  {name:<9} first piece after {ms:8.1f} ms")
+    print(f"  warm_up(): {metrics}")
+    print(f"  chats: {agent.get_warmup_metrics()}")
+
+    agent.cleanup()
+    if server is not None:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""
+Benchmark: IntentRouter's fast path, and which messages it takes.
+
+Run from the repo root:
+    python -m benchmarks.intent_router_bench [--messages N]
+
+Checks every example below against classify() first: sensor questions
+must get their intent, and conversation that merely mentions a sensor word
+(None below) must fall through to the model. Then times route() over a
+mix of both.
+"""
+import argparse
+import time
+
+from intent_router import IntentRouter, SensorSnapshot
+
+EXAMPLES = [
+    ("Are you thirsty?", "moisture"),
+    ("do you need water", "moisture"),
+    ("Is your soil dry?", "moisture"),
+    ("what's the temperature?", "temperature"),
+    ("are you cold?", "temperature"),
+    ("Is the air dry?", "humidity"),
+    ("how humid is it?", "humidity"),
+    ("Do you get enough light?", "light"),
+    ("is it too dark in here", "light"),
+    ("How are you?", "mood"),
+    # Conversation: goes to the model
+    ("Tell me a story about water", None),
+    ("Tell me a story about water?", None),
+    ("do you like cold weather?", None),
+    ("What's your favourite kind of soil?", None),
+    ("Why do plants need light?", None),
+    ("how do you feel about the sun?", None),
+    ("I watered you this morning", None),
+    ("show me your temperature", None),
+    ("Hi plant, my name is Sam and I just moved you next to the window.", None),
+]
+
+READING = {"temp": 22.5, "humidity": 45.0, "soil_perc": 25.0, "lux": 300.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=100000)
+    args = parser.parse_args()
+
+    snapshot = SensorSnapshot()
+    snapshot.update("default", READING)
+    router = IntentRouter(snapshot)
+
+    wrong = [(text, expected, router.classify(text)) for text, expected in EXAMPLES
+             if router.classify(text) != expected]
+    for text, expected, got in wrong:
+        print(f"  {text!r}: expected {expected}, got {got}")
+    assert not wrong, f"{len(wrong)} of {len(EXAMPLES)} examples misrouted"
+    print(f"{len(EXAMPLES)} examples routed as expected")
+
+    texts = [EXAMPLES[i % len(EXAMPLES)][0] for i in range(args.messages)]
+    start = time.perf_counter()
+    for text in texts:
+        router.route(text)
+    elapsed = time.perf_counter() - start
+    print(f"{args.messages} messages: {elapsed / args.messages * 1e6:.2f} us per route()")
+    print(router.format_metrics())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Benchmark: MoodRuleEngine (scalar and batch) vs the old if/elif chain.
+
+Run from the repo root:
+    python -m benchmarks.mood_rules_bench [--readings N]
+"""
+import argparse
+import random
+import time
+
+from mood_rules import MOOD_ENGINE, np
+
+
+def legacy_get_plant_status(data):
+    """The if/elif chain get_plant_status used before the rule table (minus the print)."""
+    soil = data.get("soil_perc", 50)
+    light = data.get("lux", 1000)
+    temp = data.get("temp", 25)
+    if soil < 30:
+        return "thirsty", "I'm so thirsty! My soil is very dry."
+    elif light < 500:
+        return "sad", "It's so dark in here. I need more light."
+    elif temp > 30:
+        return "sad", "Phew, it is getting hot."
+    else:
+        return "happy", "I'm feeling great! My light and water are perfect."
+
+
+def make_readings(n, seed=1):
+    rng = random.Random(seed)
+    return [
+        {
+            "temp": rng.uniform(15, 35),
+            "humidity": rng.uniform(30, 80),
+            "soil_perc": rng.uniform(0, 100),
+            "lux": rng.uniform(0, 2000),
+        }
+        for _ in range(n)
+    ]
+
+
+def timed(fn, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readings", type=int, default=100000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    readings = make_readings(args.readings)
+    columns = {field: [r[field] for r in readings] for field in readings[0]}
+    arrays = {field: np.asarray(values) for field, values in columns.items()}
+    n = len(readings)
+
+    legacy, t_legacy = timed(lambda: [legacy_get_plant_status(r)[0] for r in readings], args.repeat)
+    scalar, t_scalar = timed(lambda: [MOOD_ENGINE.evaluate(r)[0] for r in readings], args.repeat)
+    batch_rows, t_rows = timed(lambda: MOOD_ENGINE.evaluate_batch(readings), args.repeat)
+    batch_cols, t_cols = timed(lambda: MOOD_ENGINE.evaluate_batch(columns), args.repeat)
+    batch_arrays, t_arrays = timed(lambda: MOOD_ENGINE.evaluate_batch(arrays), args.repeat)
+
+    assert scalar == legacy, "scalar path disagrees with the old function"
+    assert MOOD_ENGINE.moods(batch_rows) == legacy, "batch path disagrees with the old function"
+    assert MOOD_ENGINE.moods(batch_cols) == legacy, "batch path disagrees with the old function"
+    assert MOOD_ENGINE.moods(batch_arrays) == legacy, "batch path disagrees with the old function"
+
+    print(f"{n} readings, best of {args.repeat}")
+    for name, elapsed in (
+        ("legacy if/elif", t_legacy),
+        ("engine scalar", t_scalar),
+        ("engine batch (dicts)", t_rows),
+        ("engine batch (lists)", t_cols),
+        ("engine batch (arrays)", t_arrays),
+    ):
+        print(f"{name:>24}: {elapsed * 1000:8.2f} ms -> {n / elapsed:>12,.0f} readings/sec "
+              f"({t_legacy / elapsed:.1f}x legacy)")
+
+
+if __name__ == "__main__":
+    main()
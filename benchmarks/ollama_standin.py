@@ -0,0 +1,239 @@
+"""
+Stand-in HTTP server that mimics the parts of the Ollama API the chat agent
+uses (/api/chat, /api/generate, /api/ps, /api/tags, /api/version), with a
+simulated model load time, keep-alive/unload behaviour and token rate.
+Like Ollama, it remembers the last prompt it processed and only "evaluates"
+(and reports in prompt_eval_count) the part after the shared prefix.
+
+Run from the repo root:
+    python -m benchmarks.ollama_standin --port 11435 --load-seconds 3
+    OLLAMA_HOST=http://127.0.0.1:11435 python ai_agent.py
+"""
+import argparse
+import json
+import re
+import threading
+import time
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_KEEP_ALIVE = 300.0  # Ollama's default is 5 minutes
+
+
+def parse_keep_alive(value):
+    """Ollama accepts seconds as a number or a duration string like '30m'."""
+    if value is None:
+        return DEFAULT_KEEP_ALIVE
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.fullmatch(r"(-?\d+(?:\.\d+)?)(ms|s|m|h)?", str(value).strip())
+    if not match:
+        return DEFAULT_KEEP_ALIVE
+    number, unit = float(match.group(1)), match.group(2) or "s"
+    return number * {"ms": 0.001, "s": 1, "m": 60, "h": 3600}[unit]
+
+
+class StandinModel:
+    """Tracks whether the model is 'loaded' and how long it stays loaded."""
+
+    def __init__(self, load_seconds, token_seconds, reply, prompt_token_seconds=0.0):
+        self.load_seconds = load_seconds
+        self.token_seconds = token_seconds
+        self.prompt_token_seconds = prompt_token_seconds
+        self.last_prompt = ""
+        self.reply = reply
+        self.lock = threading.Lock()
+        self.loaded_model = None
+        self.expires_at = 0.0
+        self.loads = 0
+        self.requests = 0
+
+    def ensure_loaded(self, model, keep_alive, empty_prompt=False):
+        """
+        Returns the load time in seconds (0 if it was already resident). An
+        empty prompt with keep_alive 0 only unloads, like Ollama's.
+        """
+        with self.lock:
+            self.requests += 1
+            now = time.monotonic()
+            load = 0.0
+            keep = parse_keep_alive(keep_alive)
+            if keep == 0 and empty_prompt:
+                self.loaded_model = None
+                self.expires_at = 0.0
+                self.last_prompt = ""
+                return load
+            if self.loaded_model != model or now >= self.expires_at:
+                time.sleep(self.load_seconds)
+                self.loads += 1
+                load = self.load_seconds
+                self.loaded_model = model
+                self.last_prompt = ""
+            if keep < 0:
+                self.expires_at = float("inf")
+            elif keep == 0:
+                self.loaded_model = None
+                self.expires_at = 0.0
+                self.last_prompt = ""
+            else:
+                self.expires_at = time.monotonic() + keep
+            return load
+
+    def evaluate_prompt(self, prompt):
+        """Returns how many prompt tokens had to be processed (about 4 chars each)."""
+        with self.lock:
+            shared = 0
+            for a, b in zip(self.last_prompt, prompt):
+                if a != b:
+                    break
+                shared += 1
+            self.last_prompt = prompt
+        count = (len(prompt) - shared) // 4 + 1
+        time.sleep(self.prompt_token_seconds * count)
+        return count
+
+    def tokens(self, prompt):
+        if not prompt:
+            return []
+        words = self.reply.split(" ")
+        return [word + (" " if i < len(words) - 1 else "") for i, word in enumerate(words)]
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    model = None  # set by make_server
+    quiet = True
+
+    def log_message(self, fmt, *args):
+        if not self.quiet:
+            super().log_message(fmt, *args)
+
+    def _send_json(self, data, status=200):
+        body = json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/version":
+            self._send_json({"version": "0.0.0-standin"})
+        elif self.path == "/api/tags":
+            self._send_json({"models": [{"name": "gemma:2b", "model": "gemma:2b"}]})
+        elif self.path == "/api/ps":
+            loaded = self.model.loaded_model and time.monotonic() < self.model.expires_at
+            self._send_json({"models": [{"name": self.model.loaded_model}] if loaded else []})
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            request = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json({"error": "invalid JSON"}, 400)
+            return
+
+        if self.path == "/api/chat":
+            messages = request.get("messages") or []
+            prompt = messages[-1].get("content", "") if messages else ""
+            full = "".join(f"<{m.get('role')}>{m.get('content', '')}\n" for m in messages)
+            self._generate(request, prompt, full, chat=True)
+        elif self.path == "/api/generate":
+            prompt = request.get("prompt") or ""
+            self._generate(request, prompt, prompt, chat=False)
+        else:
+            self._send_json({"error": "not found"}, 404)
+
+    def _generate(self, request, prompt, full_prompt, chat):
+        start = time.monotonic()
+        model_name = request.get("model", "")
+        load = self.model.ensure_loaded(model_name, request.get("keep_alive"), empty_prompt=not prompt)
+        prompt_eval_count = self.model.evaluate_prompt(full_prompt) if prompt else 0
+        tokens = self.model.tokens(prompt)
+        limit = (request.get("options") or {}).get("num_predict")
+        if limit is not None and limit >= 0:
+            tokens = tokens[:limit]
+        stream = request.get("stream", True)
+
+        def piece(text, done):
+            data = {
+                "model": model_name,
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "done": done,
+            }
+            if chat:
+                data["message"] = {"role": "assistant", "content": text}
+            else:
+                data["response"] = text
+            if done:
+                data.update({
+                    "done_reason": "stop",
+                    "total_duration": int((time.monotonic() - start) * 1e9),
+                    "load_duration": int(load * 1e9),
+                    "prompt_eval_count": prompt_eval_count,
+                    "eval_count": len(tokens),
+                })
+                if not chat:
+                    data["context"] = [1, 2, 3]
+            return data
+
+        if not stream:
+            time.sleep(self.model.token_seconds * len(tokens))
+            self._send_json(piece("".join(tokens), True))
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            for token in tokens:
+                time.sleep(self.model.token_seconds)
+                self.wfile.write(json.dumps(piece(token, False)).encode() + b"\n")
+                self.wfile.flush()
+            self.wfile.write(json.dumps(piece("", True)).encode() + b"\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client went away (e.g. a cancelled generation)
+        self.close_connection = True
+
+
+def make_server(port=0, load_seconds=2.0, token_seconds=0.02,
+                reply="I'm a stand-in plant brain, but I'm happy to chat with you!", quiet=True,
+                prompt_token_seconds=0.0):
+    """Builds the server (port 0 picks a free one). Call serve_forever() to run it."""
+    handler = type("BoundStandinHandler", (StandinHandler,), {
+        "model": StandinModel(load_seconds, token_seconds, reply, prompt_token_seconds),
+        "quiet": quiet,
+    })
+    return ThreadingHTTPServer(("127.0.0.1", port), handler)
+
+
+def start_in_thread(**kwargs):
+    """Starts a server on a background thread. Returns (server, base_url)."""
+    server = make_server(**kwargs)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--load-seconds", type=float, default=2.0, help="simulated cold model load")
+    parser.add_argument("--token-seconds", type=float, default=0.02, help="simulated time per token")
+    parser.add_argument("--prompt-token-seconds", type=float, default=0.0,
+                        help="simulated time per prompt token processed")
+    args = parser.parse_args()
+
+    server = make_server(args.port, args.load_seconds, args.token_seconds, quiet=False,
+                         prompt_token_seconds=args.prompt_token_seconds)
+    print(f"Ollama stand-in listening on http://127.0.0.1:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping stand-in server.")
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
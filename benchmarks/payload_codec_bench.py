@@ -0,0 +1,106 @@
+"""
+Benchmark: payload_codec's binary formats vs the JSON the agents used to send.
+
+Run from the repo root:
+    python -m benchmarks.payload_codec_bench [--messages N]
+
+For each kind of message, bytes on the wire and the encode/decode cost:
+  - plant/sensor/data:  filtered + raw reading (live_sensor, sensor_gateway)
+  - plant/ui/sensors:   reading + plant id (mood_agent); the JSON row
+                        includes the old per-message key translation
+  - plant/ui/update:    a streamed chat chunk (ai_agent); msgpack only if
+                        it's installed
+"""
+import argparse
+import json
+import random
+import time
+
+from payload_codec import decode, encode_sensor_frame, msgpack
+
+
+def make_readings(n, seed=1):
+    rng = random.Random(seed)
+    readings = []
+    for _ in range(n):
+        raw = {
+            "temp": round(rng.uniform(15, 35), 1),
+            "humidity": round(rng.uniform(30, 80), 1),
+            "soil_perc": float(rng.randint(0, 100)),
+            "lux": float(rng.randint(0, 2000)),
+        }
+        readings.append(({field: round(value * 0.98, 2) for field, value in raw.items()}, raw))
+    return readings
+
+
+def legacy_ui_sensors(data, plant_id):
+    """What mood_agent built and sent before the canonical names."""
+    return json.dumps({
+        "plant_id": plant_id,
+        "temperature": data.get("temp"),
+        "humidity": data.get("humidity"),
+        "moisture": data.get("soil_perc"),
+        "light": data.get("lux"),
+    })
+
+
+def chat_chunk(i):
+    return {"message_id": "5f1c2a9e", "seq": i, "delta": " leaves", "request_id": "5f1c2a9e",
+            "client_id": "plant_ui_client-3fa2b1c0"}
+
+
+def timed(fn, items, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        out = [fn(item) for item in items]
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return out, best
+
+
+def measure(name, encode, decode_fn, items, repeat):
+    encoded, t_encode = timed(encode, items, repeat)
+    decoded, t_decode = timed(decode_fn, encoded, repeat)
+    size = sum(len(e) for e in encoded) / len(encoded)
+    n = len(items)
+    print(f"  {name:<22} {size:7.1f} B {t_encode / n * 1e6:9.2f} us {t_decode / n * 1e6:9.2f} us")
+    return decoded
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    readings = make_readings(args.messages)
+    header = f"  {'format':<22} {'size':>9} {'encode':>12} {'decode':>12}"
+    print(f"{args.messages} messages, best of {args.repeat}, per message")
+
+    print("plant/sensor/data (filtered + raw)")
+    print(header)
+    as_json = measure("json", lambda r: json.dumps(dict(r[0], raw=r[1])), json.loads, readings, args.repeat)
+    as_frame = measure("sensor/1", lambda r: encode_sensor_frame(r[0], raw=r[1]), decode, readings, args.repeat)
+    assert as_frame == as_json, "sensor frames don't round-trip like JSON"
+
+    print("plant/ui/sensors (reading + plant id)")
+    print(header)
+    measure("json (translated)", lambda r: legacy_ui_sensors(r[0], "default"), json.loads, readings, args.repeat)
+    as_json = measure("json", lambda r: json.dumps(dict(r[0], plant_id="default")), json.loads, readings, args.repeat)
+    as_frame = measure("sensor/1", lambda r: encode_sensor_frame(r[0], "default"), decode, readings, args.repeat)
+    assert as_frame == as_json, "sensor frames don't round-trip like JSON"
+
+    print("plant/ui/update (chat chunk)")
+    print(header)
+    chunks = [chat_chunk(i) for i in range(args.messages)]
+    as_json = measure("json", json.dumps, json.loads, chunks, args.repeat)
+    if msgpack is not None:
+        as_msgpack = measure("msgpack", msgpack.packb, decode, chunks, args.repeat)
+        assert as_msgpack == as_json, "msgpack doesn't round-trip like JSON"
+    else:
+        print("  msgpack                not installed (pip install msgpack)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Micro-benchmark: FrameParser vs live_sensor.read_and_parse_data.
+
+Run from the repo root:
+    python -m benchmarks.serial_parser_bench [capture_file] [--chunk N]
+
+capture_file is a raw dump of the ESP32 serial stream. Without one, a
+synthetic capture of well-formed frames (plus a little boot junk) is used.
+"""
+import argparse
+import io
+import random
+import time
+
+from live_sensor import read_and_parse_data
+from serial_parser import FrameParser
+
+
+class CaptureSerial(io.RawIOBase):
+    """
+    Just enough of serial.Serial to replay a capture from memory.
+
+    Like serial.Serial it is a RawIOBase, so readline() is the inherited
+    IOBase one that pulls a byte at a time, the same as on the real port.
+    """
+
+    def __init__(self, data, chunk=None):
+        super().__init__()
+        self.data = data
+        self.pos = 0
+        self.chunk = chunk
+
+    def readable(self):
+        return True
+
+    @property
+    def in_waiting(self):
+        remaining = len(self.data) - self.pos
+        return min(remaining, self.chunk) if self.chunk else remaining
+
+    def readinto(self, b):
+        n = min(len(b), len(self.data) - self.pos)
+        b[:n] = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return n
+
+    def exhausted(self):
+        return self.pos >= len(self.data)
+
+
+def synthetic_capture(lines=50000, seed=1):
+    rng = random.Random(seed)
+    out = [b"ets Jun  8 2016 00:22:57\r\n", b"rst:0x1 (POWERON_RESET)\r\n"]
+    for _ in range(lines):
+        out.append(
+            f"temp: {rng.uniform(18, 32):.1f}, humidity: {rng.uniform(30, 80):.1f}, "
+            f"soil_perc: {rng.randint(0, 100)}, lux: {rng.randint(0, 2000)}\r\n".encode()
+        )
+    return b"".join(out)
+
+
+def bench_readline(data):
+    ser = CaptureSerial(data)
+    frames = 0
+    start = time.perf_counter()
+    while not ser.exhausted():
+        if read_and_parse_data(ser):
+            frames += 1
+    return frames, time.perf_counter() - start
+
+
+def bench_frame_parser(data, chunk):
+    ser = CaptureSerial(data, chunk)
+    parser = FrameParser(verbose=False)
+    frames = 0
+    start = time.perf_counter()
+    while not ser.exhausted():
+        frames += len(parser.drain(ser))
+    return frames, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("capture", nargs="?", help="raw serial capture file")
+    parser.add_argument("--chunk", type=int, default=4096,
+                        help="bytes available per read for FrameParser (0 = whole capture)")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    if args.capture:
+        with open(args.capture, "rb") as f:
+            data = f.read()
+    else:
+        data = synthetic_capture()
+    line_count = data.count(b"\n")
+    print(f"Capture: {len(data)} bytes, {line_count} lines")
+
+    for name, run in (
+        ("read_and_parse_data", lambda: bench_readline(data)),
+        ("FrameParser.drain", lambda: bench_frame_parser(data, args.chunk)),
+    ):
+        best = min((run() for _ in range(args.repeat)), key=lambda r: r[1])
+        frames, elapsed = best
+        print(f"{name:>20}: {frames} frames in {elapsed:.3f}s -> {line_count / elapsed:,.0f} lines/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+"""
+Frame times of the plant UI under a scripted stream of plant/ui/update messages.
+
+Run from the repo root:
+    python -m benchmarks.ui_bench [--rate 20] [--chat-rate 0] [--duration 10] [--report ui_bench.json]
+                                  [--wire json|binary]
+
+Runs PlantApp headless: an offscreen SDL window with Kivy's mock GL
+backend, so no display or GPU is needed (use --window for the real one,
+e.g. on the Pi). Frame times then cover the Python side of a frame
+(widget updates, layout, canvas instructions), not drawing.
+
+A thread feeds JSON payloads to the UI's own MQTT on_message callback at
+the given rates, the way paho's network thread would. No broker is used.
+  - sensor readings at --rate per second, with a mood change every
+    --mood-every of them, as JSON or as binary sensor frames (--wire; a
+    frame carries no mood, so moods then come as separate JSON messages)
+  - streamed chat replies at --chat-rate chunks per second, with the
+    PlantAI popup open (moods are then held until it closes, as usual)
+
+The JSON report has:
+  - frames:   main loop frame times; dropped = frames over 1.5x the budget
+  - latency:  message handed to on_message -> the frame that applied it
+  - apply:    time spent in apply_ui_state per call
+  - memory:   texture cache and video frame cache bytes (peak)
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import statistics
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from payload_codec import encode_sensor_frame
+
+MOODS = ("happy", "thirsty", "sad", "high_light", "neutral")
+WORDS = "I am a happy plant and the light here is just right for me today".split()
+
+
+def configure_kivy(real_window, fps):
+    """Must run before Kivy is imported."""
+    os.environ.setdefault("KIVY_NO_ARGS", "1")
+    os.environ["KCFG_GRAPHICS_MAXFPS"] = str(int(fps))
+    if not real_window:
+        os.environ.setdefault("KIVY_GL_BACKEND", "mock")
+        os.environ.setdefault("KIVY_WINDOW", "sdl2")
+        os.environ.setdefault("SDL_VIDEODRIVER", "offscreen")
+
+
+def sensor_payloads(mood_every, seed=1):
+    rng = random.Random(seed)
+    n = 0
+    while True:
+        data = {
+            "temp": round(rng.uniform(18, 30), 1),
+            "humidity": round(rng.uniform(30, 80), 1),
+            "soil_perc": round(rng.uniform(0, 100), 1),
+            "lux": round(rng.uniform(0, 2000)),
+        }
+        if mood_every and n % mood_every == 0:
+            data["mood"] = MOODS[(n // mood_every) % len(MOODS)]
+        yield data
+        n += 1
+
+
+def chat_payloads(client_id, chunks_per_reply):
+    """Streamed replies in the shape ai_agent.publish_streamed_reply sends."""
+    reply = 0
+    while True:
+        message_id = f"bench-{reply}"
+        envelope = {"client_id": client_id, "request_id": message_id, "message_id": message_id}
+        pieces = [WORDS[i % len(WORDS)] + " " for i in range(chunks_per_reply)]
+        for seq, piece in enumerate(pieces):
+            yield dict(envelope, seq=seq, delta=piece)
+        yield dict(envelope, seq=len(pieces), done=True, speech="".join(pieces).strip())
+        reply += 1
+
+
+def encode_json(data):
+    return [json.dumps(data).encode()]
+
+
+def encode_binary(data):
+    """The reading as a sensor frame, plus the mood (if any) on its own."""
+    payloads = [encode_sensor_frame(data)]
+    if "mood" in data:
+        payloads.append(json.dumps({"mood": data["mood"]}).encode())
+    return payloads
+
+
+def summarize(seconds):
+    """count/mean/percentiles in ms."""
+    if not seconds:
+        return {"count": 0}
+    ms = sorted(s * 1000 for s in seconds)
+    cuts = statistics.quantiles(ms, n=100) if len(ms) > 1 else [ms[0]] * 99
+    return {
+        "count": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "p50_ms": round(cuts[49], 3),
+        "p95_ms": round(cuts[94], 3),
+        "p99_ms": round(cuts[98], 3),
+        "max_ms": round(ms[-1], 3),
+    }
+
+
+class Probe:
+    """
+    Feeds the UI from a thread and times what the main loop does with it.
+
+    Every message is stamped when it's handed to on_message; the stamps are
+    collected together with the UI state store's take(), so each latency
+    ends at the apply_ui_state call that showed that message.
+    """
+
+    def __init__(self, layout, streams, fps):
+        self.layout = layout
+        self.streams = streams     # [(rate per second, topic, payload iterator, encode)]
+        self.budget = 1.0 / fps
+        self.lock = threading.Lock()
+        self.stamps = []           # sent, not taken by the UI yet
+        self.taken = []            # taken by the apply_ui_state call in progress
+        self.latencies = []
+        self.apply_seconds = []
+        self.frame_times = []
+        self.sent = 0
+        self.peak = {"texture_bytes": 0, "frame_cache_bytes": 0}
+        self.measuring = False
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._feed, daemon=True)
+
+        self.on_message = layout.mqtt_client.on_message
+        store = layout.ui_state
+        store_take = store.take
+
+        def take():
+            with self.lock:
+                self.taken, self.stamps = self.stamps, []
+                return store_take()
+
+        store.take = take
+        apply_ui_state = layout.apply_ui_state
+
+        def timed_apply(dt):
+            start = time.perf_counter()
+            apply_ui_state(dt)
+            end = time.perf_counter()
+            if self.measuring:
+                self.apply_seconds.append(end - start)
+                self.latencies.extend(end - stamp for stamp in self.taken)
+            self.taken = []
+
+        layout.apply_ui_state = timed_apply
+
+    def start(self):
+        from kivy.clock import Clock
+        from video_player import FRAME_CACHE
+
+        self.frame_cache = FRAME_CACHE
+        self.last_frame = time.perf_counter()
+        self.measuring = True
+        Clock.schedule_interval(self._on_frame, 0)
+        self.thread.start()
+
+    def stop(self):
+        self.measuring = False
+        self.stopping.set()
+        self.thread.join()
+
+    def _on_frame(self, dt):
+        now = time.perf_counter()
+        if self.measuring:
+            self.frame_times.append(now - self.last_frame)
+            self.peak["texture_bytes"] = max(self.peak["texture_bytes"], self.layout.textures.bytes)
+            self.peak["frame_cache_bytes"] = max(self.peak["frame_cache_bytes"], self.frame_cache.bytes)
+        self.last_frame = now
+
+    def _feed(self):
+        start = time.perf_counter()
+        due = [start for _ in self.streams]
+        while not self.stopping.is_set():
+            i = min(range(len(self.streams)), key=due.__getitem__)
+            delay = due[i] - time.perf_counter()
+            if delay > 0 and self.stopping.wait(delay):
+                break
+            rate, topic, payloads, encode = self.streams[i]
+            for payload in encode(next(payloads)):
+                msg = SimpleNamespace(topic=topic, payload=payload)
+                with self.lock:
+                    self.stamps.append(time.perf_counter())
+                    self.on_message(None, None, msg)
+                self.sent += 1
+            due[i] += 1.0 / rate
+
+    def report(self, duration):
+        frames = summarize(self.frame_times)
+        dropped = sum(1 for t in self.frame_times if t > 1.5 * self.budget)
+        frames.update(
+            dropped=dropped,
+            budget_ms=round(self.budget * 1000, 3),
+            fps=round(len(self.frame_times) / duration, 1) if duration else 0.0,
+        )
+        return {
+            "frames": frames,
+            "latency": summarize(self.latencies),
+            "apply": summarize(self.apply_seconds),
+            "messages": {"sent": self.sent, "unapplied": len(self.stamps) + len(self.taken)},
+            "ui_state": dict(self.layout.ui_state.stats),
+            "memory": dict(self.peak, texture_entries=len(self.layout.textures.textures)),
+            "textures": {name: round(value, 3) for name, value in self.layout.textures.stats.items()},
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rate", type=float, default=20.0, help="sensor payloads per second")
+    parser.add_argument("--mood-every", type=int, default=40, help="sensor payloads per mood change (0: never)")
+    parser.add_argument("--chat-rate", type=float, default=0.0, help="chat chunks per second (0: no chat)")
+    parser.add_argument("--chunks", type=int, default=30, help="chunks per streamed reply")
+    parser.add_argument("--duration", type=float, default=10.0)
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds to let startup settle first")
+    parser.add_argument("--fps", type=float, default=60.0, help="frame budget used for dropped frames")
+    parser.add_argument("--wire", choices=("json", "binary"), default="json", help="sensor payload format")
+    parser.add_argument("--window", action="store_true", help="use the real window and GL")
+    parser.add_argument("--report", help="write the JSON report here instead of stdout")
+    parser.add_argument("--verbose", action="store_true", help="keep the UI's own console output")
+    args = parser.parse_args()
+
+    configure_kivy(args.window, args.fps)
+    from kivy.clock import Clock
+    import ui_ux
+
+    ui_ux.BROKER_ADDRESS = ""   # paho refuses it at once: no broker traffic mixes in
+
+    app = ui_ux.PlantApp()
+    state = {}
+
+    def begin(dt):
+        layout = app.main_layout
+        streams = []
+        if args.rate > 0:
+            encode = encode_binary if args.wire == "binary" else encode_json
+            streams.append((args.rate, ui_ux.TOPIC_UI_SENSORS, sensor_payloads(args.mood_every), encode))
+        if args.chat_rate > 0:
+            layout.show_plant_ai()
+            streams.append((args.chat_rate, ui_ux.TOPIC_UI_UPDATE,
+                            chat_payloads(ui_ux.CHAT_CLIENT_ID, args.chunks), encode_json))
+        probe = state["probe"] = Probe(layout, streams, args.fps)
+        probe.start()
+        state["start"] = time.perf_counter()
+        Clock.schedule_once(finish, args.duration)
+
+    def finish(dt):
+        state["probe"].stop()
+        state["duration"] = time.perf_counter() - state["start"]
+        app.stop()
+
+    Clock.schedule_once(begin, args.warmup)
+    output = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(open(os.devnull, "w"))
+    with output:
+        app.run()
+
+    report = {
+        "config": {name: value for name, value in vars(args).items() if name not in ("report", "verbose")},
+        "backend": os.environ.get("KIVY_GL_BACKEND", "default"),
+    }
+    report.update(state["probe"].report(state["duration"]))
+    text = json.dumps(report, indent=2)
+    if args.report:
+        with open(args.report, "w") as f:
+            f.write(text + "\n")
+        frames, latency = report["frames"], report["latency"]
+        print(f"{frames['count']} frames, p95 {frames.get('p95_ms')} ms, {frames['dropped']} dropped; "
+              f"latency p95 {latency.get('p95_ms')} ms. Report: {args.report}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
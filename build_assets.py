@@ -0,0 +1,114 @@
+"""
+Builds the mood image atlases the UI loads instead of the source images.
+
+Each image in images/ is scaled and cropped to every target resolution the
+way the UI's fit_mode "cover" would do it at runtime, then packed into one
+Kivy atlas per resolution. build/assets/manifest.json says which atlas
+entry each mood uses. Needs Pillow (for kivy.atlas); the UI itself doesn't.
+
+    python build_assets.py [--resolution 800x480 ...]
+"""
+import argparse
+import json
+import math
+import os
+import tempfile
+import time
+
+from PIL import Image, ImageOps
+
+# Keep Kivy from treating this script's options as its own
+os.environ.setdefault("KIVY_NO_ARGS", "1")
+from kivy.atlas import Atlas
+
+from mood_assets import (BUILD_DIR, IMAGE_DIR, MANIFEST_PATH, MANIFEST_VERSION,
+                         TARGET_RESOLUTIONS, resolution_name, resolve_mood_assets)
+
+# --- ATLAS SETTINGS ---
+MAX_ATLAS_SIZE = 2048   # largest texture every Pi model's GPU accepts
+ATLAS_PADDING = 2       # kivy.atlas bleeds edge pixels into this to avoid seams
+# --- END ATLAS SETTINGS ---
+
+
+def atlas_page_size(count, size, padding=ATLAS_PADDING, max_size=MAX_ATLAS_SIZE):
+    """
+    The smallest grid page that holds count images of this size (or as many
+    as fit, the rest going to more pages of the same size).
+    """
+    cell_w, cell_h = size[0] + padding, size[1] + padding
+    if cell_w > max_size or cell_h > max_size:
+        raise ValueError(f"{resolution_name(size)} doesn't fit in a {max_size} px atlas")
+    columns = min(count, max_size // cell_w)
+    rows = min(math.ceil(count / columns), max_size // cell_h)
+    return columns * cell_w, rows * cell_h
+
+
+def build_atlas(sources, size, build_dir=BUILD_DIR):
+    """
+    Scales the source images to size and packs them into one atlas.
+    Returns the .atlas file name (relative to build_dir).
+    """
+    name = f"moods-{resolution_name(size)}"
+    with tempfile.TemporaryDirectory() as scaled_dir:
+        scaled = []
+        for source in sources:
+            with Image.open(source) as image:
+                # Same result as fit_mode "cover": fill the screen, crop the rest
+                fitted = ImageOps.fit(image.convert("RGB"), size, Image.LANCZOS)
+            path = os.path.join(scaled_dir, os.path.basename(source))
+            fitted.save(path)
+            scaled.append(path)
+
+        page = atlas_page_size(len(scaled), size)
+        result = Atlas.create(os.path.join(build_dir, name), scaled, page, padding=ATLAS_PADDING)
+    if not result:
+        raise RuntimeError(f"Could not build the {resolution_name(size)} atlas")
+    return name + ".atlas"
+
+
+def build(resolutions=TARGET_RESOLUTIONS, image_dir=IMAGE_DIR, build_dir=BUILD_DIR):
+    start = time.perf_counter()
+    moods = resolve_mood_assets(image_dir)
+    sources = sorted(set(moods.values()))
+
+    os.makedirs(build_dir, exist_ok=True)
+    # Pages from an earlier build would be left behind if there are fewer now
+    for name in os.listdir(build_dir):
+        if name.startswith("moods-"):
+            os.remove(os.path.join(build_dir, name))
+    atlases = []
+    for size in resolutions:
+        atlas = build_atlas(sources, size, build_dir)
+        atlases.append({"size": list(size), "atlas": atlas})
+        print(f"(Assets): Built {atlas} with {len(sources)} images.")
+
+    manifest = {
+        "version": MANIFEST_VERSION,
+        "atlases": atlases,
+        # Atlas entries are named after the source file
+        "moods": {mood: os.path.splitext(os.path.basename(path))[0] for mood, path in moods.items()},
+    }
+    manifest_path = os.path.join(build_dir, os.path.basename(MANIFEST_PATH))
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    print(f"(Assets): Wrote {manifest_path} in {time.perf_counter() - start:.1f} s.")
+    return manifest
+
+
+def parse_resolution(text):
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--resolution", action="append", type=parse_resolution,
+                        help="WIDTHxHEIGHT to build for (repeatable); defaults to the Pi displays")
+    parser.add_argument("--images", default=IMAGE_DIR)
+    parser.add_argument("--out", default=BUILD_DIR)
+    args = parser.parse_args()
+    build(args.resolution or TARGET_RESOLUTIONS, args.images, args.out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+import threading
+
+
+class CancelRegistry:
+    """
+    Keeps track of which chat requests are still wanted, per session.
+
+    Only a session's newest request is worth answering: when a new one is
+    submitted, the one being generated is preempted and any older ones still
+    queued are skipped when their turn comes. cancel() (the UI closing the
+    chat) does the same for everything the session has sent so far.
+
+    submit() returns a sequence number to carry with the request. Once the
+    request is actually queued, supersede() preempts the older ones; if it
+    was rejected, withdraw() forgets it and the older ones carry on. The
+    worker calls start() with the number, which gives a threading.Event that
+    is set when the generation should stop, or None if the request is no
+    longer wanted.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.latest = {}   # session -> seq of the newest submitted request
+        self.floor = {}    # session -> requests with a lower seq are not wanted
+        self.active = {}   # session -> (seq, Event) of the running generation
+
+        self.metrics = {
+            "preempted": 0,   # stopped mid-generation by a newer message
+            "cancelled": 0,   # stopped mid-generation by the UI
+            "skipped": 0,     # never started, already superseded
+        }
+
+    def submit(self, session):
+        with self.lock:
+            seq = self.latest.get(session, 0) + 1
+            self.latest[session] = seq
+            return seq
+
+    def supersede(self, session, seq):
+        """The request is queued: drop everything older from the session."""
+        with self.lock:
+            self.floor[session] = max(self.floor.get(session, 0), seq)
+            active = self.active.get(session)
+            if active is not None and active[0] < seq and not active[1].is_set():
+                active[1].set()
+                self.metrics["preempted"] += 1
+
+    def withdraw(self, session, seq):
+        """The request was never queued: forget it, leaving the older ones be."""
+        with self.lock:
+            if self.latest.get(session) != seq:
+                return
+            if seq > 1 or session in self.active:
+                self.latest[session] = seq - 1
+            else:
+                del self.latest[session]
+                self.floor.pop(session, None)
+
+    def cancel(self, session):
+        """Drops everything the session has asked for so far."""
+        with self.lock:
+            self.floor[session] = self.latest.get(session, 0) + 1
+            active = self.active.get(session)
+            if active is not None and not active[1].is_set():
+                active[1].set()
+                self.metrics["cancelled"] += 1
+                return True
+            return False
+
+    def start(self, session, seq):
+        with self.lock:
+            if seq < self.floor.get(session, 0):
+                self.metrics["skipped"] += 1
+                return None
+            event = threading.Event()
+            self.active[session] = (seq, event)
+            return event
+
+    def finish(self, session, seq):
+        with self.lock:
+            active = self.active.get(session)
+            if active is not None and active[0] == seq:
+                del self.active[session]
+            if self.latest.get(session) == seq and session not in self.active:
+                # Nothing newer is coming, forget the session
+                del self.latest[session]
+                self.floor.pop(session, None)
+
+    def format_metrics(self):
+        with self.lock:
+            return ", ".join(f"{name}={value}" for name, value in self.metrics.items())
@@ -0,0 +1,152 @@
+import json
+import tempfile
+
+# --- CHAT HISTORY SETTINGS ---
+CHAT_WINDOW = 200       # messages kept in memory (and in the list view's data)
+CHAT_LOAD_BATCH = 50    # messages brought back from disk per scroll to the top/bottom
+# --- END CHAT HISTORY SETTINGS ---
+
+
+class ChatHistory:
+    """
+    The chat as a list of message texts, with at most `window` in memory.
+
+    Every finished message is also appended to a spill file, so messages
+    that fall out of the window can be read back when the user scrolls to
+    them: load_older()/load_newer() slide the window over the whole history.
+    A message still being streamed in stays in memory until it's finished
+    (it's written out as it stands if the window has to drop it first).
+
+    Messages are addressed by their index in the whole chat; the window
+    holds indexes start to end - 1. The spill file is a temporary file that
+    goes away when the history is closed.
+    """
+
+    def __init__(self, window=CHAT_WINDOW, spill_file=None):
+        self.window = window
+        self.spill = spill_file if spill_file is not None else tempfile.TemporaryFile()
+        self.offsets = []      # file offset of every message's last written text, or None
+        self.messages = []     # texts of messages start .. end - 1
+        self.start = 0
+        self.unfinished = set()
+
+        self.stats = {
+            "added": 0,
+            "written": 0,
+            "loaded": 0,
+            "dropped": 0,   # left the window
+        }
+
+    @property
+    def total(self):
+        return len(self.offsets)
+
+    @property
+    def end(self):
+        return self.start + len(self.messages)
+
+    def at_end(self):
+        return self.end == self.total
+
+    def has_older(self):
+        return self.start > 0
+
+    def has_newer(self):
+        return self.end < self.total
+
+    def add(self, text, finished=True):
+        """
+        Adds a message and returns its index. If the window is scrolled
+        back, the window doesn't move and the message is only written out.
+        """
+        index = self.total
+        self.offsets.append(None)
+        self.stats["added"] += 1
+        if index == self.end:
+            self.messages.append(text)
+            if not finished:
+                self.unfinished.add(index)
+            else:
+                self._write(index, text)
+            self._trim_front()
+        else:
+            self._write(index, text)
+            if not finished:
+                self.unfinished.add(index)
+        return index
+
+    def set_text(self, index, text, finished=False):
+        """Updates a message (a reply being streamed in)."""
+        if self.start <= index < self.end:
+            self.messages[index - self.start] = text
+        if finished:
+            self.unfinished.discard(index)
+            self._write(index, text)
+        elif not (self.start <= index < self.end):
+            self._write(index, text)
+
+    def text(self, index):
+        if self.start <= index < self.end:
+            return self.messages[index - self.start]
+        return self._read(index)
+
+    def load_older(self, count=CHAT_LOAD_BATCH):
+        """Brings back up to count older messages. Returns how many."""
+        count = min(count, self.start)
+        if not count:
+            return 0
+        older = [self._read(i) for i in range(self.start - count, self.start)]
+        self.messages[:0] = older
+        self.start -= count
+        self.stats["loaded"] += count
+        self._trim_back()
+        return count
+
+    def load_newer(self, count=CHAT_LOAD_BATCH):
+        """Brings back up to count newer messages. Returns how many."""
+        count = min(count, self.total - self.end)
+        if not count:
+            return 0
+        self.messages.extend(self._read(i) for i in range(self.end, self.end + count))
+        self.stats["loaded"] += count
+        self._trim_front()
+        return count
+
+    def _trim_front(self):
+        extra = len(self.messages) - self.window
+        if extra > 0:
+            for i in range(self.start, self.start + extra):
+                if i in self.unfinished:
+                    self._write(i, self.messages[i - self.start])
+            del self.messages[:extra]
+            self.start += extra
+            self.stats["dropped"] += extra
+
+    def _trim_back(self):
+        extra = len(self.messages) - self.window
+        if extra > 0:
+            for i in range(self.end - extra, self.end):
+                if i in self.unfinished:
+                    self._write(i, self.messages[i - self.start])
+            del self.messages[-extra:]
+            self.stats["dropped"] += extra
+
+    def _write(self, index, text):
+        self.spill.seek(0, 2)
+        self.offsets[index] = self.spill.tell()
+        self.spill.write(json.dumps(text).encode() + b"\n")
+        self.stats["written"] += 1
+
+    def _read(self, index):
+        offset = self.offsets[index]
+        if offset is None:
+            return ""
+        self.spill.seek(offset)
+        return json.loads(self.spill.readline())
+
+    def format_stats(self):
+        stats = dict(self.stats, total=self.total, in_memory=len(self.messages))
+        return ", ".join(f"{name}={value}" for name, value in stats.items())
+
+    def close(self):
+        self.spill.close()
@@ -0,0 +1,201 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# --- CONVERSATION SETTINGS ---
+# Sent first on every turn and never changed, so Ollama can reuse the
+# already-processed prefix instead of evaluating it again
+SYSTEM_PROMPT = (
+    "You are a friendly houseplant living in a smart pot. You can feel your "
+    "soil moisture, light, temperature and humidity through sensors. Answer "
+    "in one or two short, cheerful sentences."
+)
+HISTORY_TOKEN_BUDGET = 768   # recent turns kept word for word
+SUMMARY_TOKEN_BUDGET = 160   # everything older is folded into a summary this long
+MIN_RECENT_MESSAGES = 4      # never summarize the last two exchanges
+SESSION_TTL = 30 * 60        # forget a session after this long without a message
+MAX_SESSIONS = 64
+# --- END CONVERSATION SETTINGS ---
+
+DEFAULT_SESSION = "default"
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text):
+    """Rough token count (about 4 characters per token), no tokenizer needed."""
+    return len(text) // 4 + 1
+
+
+def extractive_summary(previous, messages, max_tokens):
+    """
+    Cheap summarizer that needs no model: keeps the first sentence of each
+    turn, trimmed from the front to max_tokens.
+    """
+    lines = [previous] if previous else []
+    for message in messages:
+        first = _SENTENCE_END.split(message["content"].strip(), 1)[0]
+        who = "User" if message["role"] == "user" else "Plant"
+        lines.append(f"{who}: {first}")
+    text = " ".join(lines)
+    limit = max_tokens * 4
+    if len(text) > limit:
+        text = text[-limit:].split(" ", 1)[-1]
+    return text
+
+
+class Conversation:
+    """The state of one chat session: a running summary plus recent turns."""
+
+    def __init__(self):
+        self.summary = ""
+        self.messages = []   # recent {"role", "content"} dicts, oldest first
+        self.tokens = 0      # estimated tokens in self.messages
+        self.last_used = time.monotonic()
+        self.folding = False # a fold is running in the background
+
+
+class ConversationStore:
+    """
+    Per-session chat history with a token budget.
+
+    Every prompt is laid out as
+        [system prompt + summary] [recent turns...] [new user message]
+    The system part only changes when old turns are folded into the summary,
+    and new turns are only ever appended, so between foldings each prompt is
+    the previous one plus the new exchange. Ollama keeps the processed prompt
+    around and only evaluates what's new, which keeps the per-turn cost flat
+    instead of growing with the history.
+
+    When the recent turns go over history_budget, the oldest ones are
+    handed to summarizer(previous_summary, messages, summary_budget) until
+    they're back down to half the budget, so folding happens once every few
+    turns rather than on every one. The summarizer may be slow (a model
+    call), so it runs on a background thread after record() returns and
+    never holds up the reply; turns built while it runs just carry the
+    older messages a little longer.
+
+    Sessions are dropped after ttl seconds without a message, and the least
+    recently used go first beyond max_sessions. Safe to use from several
+    threads, as long as each session is only used by one at a time.
+    """
+
+    def __init__(self, system_prompt=SYSTEM_PROMPT, summarizer=extractive_summary,
+                 history_budget=HISTORY_TOKEN_BUDGET, summary_budget=SUMMARY_TOKEN_BUDGET,
+                 min_recent=MIN_RECENT_MESSAGES, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS):
+        self.system_prompt = system_prompt
+        self.summarizer = summarizer
+        self.history_budget = history_budget
+        self.summary_budget = summary_budget
+        self.min_recent = min_recent
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.lock = threading.Lock()
+        self.sessions = OrderedDict()  # session id -> Conversation
+
+        self.metrics = {
+            "turns": 0,
+            "summaries": 0,
+            "summarized_messages": 0,
+            "expired": 0,
+            "evicted": 0,
+            "prompt_evals": 0,
+            "prompt_tokens": 0,
+            "max_prompt_tokens": 0,
+        }
+
+    def get(self, session_id):
+        """Returns the session's Conversation, starting a new one if needed."""
+        now = time.monotonic()
+        with self.lock:
+            conversation = self.sessions.get(session_id)
+            if conversation is not None and now - conversation.last_used > self.ttl:
+                conversation = None
+                self.metrics["expired"] += 1
+            if conversation is None:
+                conversation = self.sessions[session_id] = Conversation()
+            self.sessions.move_to_end(session_id)
+            conversation.last_used = now
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.metrics["evicted"] += 1
+            return conversation
+
+    def has_history(self, session_id):
+        conversation = self.get(session_id)
+        return bool(conversation.messages or conversation.summary)
+
+    def build_messages(self, session_id, text):
+        """The full message list to send to the model for this turn."""
+        conversation = self.get(session_id)
+        with self.lock:
+            summary, messages = conversation.summary, list(conversation.messages)
+        system = self.system_prompt
+        if summary:
+            system += f"\n\nEarlier in this conversation: {summary}"
+        return ([{"role": "system", "content": system}]
+                + messages
+                + [{"role": "user", "content": text}])
+
+    def record(self, session_id, text, reply, prompt_tokens=None):
+        """
+        Adds a finished exchange to the session. prompt_tokens is the
+        prompt_eval_count Ollama reported for it (tokens it actually had to
+        process), if known.
+        """
+        conversation = self.get(session_id)
+        with self.lock:
+            for role, content in (("user", text), ("assistant", reply)):
+                conversation.messages.append({"role": role, "content": content})
+                conversation.tokens += estimate_tokens(content)
+            self.metrics["turns"] += 1
+            if prompt_tokens is not None:
+                self.metrics["prompt_evals"] += 1
+                self.metrics["prompt_tokens"] += prompt_tokens
+                self.metrics["max_prompt_tokens"] = max(self.metrics["max_prompt_tokens"], prompt_tokens)
+            fold = conversation.tokens > self.history_budget and not conversation.folding
+            if fold:
+                conversation.folding = True
+
+        if fold:
+            threading.Thread(target=self._fold, args=(conversation,),
+                             name="conversation-fold", daemon=True).start()
+
+    def _fold(self, conversation):
+        """Moves the oldest turns into the summary until under half the budget."""
+        try:
+            target = self.history_budget // 2
+            with self.lock:
+                messages = list(conversation.messages)
+                previous = conversation.summary
+                tokens = conversation.tokens
+            folded = 0
+            removed = 0
+            while (tokens - removed > target and len(messages) - folded - 2 >= self.min_recent):
+                # Fold whole exchanges so the history still starts with a user turn
+                removed += estimate_tokens(messages[folded]["content"])
+                removed += estimate_tokens(messages[folded + 1]["content"])
+                folded += 2
+            if not folded:
+                return
+
+            summary = self.summarizer(previous, messages[:folded], self.summary_budget)
+            with self.lock:
+                # Turns recorded meanwhile were appended after these, so the
+                # folded ones are still the first `folded` messages
+                conversation.summary = summary
+                conversation.messages = conversation.messages[folded:]
+                conversation.tokens -= removed
+                self.metrics["summaries"] += 1
+                self.metrics["summarized_messages"] += folded
+        finally:
+            conversation.folding = False
+
+    def format_metrics(self):
+        with self.lock:
+            stats = dict(self.metrics, sessions=len(self.sessions))
+        evals = stats.pop("prompt_evals")
+        total = stats.pop("prompt_tokens")
+        stats["avg_prompt_tokens"] = round(total / evals, 1) if evals else "n/a"
+        return ", ".join(f"{name}={value}" for name, value in stats.items())
@@ -0,0 +1,187 @@
+import re
+import threading
+import time
+from collections import namedtuple
+
+from mood_rules import MOOD_ENGINE, OPERATORS
+
+# --- INTENT TABLE ---
+# Questions matching `pattern` are answered from the latest reading of
+# `field` instead of going to the model. `answers` are checked top to bottom
+# like the mood rules; the first (op, threshold, template) that holds wins,
+# and op None always holds. {value} in the template is the sensor value.
+# The "mood" intent has no field and answers with the mood rule table.
+Intent = namedtuple("Intent", "name pattern field answers")
+
+INTENTS = (
+    Intent("moisture", r"thirsty|water(?:ed)?|moist(?:ure)?|soil", "soil_perc", (
+        ("<", 30, "Yes please! My soil is down to {value:.0f}% moisture."),
+        (">", 80, "No thanks, my soil is soaked at {value:.0f}% moisture."),
+        (None, None, "I'm fine, my soil moisture is {value:.0f}%."),
+    )),
+    Intent("temperature", r"temperature|temp|hot|cold|warm|chilly", "temp", (
+        (">", 30, "It's hot in here, {value:.1f}°C!"),
+        ("<", 12, "Brr, it's only {value:.1f}°C."),
+        (None, None, "It's a comfy {value:.1f}°C."),
+    )),
+    # "Dry" alone is ambiguous ("is the air dry?"), so it's left to "soil"/"air"
+    Intent("humidity", r"humid(?:ity)?|air", "humidity", (
+        ("<", 30, "The air is dry, only {value:.0f}% humidity."),
+        (None, None, "The humidity is {value:.0f}%."),
+    )),
+    Intent("light", r"light|sun(?:light|ny)?|dark|bright|lux", "lux", (
+        ("<", 500, "It's quite dark, just {value:.0f} lux."),
+        (None, None, "I'm getting {value:.0f} lux of light."),
+    )),
+    Intent("mood", r"how are you|how do you feel|how(?:'s| is) it going", None, ()),
+)
+# --- END INTENT TABLE ---
+
+# Only short questions are answered from the table; anything longer is
+# probably conversation and goes to the model
+MAX_ROUTED_WORDS = 12
+QUESTION = re.compile(r"\?\s*$|^\s*(?:are|is|do|does|how|what|what's|whats)\b", re.I)
+# Questions about likes, opinions or stories mention sensor words ("do you
+# like cold weather?") without asking for a reading
+CONVERSATION = re.compile(
+    r"\b(?:like|love|hate|enjoy|prefer|favou?rite|think|about|why|story|stories|joke|poem|song)\b", re.I)
+
+# Readings older than this are not used to answer (seconds)
+SNAPSHOT_MAX_AGE = 120.0
+# How often maybe_report() prints the metrics (seconds)
+REPORT_INTERVAL = 300.0
+
+
+class SensorSnapshot:
+    """The latest reading of each plant, shared with the chat workers."""
+
+    def __init__(self, max_age=SNAPSHOT_MAX_AGE):
+        self.max_age = max_age
+        self.lock = threading.Lock()
+        self.readings = {}    # plant id -> (reading dict, time received)
+        self.latest_plant = None
+
+    def update(self, plant_id, reading, now=None):
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            self.readings[plant_id] = (reading, now)
+            self.latest_plant = plant_id
+
+    def get(self, plant_id=None, now=None):
+        """The plant's reading (the most recent plant's if None), or None if stale."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            entry = self.readings.get(plant_id if plant_id is not None else self.latest_plant)
+        if entry is None or now - entry[1] > self.max_age:
+            return None
+        return entry[0]
+
+
+class IntentRouter:
+    """
+    Answers simple sensor questions ("are you thirsty?", "what's the
+    temperature?") from the latest reading, so they don't need the model.
+
+    All patterns are compiled into one regex with a named group per intent,
+    so routing a message is a single search. route() returns the answer, or
+    None when the message should go to the model (no intent matched, the
+    reading is missing or stale, or the message looks like conversation:
+    not a question, or asking what the plant likes or thinks).
+
+    record_llm() feeds in how long model replies take, which is used to
+    estimate the time each fast-path answer saved.
+    """
+
+    def __init__(self, snapshot, intents=INTENTS, engine=MOOD_ENGINE):
+        for intent in intents:
+            for op, _, _ in intent.answers:
+                if op is not None and op not in OPERATORS:
+                    raise ValueError(f"Unknown operator '{op}' in intent {intent.name}")
+        self.snapshot = snapshot
+        self.engine = engine
+        self.intents = {intent.name: intent for intent in intents}
+        self.pattern = re.compile(
+            "|".join(rf"\b(?P<{i.name}>{i.pattern})\b" for i in intents), re.IGNORECASE)
+
+        self.lock = threading.Lock()
+        self.metrics = {name: 0 for name in self.intents}
+        self.metrics.update({
+            "to_model": 0,
+            "no_reading": 0,
+            "route_seconds": 0.0,
+            "llm_replies": 0,
+            "llm_seconds": 0.0,
+            "saved_seconds": 0.0,
+        })
+        self.last_report = time.monotonic()
+
+    def classify(self, text):
+        """The name of the intent the text asks about, or None."""
+        if len(text.split()) > MAX_ROUTED_WORDS or not QUESTION.search(text):
+            return None
+        if CONVERSATION.search(text):
+            return None
+        match = self.pattern.search(text)
+        return match.lastgroup if match else None
+
+    def route(self, text, plant_id=None):
+        start = time.perf_counter()
+        name = self.classify(text)
+        answer = None
+        if name is not None:
+            reading = self.snapshot.get(plant_id)
+            if reading is not None:
+                answer = self._answer(self.intents[name], reading)
+
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            self.metrics["route_seconds"] += elapsed
+            if answer is None:
+                self.metrics["to_model"] += 1
+                if name is not None:
+                    self.metrics["no_reading"] += 1
+            else:
+                self.metrics[name] += 1
+                if self.metrics["llm_replies"]:
+                    average = self.metrics["llm_seconds"] / self.metrics["llm_replies"]
+                    self.metrics["saved_seconds"] += max(average - elapsed, 0.0)
+        return answer
+
+    def _answer(self, intent, reading):
+        if intent.field is None:
+            return self.engine.evaluate(reading)[1]
+        value = reading.get(intent.field)
+        if value is None:
+            return None  # the sensor failed to read, let the model handle it
+        for op, threshold, template in intent.answers:
+            if op is None or OPERATORS[op](value, threshold):
+                return template.format(value=value)
+        return None
+
+    def record_llm(self, seconds):
+        with self.lock:
+            self.metrics["llm_replies"] += 1
+            self.metrics["llm_seconds"] += seconds
+
+    def format_metrics(self):
+        with self.lock:
+            stats = dict(self.metrics)
+        routed = sum(stats[name] for name in self.intents)
+        total = routed + stats["to_model"]
+        stats["fast_path"] = f"{routed / total:.0%}" if total else "n/a"
+        route_seconds = stats.pop("route_seconds")
+        stats["avg_route_us"] = round(route_seconds / total * 1e6, 1) if total else 0.0
+        llm_seconds = stats.pop("llm_seconds")
+        llm_replies = stats["llm_replies"]
+        stats["avg_llm_ms"] = round(llm_seconds / llm_replies * 1000, 1) if llm_replies else "n/a"
+        stats["saved_seconds"] = round(stats["saved_seconds"], 2)
+        return ", ".join(f"{name}={value}" for name, value in stats.items())
+
+    def maybe_report(self, now=None):
+        """Prints the metrics every REPORT_INTERVAL. Returns True if it did."""
+        now = time.monotonic() if now is None else now
+        if now - self.last_report < REPORT_INTERVAL:
+            return False
+        self.last_report = now
+        print(f"(Intent router): {self.format_metrics()}")
+        return True
@@ -1,11 +1,18 @@
 import serial
 import time
 import sys
+import os
 import paho.mqtt.client as mqtt  # <--- ADDED
 import json                      # <--- ADDED
+from serial_parser import FrameParser, read_frames
+from publish_stage import PublishStage
+from sensor_filters import FilterPipeline
+from read_requests import ManualReadRequests, parse_request_id
+from payload_codec import WireCodec
 
 # --- CONFIGURATION ---
-SERIAL_PORT = '/dev/ttyUSB0'
+# PLANT_SERIAL_PORT lets you point this at serial_sim.py's pseudo-terminal
+SERIAL_PORT = os.environ.get('PLANT_SERIAL_PORT', '/dev/ttyUSB0')
 BAUD_RATE = 115200
 # --- END CONFIGURATION ---
 
@@ -14,6 +21,9 @@ BROKER_ADDRESS = "localhost"
 CLIENT_ID = "plant_sensor_publisher"
 TOPIC_SENSOR_DATA = "plant/sensor/data"
 TOPIC_SENSOR_REQUEST = "plant/sensor/request"
+TOPIC_SENSOR_RESPONSE = "plant/sensor/response"
+# Readings go out in the most compact format the other clients accept
+CODEC = WireCodec(CLIENT_ID)
 # --- END MQTT ---
 
 
@@ -79,8 +89,22 @@ def read_and_parse_data(ser):
         print(f"An error occurred while reading: {e}")
         return None
 
+def offer_frames(frames, filters, publish_stage):
+    """
+    Filters each parsed frame and offers it to the publish stage.
+    Returns (raw, filtered) for the last one, or None if there were none.
+    """
+    last = None
+    for raw_data in frames:
+        print(f"[{time.ctime()}] SUCCESS: {raw_data}")
+        # Smooth out noise/spikes before deciding what to publish
+        filtered_data = filters.apply(raw_data)
+        publish_stage.offer(filtered_data)
+        last = raw_data, filtered_data
+    return last
+
 # <--- ADDED: MQTT Connection Functions ---
-def connect_mqtt(ser_object):
+def connect_mqtt(ser_object, read_requests):
     """Connects to the MQTT broker."""
     
     def on_connect(client, userdata, flags, rc, properties=None):
@@ -88,19 +112,24 @@ def connect_mqtt(ser_object):
             print("Sensor script connected to MQTT Broker.")
             client.subscribe(TOPIC_SENSOR_REQUEST)
             print(f"Subscribed to {TOPIC_SENSOR_REQUEST}")
+            CODEC.announce(client)
         else:
             print(f"Failed to connect to MQTT, return code {rc}")
 
     def on_message(client, userdata, msg):
         """Called when the 'Live Data' button is pressed in the UI."""
-        print(f"Received manual update request on topic {msg.topic}")
+        if CODEC.handle(msg):
+            return
+        request_id = parse_request_id(msg.payload)
+        print(f"Received manual update request {request_id} on topic {msg.topic}")
+        # Don't touch the port from this (network) thread. Queue the request
+        # for the main loop, which owns the port, and wake it up if it is
+        # blocked waiting for data.
+        read_requests.submit(request_id)
         try:
-            # We stored the serial object in 'userdata'
-            # This writes the 'r' character (for 'read') to the ESP32
-            userdata.write(b'r\n') 
-            print("Sent 'r' command to ESP32 for immediate reading.")
+            userdata.cancel_read()
         except Exception as e:
-            print(f"Error writing to serial port: {e}")
+            print(f"Could not wake the serial reader: {e}")
 
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID)
     client.on_connect = on_connect
@@ -108,8 +137,9 @@ def connect_mqtt(ser_object):
     
     # --- This is the key ---
     # We store the 'ser' object in the client's user_data,
-    # so on_message can access it.
+    # so on_message can wake up the reader.
     client.user_data_set(ser_object) 
+    CODEC.attach(client)
     
     try:
         client.connect(BROKER_ADDRESS)
@@ -131,7 +161,8 @@ if __name__ == "__main__":
         sys.exit(1)
         
     # <--- ADDED: Connect to MQTT ---
-    client = connect_mqtt(ser)
+    read_requests = ManualReadRequests()
+    client = connect_mqtt(ser, read_requests)
     
     if not client:
         print("Could not connect to MQTT. Exiting.")
@@ -143,30 +174,89 @@ if __name__ == "__main__":
     client.loop_start() 
 
     print("\n--- Starting to read data (Press Ctrl+C to stop) ---")
+    parser = FrameParser()
+    filters = FilterPipeline()
+    publish_stage = PublishStage()
+    raw_data = None
     try:
         while True:
-            # Read and parse one line of data (this will block until
-            # the ESP32 sends a line or the 2-second timeout hits)
-            data = read_and_parse_data(ser)
-            
-            # If data is not None, the parsing was successful
+            # Manual requests are written here, on the thread that owns the
+            # port. Requests arriving while a read is in flight share it.
+            # Frames already buffered were measured before the 'r' command,
+            # so they are read first and don't count as its answer. (With a
+            # read already in flight no command is written, and whatever is
+            # buffered may be its answer, so it's left to the drain below.)
+            stale = []
+            if read_requests.has_pending() and not read_requests.waiting_on_device():
+                try:
+                    waiting = ser.in_waiting
+                except Exception as e:
+                    print(f"An error occurred while reading: {e}")
+                    waiting = 0
+                if waiting:
+                    stale = read_frames(ser, parser)
+            # Offered before the force below, so they can't use it up
+            latest = offer_frames(stale, filters, publish_stage)
+            if latest:
+                raw_data, filtered_data = latest
+            if read_requests.start(partial=bool(parser.buffer)):
+                # Make sure the reply gets published even if nothing changed
+                publish_stage.request_force()
+                try:
+                    # This writes the 'r' character (for 'read') to the ESP32
+                    ser.write(b'r\n')
+                    print("Sent 'r' command to ESP32 for immediate reading.")
+                except Exception as e:
+                    print(f"Error writing to serial port: {e}")
+
+            # Drain everything the ESP32 has sent so far (this will block
+            # for up to the 2-second timeout if nothing is waiting), so a
+            # backlog after a reconnect is handled in one pass.
+            frames = read_frames(ser, parser)
+            latest = offer_frames(frames, filters, publish_stage)
+            if latest:
+                raw_data, filtered_data = latest
+
+            # Answer manual requests with the reading and the round trip
+            answered = read_requests.complete(len(frames)) if frames else None
+            if answered:
+                request_ids, latency_ms = answered
+                response = {"request_ids": request_ids, "latency_ms": round(latency_ms, 1),
+                            "data": dict(filtered_data, raw=raw_data)}
+                client.publish(TOPIC_SENSOR_RESPONSE, json.dumps(response))
+                print(f"Answered {len(request_ids)} request(s) in {latency_ms:.0f} ms.")
+            expired = read_requests.expire()
+            if expired:
+                response = {"request_ids": expired, "error": "timeout"}
+                client.publish(TOPIC_SENSOR_RESPONSE, json.dumps(response))
+                print(f"ESP32 did not answer {len(expired)} request(s) in time.")
+
+            # Only publish what the stage lets through (coalesced over the
+            # window, unchanged readings suppressed, manual reads forced)
+            data = publish_stage.poll()
             if data:
-                print(f"[{time.ctime()}] SUCCESS: {data}")
-                
                 # <--- ADDED: Publish data to MQTT ---
-                payload = json.dumps(data)
+                # Filtered values at the top level, the latest raw ones alongside
+                payload = CODEC.encode_sensors(data, raw=raw_data)
                 result = client.publish(TOPIC_SENSOR_DATA, payload)
                 
                 if result[0] != 0:
                     print("...Failed to publish to MQTT.")
+            if publish_stage.maybe_report():
+                print(f"(Filters): {filters.stats()}")
+                print(f"(Manual reads): {read_requests.format_counters()}")
                     
     except KeyboardInterrupt:
         print("\nStopping read loop...")
     finally:
         # <--- ADDED: Clean up MQTT ---
+        CODEC.withdraw(client)
         client.loop_stop()
         client.disconnect()
         print("MQTT connection closed.")
+        print(f"(Publish stage): {publish_stage.format_counters()}")
+        print(f"(Filters): {filters.stats()}")
+        print(f"(Manual reads): {read_requests.format_counters()}")
         
         ser.close()
         print("Serial connection closed.")
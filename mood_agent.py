@@ -1,78 +1,116 @@
+import threading
+
 import paho.mqtt.client as mqtt
-import json
-
-# --- IMPORT THE AI FUNCTION FOR MOOD ---
-try:
-    # This assumes get_plant_status is in your ai_agent_test_code file
-    from ai_agent_test_code import get_plant_status
-    print("Successfully imported REAL get_plant_status function.")
-except ImportError:
-    print("WARNING: 'get_plant_status' not found. Using placeholder.")
-    # Create a basic placeholder
-    def get_plant_status(data):
-        # A simple placeholder logic
-        if data.get("soil_perc", 50) < 30:
-            return "thirsty", "I'm so thirsty!"
-        elif data.get("lux", 1000) < 500:
-            return "sad", "It's too dark in here."
-        else:
-            return "happy", "I'm feeling great!"
+
+# The mood comes straight from the rule table. ai_agent_test_code has the
+# same get_plant_status, but importing it would also set up the chat side
+# (Ollama client, response cache file, conversations) in this process.
+from mood_rules import get_plant_status
+from mood_state import MoodTracker
+from payload_codec import WireCodec, decode
+from serial_parser import SENSOR_FIELDS
+from worker_pool import KeyedWorkerPool
 
 # --- MQTT Settings ---
 BROKER_ADDRESS = "localhost"
 CLIENT_ID = "plant_mood_agent"
 TOPIC_SENSOR_DATA = "plant/sensor/data"
-TOPIC_UI_UPDATE = "plant/ui/update"
+TOPIC_POT_SENSOR_DATA = "plant/+/sensor/data"  # from sensor_gateway.py
+TOPIC_UI_UPDATE = "plant/ui/update"      # mood/speech, only on mood changes
+TOPIC_UI_SENSORS = "plant/ui/sensors"    # sensor values, every reading
+# Payloads go out in the most compact format the other clients accept
+CODEC = WireCodec(CLIENT_ID)
+
+DEFAULT_PLANT_ID = "default"
+
+# Mood evaluation runs on this many worker threads, off the MQTT network
+# thread. Each plant has a single "latest reading" slot, so a slow status
+# function drops stale readings instead of queueing them up.
+MOOD_WORKERS = 2
+
+# One hysteresis state machine per plant, so moods only flip on real changes
+MOODS = MoodTracker()
+# How often moods held back only by their dwell time are checked, so they go
+# out when it's over rather than with the next (maybe suppressed) reading
+DWELL_CHECK_INTERVAL = 0.5
+
+
+def plant_id_from_topic(topic):
+    """plant/sensor/data -> 'default', plant/<pot_id>/sensor/data -> pot_id."""
+    parts = topic.split("/")
+    return parts[1] if len(parts) == 4 else DEFAULT_PLANT_ID
+
+def evaluate_mood(plant_id, item):
+    """Runs on a worker thread: get the mood and tell the UI if it changed."""
+    client, sensor_data = item
+
+    # Run the AI "brain" to get mood and speech (may be slow)
+    proposed = get_plant_status(sensor_data)
 
-def connect_mqtt():
+    # Only tell the UI when the mood (or what it says) actually changes
+    changed = MOODS.update(plant_id, sensor_data, proposed)
+    if changed:
+        publish_mood(client, plant_id, changed)
+
+def publish_mood(client, plant_id, changed):
+    """Retained, so a UI that starts later still gets the current mood."""
+    mood, speech_text = changed
+    payload = {"plant_id": plant_id, "mood": mood, "speech": speech_text}
+    client.publish(TOPIC_UI_UPDATE, CODEC.encode_update(payload, retained=True), retain=True)
+    print(f"Mood changed to '{mood}', published to {TOPIC_UI_UPDATE}")
+
+def dwell_loop(client, stop):
+    """Publishes the moods that were only waiting for their dwell time."""
+    while not stop.wait(DWELL_CHECK_INTERVAL):
+        for plant_id, changed in MOODS.due():
+            publish_mood(client, plant_id, changed)
+
+
+def connect_mqtt(pool):
     """Connects to the MQTT broker."""
+
     def on_connect(client, userdata, flags, rc, properties=None):
         if rc == 0:
             print("Mood Agent connected to MQTT Broker.")
             # Subscribe to the raw sensor data
-            client.subscribe(TOPIC_SENSOR_DATA)
-            print(f"Subscribed to {TOPIC_SENSOR_DATA}")
+            client.subscribe([(TOPIC_SENSOR_DATA, 0), (TOPIC_POT_SENSOR_DATA, 0)])
+            print(f"Subscribed to {TOPIC_SENSOR_DATA} and {TOPIC_POT_SENSOR_DATA}")
+            CODEC.announce(client)
         else:
             print(f"Failed to connect, return code {rc}")
 
     def on_message(client, userdata, msg):
         """Called when new sensor data is published from live_sensor.py"""
-        
+        if CODEC.handle(msg):
+            return
         print(f"Received sensor data on {msg.topic}")
         try:
             # 1. Get all sensor data
-            sensor_data = json.loads(msg.payload.decode())
-            print(f"Processing data: {sensor_data}")
-
-            # 2. Run the AI "brain" to get mood and speech
-            mood, speech_text = get_plant_status(sensor_data)
-            
-            # 3. Prepare the full payload for the UI
-            # This payload includes EVERYTHING the UI needs:
-            # - Mood/Speech for the main screen
-            # - All 4 sensor values for the "Live Data" popup
-            payload = {
-                "mood": mood,
-                "speech": speech_text,
-                # Translate keys to match what UI expects
-                "temperature": sensor_data.get("temp"), 
-                "humidity": sensor_data.get("humidity"),
-                "moisture": sensor_data.get("soil_perc"),
-                "light": sensor_data.get("lux")
-            }
-            
-            # 4. Publish the final, full payload to the UI
-            client.publish(TOPIC_UI_UPDATE, json.dumps(payload))
-            print(f"Published FULL UI update to {TOPIC_UI_UPDATE}")
-
-        except json.JSONDecodeError:
-            print(f"Error: Received non-JSON message: {msg.payload}")
+            sensor_data = decode(msg.payload)
+            plant_id = plant_id_from_topic(msg.topic)
+            print(f"Processing data for '{plant_id}': {sensor_data}")
+
+            # 2. The sensor values go out on every reading, on their own
+            # lightweight topic for the "Live Data" popup (same field names
+            # as the sensors use, so nothing needs translating). Only the
+            # filtered values: the UI has no use for the raw ones.
+            readings = {field: sensor_data.get(field) for field in SENSOR_FIELDS}
+            client.publish(TOPIC_UI_SENSORS, CODEC.encode_sensors(readings, plant_id=plant_id))
+
+            # 3. Hand the mood evaluation to the worker pool so this
+            # (network) thread is free again right away
+            pool.submit(plant_id, (client, sensor_data))
+            pool.maybe_report()
+
+        except ValueError as e:
+            print(f"Error: Received unreadable sensor message ({e}): {msg.payload}")
         except Exception as e:
             print(f"Error processing sensor message: {e}")
 
     client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID)
     client.on_connect = on_connect
     client.on_message = on_message
+    CODEC.attach(client)
     
     try:
         client.connect(BROKER_ADDRESS)
@@ -83,18 +121,28 @@ def connect_mqtt():
     return client
 
 def main():
-    client = connect_mqtt()
+    pool = KeyedWorkerPool(evaluate_mood, workers=MOOD_WORKERS, latest_only=True, name="Mood workers")
+    client = connect_mqtt(pool)
     
     if not client:
         print("Exiting due to MQTT connection failure.")
+        pool.shutdown()
         return
 
+    stop_dwell = threading.Event()
+    threading.Thread(target=dwell_loop, args=(client, stop_dwell), name="mood-dwell", daemon=True).start()
+
     print("Starting Mood Agent loop (listening for sensor data)...")
     try:
         client.loop_forever()
     except KeyboardInterrupt:
         print("\nShutting down Mood Agent.")
+        stop_dwell.set()
+        pool.shutdown()
+        CODEC.withdraw(client)
         client.disconnect()
+        print(f"(Mood workers): {pool.format_metrics()}")
+        print(f"(Mood states): {MOODS.format_counters()}")
 
 if __name__ == "__main__":
     main()
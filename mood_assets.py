@@ -0,0 +1,91 @@
+import json
+import os
+
+# --- MOOD ASSET SETTINGS ---
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+IMAGE_DIR = os.path.join(REPO_DIR, "images")
+BUILD_DIR = os.path.join(REPO_DIR, "build", "assets")
+MANIFEST_PATH = os.path.join(BUILD_DIR, "manifest.json")
+MANIFEST_VERSION = 1
+# Screens the pot is built with (width, height): the official 7" Pi display
+# and the common 1024x600 HDMI panels
+TARGET_RESOLUTIONS = [(800, 480), (1024, 600)]
+# Every mood the UI can show; images/<mood>.png is used unless aliased here
+MOODS = ("happy", "thirsty", "sad", "overwatered", "low_light", "high_light",
+         "smart", "touched", "neutral")
+MOOD_ALIASES = {
+    "sad": "scare_of_dark",
+    "overwatered": "scare_of_dark",
+    "low_light": "scare_of_dark",
+    "high_light": "enjoying_sun",
+    "neutral": "happy",
+}
+FALLBACK_MOOD = "neutral"  # shown for moods that have no image
+# --- END MOOD ASSET SETTINGS ---
+
+
+def resolve_mood_assets(image_dir=IMAGE_DIR):
+    """
+    Maps every mood to the image file shown for it. Moods without an image
+    of their own get the fallback mood's, so the UI never has a gap.
+    """
+    resolved = {}
+    for mood in MOODS:
+        path = os.path.join(image_dir, MOOD_ALIASES.get(mood, mood) + ".png")
+        if os.path.exists(path):
+            resolved[mood] = path
+    if FALLBACK_MOOD not in resolved:
+        raise FileNotFoundError(f"No image for the fallback mood '{FALLBACK_MOOD}' in {image_dir}")
+    for mood in MOODS:
+        if mood not in resolved:
+            print(f"(Assets): No image for '{mood}', using the '{FALLBACK_MOOD}' one.")
+            resolved[mood] = resolved[FALLBACK_MOOD]
+    return resolved
+
+
+def resolution_name(size):
+    return f"{size[0]}x{size[1]}"
+
+
+def pick_resolution(resolutions, window_size):
+    """
+    The smallest resolution that covers the window, so nothing is scaled up;
+    the largest one if none does.
+    """
+    sizes = sorted(resolutions, key=lambda size: size[0] * size[1])
+    for size in sizes:
+        if size[0] >= window_size[0] and size[1] >= window_size[1]:
+            return size
+    return sizes[-1]
+
+
+def load_manifest(path=MANIFEST_PATH):
+    """The build's manifest, or None if assets haven't been built."""
+    try:
+        with open(path) as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get("version") != MANIFEST_VERSION:
+        print(f"(Assets): {path} is from another version of the build, ignoring it.")
+        return None
+    return manifest
+
+
+def atlas_image_map(window_size, path=MANIFEST_PATH):
+    """
+    {mood: atlas:// url} for the atlas built closest to window_size, or None
+    if there's no usable build (the UI then falls back to the source images).
+    """
+    manifest = load_manifest(path)
+    if manifest is None:
+        return None
+    atlases = {tuple(entry["size"]): entry["atlas"] for entry in manifest["atlases"]}
+    size = pick_resolution(list(atlases), window_size)
+    atlas = os.path.join(os.path.dirname(path), atlases[size])
+    if not os.path.exists(atlas):
+        print(f"(Assets): {atlas} is missing, ignoring the build.")
+        return None
+    print(f"(Assets): Using the {resolution_name(size)} atlas for a {resolution_name(window_size)} window.")
+    base = os.path.splitext(atlas)[0]
+    return {mood: f"atlas://{base}/{uid}" for mood, uid in manifest["moods"].items()}
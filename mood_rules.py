@@ -0,0 +1,160 @@
+import itertools
+import operator
+from collections import namedtuple
+
+try:
+    import numpy as np
+except ImportError:
+    np = None  # optional (pip install numpy): only evaluate_batch() needs it
+
+# --- MOOD RULE TABLE ---
+# Checked top to bottom, the first rule that matches wins. `default` is the
+# value used when a reading doesn't have the field (or it failed to parse).
+Rule = namedtuple("Rule", "mood speech field op threshold default")
+
+MOOD_RULES = (
+    Rule("thirsty", "I'm so thirsty! My soil is very dry.", "soil_perc", "<", 30, 50),
+    Rule("sad", "It's so dark in here. I need more light.", "lux", "<", 500, 1000),
+    Rule("sad", "Phew, it is getting hot.", "temp", ">", 30, 25),
+)
+DEFAULT_MOOD = ("happy", "I'm feeling great! My light and water are perfect.")
+# --- END MOOD RULE TABLE ---
+
+OPERATORS = {
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+}
+
+
+class MoodRuleEngine:
+    """
+    Evaluates a mood rule table.
+
+    evaluate(data) -> (mood, speech) scores one reading and
+    evaluate_index(data) gives the index of the matching rule (len(rules)
+    for the default mood). evaluate_batch() takes many readings at once
+    (history backfills, many pots) and scores them with NumPy in one pass.
+    All of them give the same answers for the same table.
+
+    evaluate() walks the table, which is a few times slower than an if/elif
+    chain. `chain` can be a hand-written chain for this exact table, used
+    for evaluate() instead; it's checked against the table on readings at,
+    around and missing every threshold, and refused if they disagree.
+    """
+
+    def __init__(self, rules=MOOD_RULES, default=DEFAULT_MOOD, chain=None):
+        for rule in rules:
+            if rule.op not in OPERATORS:
+                raise ValueError(f"Unknown operator '{rule.op}' in rule for {rule.mood}")
+            if not all(isinstance(v, (int, float)) for v in (rule.threshold, rule.default)):
+                raise ValueError(f"Threshold and default must be numbers in rule for {rule.mood}")
+        self.rules = tuple(rules)
+        self.default = default
+        # The rules with their operators looked up, in table order
+        self.checks = tuple((r.field, OPERATORS[r.op], r.threshold, r.default) for r in self.rules)
+        # Index i is rule i, the last entry is the default mood
+        self.outcomes = tuple((r.mood, r.speech) for r in self.rules) + (default,)
+        if chain is not None:
+            self._check_chain(chain)
+            self.evaluate = chain
+
+    def evaluate_index(self, data):
+        for i, (field, compare, threshold, default) in enumerate(self.checks):
+            value = data.get(field)
+            if value is None:
+                value = default  # missing, or failed to parse
+            if compare(value, threshold):
+                return i
+        return len(self.checks)
+
+    def evaluate(self, data):
+        return self.outcomes[self.evaluate_index(data)]
+
+    def _check_chain(self, chain):
+        values = {}
+        for rule in self.rules:
+            values.setdefault(rule.field, {None, "missing"}).update(
+                (rule.threshold - 1, rule.threshold, rule.threshold + 1))
+        fields = list(values)
+        for combination in itertools.product(*(values[field] for field in fields)):
+            data = {field: value for field, value in zip(fields, combination) if value != "missing"}
+            expected = self.outcomes[self.evaluate_index(data)]
+            if chain(data) != expected:
+                raise ValueError(f"{chain.__name__} gives {chain(data)} for {data}, the table {expected}")
+
+    def evaluate_batch(self, readings):
+        """
+        Scores many readings in one call. Returns a NumPy array of outcome
+        indices; look them up with outcome() or moods().
+
+        readings is either a list of reading dicts or a dict of columns
+        ({"soil_perc": [...], "lux": [...], ...}).
+        """
+        if np is None:
+            raise RuntimeError("evaluate_batch needs numpy (pip install numpy)")
+
+        if isinstance(readings, dict):
+            columns = readings
+            size = len(next(iter(columns.values()))) if columns else 0
+        else:
+            size = len(readings)
+            columns = {
+                field: [reading.get(field) for reading in readings]
+                for field in {r.field for r in self.rules}
+            }
+
+        result = np.full(size, len(self.checks), dtype=np.intp)
+        # Walk the table backwards so earlier (higher priority) rules win
+        for i in range(len(self.checks) - 1, -1, -1):
+            field, compare, threshold, default = self.checks[i]
+            column = columns.get(field)
+            if column is None:
+                values = np.full(size, default, dtype=float)
+            else:
+                values = np.asarray(column, dtype=float)  # None becomes nan
+                values = np.where(np.isnan(values), default, values)
+            result[compare(values, threshold)] = i
+        return result
+
+    def outcome(self, index):
+        return self.outcomes[index]
+
+    def moods(self, indices):
+        """Turns evaluate_batch() output into a list of mood names."""
+        names = [mood for mood, _ in self.outcomes]
+        return [names[i] for i in indices]
+
+
+_OUTCOMES = tuple((r.mood, r.speech) for r in MOOD_RULES) + (DEFAULT_MOOD,)
+
+
+def _mood_rules_chain(data):
+    """
+    MOOD_RULES written out as an if/elif chain, for the per-message path.
+    A field that is present but None (failed to parse) can't be compared;
+    such readings are checked again without it, so its default is used.
+    """
+    try:
+        if data.get("soil_perc", 50) < 30:
+            return _OUTCOMES[0]
+        if data.get("lux", 1000) < 500:
+            return _OUTCOMES[1]
+        if data.get("temp", 25) > 30:
+            return _OUTCOMES[2]
+        return _OUTCOMES[3]
+    except TypeError:
+        if None not in data.values():
+            raise
+        return _mood_rules_chain({field: value for field, value in data.items() if value is not None})
+
+
+# Editing MOOD_RULES means editing the chain too; the engine refuses to
+# start if they disagree
+MOOD_ENGINE = MoodRuleEngine(chain=_mood_rules_chain)
+
+
+def get_plant_status(data):
+    """Returns (mood, speech) for one sensor reading using the default table."""
+    return MOOD_ENGINE.evaluate(data)
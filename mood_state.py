@@ -0,0 +1,160 @@
+import threading
+import time
+
+from mood_rules import MOOD_ENGINE, OPERATORS
+
+# --- HYSTERESIS SETTINGS ---
+# A new mood is only entered once the value is this far past its rule's
+# threshold (e.g. thirsty below 30% soil starts below 28%)...
+ENTER_BANDS = {
+    "soil_perc": 2.0,
+    "lux": 20.0,
+    "temp": 0.5,
+}
+# ...and once entered, the rule keeps holding until the value is this far
+# back on the other side (thirsty only ends above 35%)
+EXIT_BANDS = {
+    "soil_perc": 5.0,
+    "lux": 50.0,
+    "temp": 1.0,
+}
+# A mood is kept at least this many seconds before it may change again
+MIN_DWELL = 10.0
+# --- END HYSTERESIS SETTINGS ---
+
+
+class MoodStateMachine:
+    """
+    Mood state for one plant.
+
+    update() takes the reading plus the (mood, speech) the status function
+    proposed and returns (mood, speech) only when the plant really changes
+    mood or what it says, None otherwise. A new mood is held back while:
+      - its rule doesn't hold with the enter band applied, or
+      - the current mood's rule still holds within its exit band and the
+        proposed mood isn't a higher priority one in the rule table, or
+      - the current mood (or speech) is younger than min_dwell seconds.
+    A proposal only held back by the dwell time is kept, and due() returns
+    it as soon as the dwell time is over, even if no new reading comes in.
+    """
+
+    def __init__(self, engine=MOOD_ENGINE, enter_bands=None, exit_bands=None, min_dwell=MIN_DWELL):
+        self.engine = engine
+        self.enter_bands = ENTER_BANDS if enter_bands is None else enter_bands
+        self.exit_bands = EXIT_BANDS if exit_bands is None else exit_bands
+        self.min_dwell = min_dwell
+
+        self.mood = None
+        self.speech = None
+        self.entered_at = None
+        self.waiting = None   # (mood, speech) held back only by the dwell time
+
+        self.counters = {
+            "readings": 0,
+            "transitions": 0,
+            "speech_changes": 0,
+            "held_dwell": 0,
+            "held_enter": 0,
+            "held_hysteresis": 0,
+        }
+
+    def priority(self, mood):
+        """Position of the mood's first rule; unknown and default moods come last."""
+        for i, rule in enumerate(self.engine.rules):
+            if rule.mood == mood:
+                return i
+        return len(self.engine.rules)
+
+    def _matches(self, rule, data, band):
+        """The rule with its threshold moved band outwards (negative: inwards)."""
+        value = data.get(rule.field)
+        if value is None:
+            value = rule.default
+        # Outwards is away from the side the rule matches
+        threshold = rule.threshold + band if rule.op in ("<", "<=") else rule.threshold - band
+        return OPERATORS[rule.op](value, threshold)
+
+    def still_holds(self, data):
+        """True if any rule for the current mood matches with its exit band applied."""
+        return any(self._matches(rule, data, self.exit_bands.get(rule.field, 0.0))
+                   for rule in self.engine.rules if rule.mood == self.mood)
+
+    def clears_enter_band(self, mood, data):
+        """
+        True if a rule for mood matches with its enter band applied. Moods
+        without rules (the default) are entered by leaving the current one.
+        """
+        rules = [rule for rule in self.engine.rules if rule.mood == mood]
+        return not rules or any(self._matches(rule, data, -self.enter_bands.get(rule.field, 0.0))
+                                for rule in rules)
+
+    def update(self, data, proposed, now=None):
+        now = time.monotonic() if now is None else now
+        self.counters["readings"] += 1
+        self.waiting = None
+        mood, speech = proposed
+
+        if self.mood is None:
+            return self._enter(mood, speech, now)
+        if mood == self.mood and speech == self.speech:
+            return None
+        if mood != self.mood:
+            if self.priority(mood) >= self.priority(self.mood) and self.still_holds(data):
+                self.counters["held_hysteresis"] += 1
+                return None
+            if not self.clears_enter_band(mood, data):
+                self.counters["held_enter"] += 1
+                return None
+        if now - self.entered_at < self.min_dwell:
+            self.counters["held_dwell"] += 1
+            self.waiting = proposed
+            return None
+        return self._enter(mood, speech, now)
+
+    def due(self, now=None):
+        """The proposal held back by the dwell time once it's over, or None."""
+        now = time.monotonic() if now is None else now
+        if self.waiting is None or now - self.entered_at < self.min_dwell:
+            return None
+        (mood, speech), self.waiting = self.waiting, None
+        return self._enter(mood, speech, now)
+
+    def _enter(self, mood, speech, now):
+        self.counters["transitions" if mood != self.mood else "speech_changes"] += 1
+        self.mood = mood
+        self.speech = speech
+        self.entered_at = now
+        return mood, speech
+
+
+class MoodTracker:
+    """
+    Keeps one MoodStateMachine per plant id, created on first reading.
+    update() runs on the mood workers and due() on a timer thread, so the
+    machines are only touched with the lock held.
+    """
+
+    def __init__(self, **machine_kwargs):
+        self.machine_kwargs = machine_kwargs
+        self.machines = {}
+        self.lock = threading.Lock()
+
+    def update(self, plant_id, data, proposed, now=None):
+        with self.lock:
+            machine = self.machines.get(plant_id)
+            if machine is None:
+                machine = self.machines[plant_id] = MoodStateMachine(**self.machine_kwargs)
+            return machine.update(data, proposed, now)
+
+    def due(self, now=None):
+        """[(plant_id, (mood, speech))] for the held proposals whose dwell time is over."""
+        with self.lock:
+            ready = [(plant_id, machine.due(now)) for plant_id, machine in self.machines.items()]
+        return [(plant_id, changed) for plant_id, changed in ready if changed]
+
+    def format_counters(self):
+        with self.lock:
+            return "; ".join(
+                f"{plant_id}: " + ", ".join(f"{name}={count}" for name, count in machine.counters.items())
+                for plant_id, machine in self.machines.items()
+            )
@@ -0,0 +1,207 @@
+import json
+import os
+import struct
+import threading
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None  # UI updates then go out as JSON; sensor frames don't need it
+
+# The names the pot's firmware sends are the canonical field names, used
+# unchanged from the serial line to the UI
+from serial_parser import SENSOR_FIELDS
+
+# --- WIRE FORMAT SETTINGS ---
+SCHEMA_VERSION = 1
+FORMAT_SENSOR = "sensor/1"    # fixed struct layout for sensor readings
+FORMAT_MSGPACK = "msgpack"    # general payloads (plant/ui/update)
+FORMAT_JSON = "json"          # always understood; the fallback
+# PLANT_WIRE_FORMAT=json makes this process ask everyone for JSON (it
+# still reads every format)
+WIRE_FORMAT = os.environ.get("PLANT_WIRE_FORMAT", "binary")
+# Every client announces what it accepts here, retained: plant/codec/<client id>
+TOPIC_CODEC = "plant/codec/"
+# --- END WIRE FORMAT SETTINGS ---
+
+# Sensor frame: magic, schema version, flags, then one float64 per field
+# (NaN for a missing value), the raw values if FLAG_RAW, and the plant id
+# (length-prefixed UTF-8) if FLAG_PLANT_ID. 35 bytes without the extras.
+SENSOR_MAGIC = 0xB7   # never the first byte of JSON or of a msgpack map
+FLAG_RAW = 1
+FLAG_PLANT_ID = 2
+MAX_PLANT_ID_BYTES = 255   # longer ids are sent as JSON
+HEADER = struct.Struct("<BBB")
+VALUES = struct.Struct(f"<{len(SENSOR_FIELDS)}d")
+NAN = float("nan")
+JSON_START = frozenset(b"{[ \t\r\n")
+
+
+def local_formats():
+    """The formats this process reads and is willing to be sent."""
+    if WIRE_FORMAT == FORMAT_JSON:
+        return (FORMAT_JSON,)
+    if msgpack is None:
+        return (FORMAT_SENSOR, FORMAT_JSON)
+    return (FORMAT_SENSOR, FORMAT_MSGPACK, FORMAT_JSON)
+
+
+def encode_sensor_frame(data, plant_id=None, raw=None):
+    flags = (FLAG_RAW if raw is not None else 0) | (FLAG_PLANT_ID if plant_id is not None else 0)
+    frame = HEADER.pack(SENSOR_MAGIC, SCHEMA_VERSION, flags)
+    frame += VALUES.pack(*[NAN if data.get(f) is None else data[f] for f in SENSOR_FIELDS])
+    if raw is not None:
+        frame += VALUES.pack(*[NAN if raw.get(f) is None else raw[f] for f in SENSOR_FIELDS])
+    if plant_id is not None:
+        name = plant_id.encode("utf-8")
+        if len(name) > MAX_PLANT_ID_BYTES:
+            raise ValueError(f"plant id is {len(name)} bytes, a sensor frame holds {MAX_PLANT_ID_BYTES}")
+        frame += bytes((len(name),)) + name
+    return frame
+
+
+def _fields(values):
+    return {field: None if value != value else value for field, value in zip(SENSOR_FIELDS, values)}
+
+
+def decode_sensor_frame(payload):
+    try:
+        _, version, flags = HEADER.unpack_from(payload)
+        if version != SCHEMA_VERSION:
+            raise ValueError(f"sensor frame version {version}, expected {SCHEMA_VERSION}")
+        offset = HEADER.size
+        data = _fields(VALUES.unpack_from(payload, offset))
+        offset += VALUES.size
+        if flags & FLAG_RAW:
+            data["raw"] = _fields(VALUES.unpack_from(payload, offset))
+            offset += VALUES.size
+        if flags & FLAG_PLANT_ID:
+            end = offset + 1 + payload[offset]
+            data["plant_id"] = bytes(payload[offset + 1:end]).decode("utf-8")
+    except (struct.error, IndexError, UnicodeDecodeError) as e:
+        raise ValueError(f"bad sensor frame: {e}") from None
+    return data
+
+
+def decode(payload):
+    """
+    Any payload on the plant topics -> dict, whatever format it was sent in
+    (told apart by the first byte). Raises ValueError if it can't be read.
+    """
+    if not payload:
+        raise ValueError("empty payload")
+    first = payload[0]
+    if first == SENSOR_MAGIC:
+        return decode_sensor_frame(payload)
+    if first in JSON_START:
+        return json.loads(payload)
+    if msgpack is None:
+        raise ValueError("binary payload, but msgpack isn't installed")
+    try:
+        return msgpack.unpackb(payload)
+    except Exception as e:
+        raise ValueError(f"bad msgpack payload: {e}") from None
+
+
+class WireCodec:
+    """
+    Encodes one MQTT client's payloads in the most compact format every
+    other client accepts.
+
+    Each client announces the formats it accepts, retained, on
+    plant/codec/<client id> (cleared by its last will). A binary format is
+    only used once at least one other client has announced itself and all
+    of them accept it; until then, or if any of them only takes JSON,
+    payloads go out as JSON. decode() reads every format regardless.
+
+    Only announced clients are asked: a subscriber that never announces
+    (an older client, mosquitto_sub, a dashboard) gets whatever the others
+    agreed on, binary included. If there are such subscribers, start one
+    of the plant clients with PLANT_WIRE_FORMAT=json; its announcement
+    keeps everyone on JSON. Retained payloads are always JSON, as they're
+    also delivered to clients that haven't connected yet.
+    """
+
+    def __init__(self, client_id, accepts=None):
+        self.client_id = client_id
+        self.topic = TOPIC_CODEC + client_id
+        self.accepts = tuple(accepts) if accepts is not None else local_formats()
+        self.lock = threading.Lock()
+        self.peers = {}   # client id -> formats it accepts
+        self.sensor_format = FORMAT_JSON
+        self.update_format = FORMAT_JSON
+
+    def attach(self, client):
+        """Call before connecting."""
+        client.will_set(self.topic, b"", retain=True)
+
+    def announce(self, client):
+        """Call from on_connect: tells the others, and listens to them."""
+        accepts = {"accepts": list(self.accepts), "version": SCHEMA_VERSION}
+        client.publish(self.topic, json.dumps(accepts), retain=True)
+        client.subscribe(TOPIC_CODEC + "+")
+
+    def withdraw(self, client):
+        """Call before a clean disconnect (the last will isn't sent then)."""
+        info = client.publish(self.topic, b"", retain=True)
+        try:
+            info.wait_for_publish(timeout=1.0)
+        except (RuntimeError, ValueError):
+            pass  # not connected: the broker sends the last will instead
+
+    def handle(self, msg):
+        """Takes the message if it's an announcement. Returns True if it was."""
+        if not msg.topic.startswith(TOPIC_CODEC):
+            return False
+        peer = msg.topic[len(TOPIC_CODEC):]
+        if peer == self.client_id:
+            return True
+        accepts = None
+        if msg.payload:
+            try:
+                accepts = frozenset(json.loads(msg.payload)["accepts"])
+            except (ValueError, KeyError, TypeError):
+                print(f"(Codec): Ignoring a bad announcement from {peer}: {msg.payload}")
+        with self.lock:
+            if accepts is None:
+                self.peers.pop(peer, None)
+            else:
+                self.peers[peer] = accepts
+            formats = (self._pick(FORMAT_SENSOR), self._pick(FORMAT_MSGPACK))
+            changed = formats != (self.sensor_format, self.update_format)
+            self.sensor_format, self.update_format = formats
+        if changed:
+            print(f"(Codec): {self.format_stats()}")
+        return True
+
+    def _pick(self, binary_format):
+        if binary_format not in self.accepts or not self.peers:
+            return FORMAT_JSON
+        if all(binary_format in accepts for accepts in self.peers.values()):
+            return binary_format
+        return FORMAT_JSON
+
+    def encode_sensors(self, data, plant_id=None, raw=None):
+        """A sensor reading (canonical field names), for the sensor topics."""
+        if self.sensor_format == FORMAT_SENSOR and (
+                plant_id is None or len(plant_id.encode("utf-8")) <= MAX_PLANT_ID_BYTES):
+            return encode_sensor_frame(data, plant_id, raw)
+        payload = dict(data)
+        if raw is not None:
+            payload["raw"] = raw
+        if plant_id is not None:
+            payload["plant_id"] = plant_id
+        return json.dumps(payload)
+
+    def encode_update(self, data, retained=False):
+        """
+        Any other payload (mood, chat replies) for plant/ui/update. Pass
+        retained=True if it's published retained: it's then always JSON.
+        """
+        if self.update_format == FORMAT_MSGPACK and not retained:
+            return msgpack.packb(data)
+        return json.dumps(data)
+
+    def format_stats(self):
+        return (f"sensors={self.sensor_format}, updates={self.update_format}, "
+                f"peers={len(self.peers)}")
@@ -0,0 +1,115 @@
+import threading
+import time
+
+# --- DEFAULT PUBLISH POLICY ---
+# Minimum seconds between two publishes; readings in between are coalesced
+PUBLISH_WINDOW = 1.0
+# A reading is only "new" if some field moved at least this much since the
+# last published one
+DEADBANDS = {
+    "temp": 0.2,
+    "humidity": 1.0,
+    "soil_perc": 1.0,
+    "lux": 10.0,
+}
+# Publish anyway after this long, so subscribers know the sensor is alive
+MAX_SILENCE = 60.0
+# How often to print the counters (seconds)
+REPORT_INTERVAL = 300.0
+# --- END DEFAULT PUBLISH POLICY ---
+
+
+class PublishStage:
+    """
+    Decides which sensor readings are worth publishing.
+
+    Call offer() for every parsed reading and poll() whenever the loop comes
+    around; poll() returns the reading to publish or None. request_force()
+    is safe to call from the MQTT thread and makes the next reading offered
+    after it go out no matter what.
+    """
+
+    def __init__(self, window=PUBLISH_WINDOW, deadbands=None, max_silence=MAX_SILENCE):
+        self.window = window
+        self.deadbands = DEADBANDS if deadbands is None else deadbands
+        self.max_silence = max_silence
+
+        self.pending = None
+        self.last_published = None
+        self.last_publish_time = None
+        self.force_event = threading.Event()
+        self.force_pending = False
+
+        self.counters = {
+            "received": 0,
+            "published": 0,
+            "forced": 0,
+            "coalesced": 0,
+            "suppressed": 0,
+        }
+        self.last_report = time.monotonic()
+
+    def request_force(self):
+        self.force_event.set()
+
+    def offer(self, reading):
+        self.counters["received"] += 1
+        if self.pending is not None:
+            self.counters["coalesced"] += 1
+        self.pending = reading
+        if self.force_event.is_set():
+            # First reading after a manual request, e.g. the device's reply
+            self.force_event.clear()
+            self.force_pending = True
+
+    def poll(self, now=None):
+        if self.pending is None:
+            return None
+        now = time.monotonic() if now is None else now
+
+        if self.force_pending:
+            self.force_pending = False
+            self.counters["forced"] += 1
+            return self._publish(now)
+
+        if self.last_publish_time is not None and now - self.last_publish_time < self.window:
+            return None  # keep coalescing until the window closes
+
+        if (self.last_published is None
+                or now - self.last_publish_time >= self.max_silence
+                or self._changed(self.pending)):
+            return self._publish(now)
+
+        self.counters["suppressed"] += 1
+        self.pending = None
+        return None
+
+    def _changed(self, reading):
+        last = self.last_published
+        for key, value in reading.items():
+            old = last.get(key)
+            if value is None or old is None:
+                if value is not old:
+                    return True
+            elif abs(value - old) >= self.deadbands.get(key, 0.0):
+                return True
+        return False
+
+    def _publish(self, now):
+        reading, self.pending = self.pending, None
+        self.last_published = reading
+        self.last_publish_time = now
+        self.counters["published"] += 1
+        return reading
+
+    def maybe_report(self, now=None):
+        """Prints the counters every REPORT_INTERVAL. Returns True if it did."""
+        now = time.monotonic() if now is None else now
+        if now - self.last_report < REPORT_INTERVAL:
+            return False
+        self.last_report = now
+        print(f"(Publish stage): {self.format_counters()}")
+        return True
+
+    def format_counters(self):
+        return ", ".join(f"{name}={count}" for name, count in self.counters.items())
@@ -0,0 +1,128 @@
+import json
+import threading
+import time
+import uuid
+
+# Give up on a device read that hasn't produced a frame after this long
+REQUEST_TIMEOUT = 3.0
+
+
+def parse_request_id(payload):
+    """
+    Pulls the request id out of a plant/sensor/request payload.
+
+    New clients send {"request_id": "..."}; older ones send a bare string
+    like "update_now", which gets a fresh id so it can still be answered.
+    """
+    try:
+        data = json.loads(payload.decode())
+        if isinstance(data, dict) and data.get("request_id"):
+            return str(data["request_id"])
+    except (ValueError, UnicodeDecodeError):
+        pass
+    return uuid.uuid4().hex
+
+
+class ManualReadRequests:
+    """
+    Coalesces manual read requests into single device reads.
+
+    submit() may be called from any thread (paho's network thread in
+    practice). Everything else is called by the one thread that owns the
+    serial port:
+      - start() says whether an 'r' command has to be written now
+      - complete() is called with the frames that arrive after it and
+        returns the answer
+      - expire() gives up on reads the device never answered
+    Requests arriving while a read is in flight ride along with it.
+
+    Only frames measured after the command answer it: when a command is
+    about to be written (pending, nothing in flight), the caller drains
+    what the port already holds before start(), and passes partial=True if
+    part of a line was left over, so that line is skipped too.
+    """
+
+    def __init__(self, timeout=REQUEST_TIMEOUT):
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.queued = []
+        self.in_flight = []
+        self.sent_at = None
+        self.skip_frames = 0   # frames still due that predate the command
+
+        self.counters = {
+            "requests": 0,
+            "device_reads": 0,
+            "coalesced": 0,
+            "timeouts": 0,
+        }
+
+    def submit(self, request_id):
+        with self.lock:
+            self.counters["requests"] += 1
+            if self.in_flight or self.queued:
+                self.counters["coalesced"] += 1
+            self.queued.append(request_id)
+
+    def has_pending(self):
+        with self.lock:
+            return bool(self.queued)
+
+    def waiting_on_device(self):
+        """True while an 'r' command is out and hasn't been answered yet."""
+        with self.lock:
+            return bool(self.in_flight)
+
+    def start(self, now=None, partial=False):
+        """
+        Returns True if the caller should write the read command now.
+        partial: the parser holds the start of a line read before the command.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if not self.queued:
+                return False
+            if self.in_flight:
+                # Already waiting on the device, these get the same answer
+                self.in_flight.extend(self.queued)
+                self.queued = []
+                return False
+            self.in_flight, self.queued = self.queued, []
+            self.sent_at = now
+            self.skip_frames = 1 if partial else 0
+            self.counters["device_reads"] += 1
+            return True
+
+    def complete(self, frames=1, now=None):
+        """
+        Called with the number of frames that just arrived. Returns
+        (request_ids, latency_ms) for the read in flight, or None.
+        """
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if not self.in_flight:
+                return None
+            if frames <= self.skip_frames:
+                self.skip_frames -= frames
+                return None
+            self.skip_frames = 0
+            ids = self.in_flight + self.queued
+            self.in_flight, self.queued = [], []
+            latency_ms = (now - self.sent_at) * 1000.0
+            self.sent_at = None
+        return ids, latency_ms
+
+    def expire(self, now=None):
+        """Returns the request ids of a read that timed out, or None."""
+        now = time.monotonic() if now is None else now
+        with self.lock:
+            if not self.in_flight or now - self.sent_at < self.timeout:
+                return None
+            ids, self.in_flight = self.in_flight, []
+            self.sent_at = None
+            self.counters["timeouts"] += 1
+        return ids
+
+    def format_counters(self):
+        with self.lock:
+            return ", ".join(f"{name}={count}" for name, count in self.counters.items())
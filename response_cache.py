@@ -0,0 +1,177 @@
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# --- DEFAULT CACHE SETTINGS ---
+MEMORY_MAX_ENTRIES = 256
+DISK_MAX_ENTRIES = 5000
+TTL_SECONDS = 24 * 3600
+# --- END DEFAULT CACHE SETTINGS ---
+
+_WHITESPACE = re.compile(r"\s+")
+_EDGE_PUNCTUATION = " \t\n.,!?;:'\"()"
+
+
+def normalize_prompt(text):
+    """'  How are you?? ' and 'how are you' should hit the same entry."""
+    return _WHITESPACE.sub(" ", text.lower()).strip(_EDGE_PUNCTUATION)
+
+
+class ResponseCache:
+    """
+    Two-tier cache of chat replies keyed on (model, normalized prompt).
+
+    The memory tier is an LRU of max_entries. The optional disk tier is a
+    small SQLite file that survives restarts, trimmed to disk_max_entries by
+    least recent use. Entries older than ttl seconds count as misses in
+    both tiers. A disk error (locked, full, corrupt file) is logged and
+    counted and the lookup is a miss, so the chat never fails on the cache.
+    Safe to use from several threads.
+    """
+
+    def __init__(self, max_entries=MEMORY_MAX_ENTRIES, ttl=TTL_SECONDS,
+                 disk_path=None, disk_max_entries=DISK_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.disk_max_entries = disk_max_entries
+        self.lock = threading.Lock()
+        self.memory = OrderedDict()  # key -> (reply, created)
+        self.db = None
+
+        self.metrics = {
+            "memory_hits": 0,
+            "disk_hits": 0,
+            "misses": 0,
+            "expired": 0,
+            "evictions": 0,
+            "disk_evictions": 0,
+            "stores": 0,
+            "disk_errors": 0,
+        }
+
+        if disk_path:
+            self._open_disk(disk_path)
+
+    def _open_disk(self, path):
+        try:
+            directory = os.path.dirname(path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                " key TEXT PRIMARY KEY, reply TEXT NOT NULL,"
+                " created REAL NOT NULL, last_used REAL NOT NULL)"
+            )
+            self.db.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+            self.db.commit()
+        except sqlite3.Error as e:
+            print(f"(Response cache): Could not open {path}, memory only: {e}")
+            self.db = None
+
+    @staticmethod
+    def make_key(text, model):
+        return f"{model}\x00{normalize_prompt(text)}"
+
+    def get(self, text, model):
+        """Returns the cached reply or None."""
+        key = self.make_key(text, model)
+        now = time.time()
+        with self.lock:
+            entry = self.memory.get(key)
+            if entry is not None:
+                reply, created = entry
+                if now - created < self.ttl:
+                    self.memory.move_to_end(key)
+                    self.metrics["memory_hits"] += 1
+                    return reply
+                del self.memory[key]
+                self.metrics["expired"] += 1
+
+            if self.db is not None:
+                try:
+                    reply = self._disk_get(key, now)
+                except sqlite3.Error as e:
+                    self._disk_error("read", e)
+                    reply = None
+                if reply is not None:
+                    return reply
+
+            self.metrics["misses"] += 1
+            return None
+
+    def _disk_get(self, key, now):
+        row = self.db.execute(
+            "SELECT reply, created FROM responses WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        reply, created = row
+        if now - created < self.ttl:
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.db.commit()
+            self._remember(key, reply, created)
+            self.metrics["disk_hits"] += 1
+            return reply
+        self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+        self.db.commit()
+        self.metrics["expired"] += 1
+        return None
+
+    def put(self, text, model, reply):
+        key = self.make_key(text, model)
+        now = time.time()
+        with self.lock:
+            self._remember(key, reply, now)
+            self.metrics["stores"] += 1
+            if self.db is not None:
+                try:
+                    self._disk_put(key, reply, now)
+                except sqlite3.Error as e:
+                    self._disk_error("write", e)
+
+    def _disk_put(self, key, reply, now):
+        self.db.execute(
+            "INSERT OR REPLACE INTO responses (key, reply, created, last_used) VALUES (?, ?, ?, ?)",
+            (key, reply, now, now),
+        )
+        trimmed = self.db.execute(
+            "DELETE FROM responses WHERE key IN ("
+            " SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+            (self.disk_max_entries,),
+        )
+        self.metrics["disk_evictions"] += trimmed.rowcount
+        self.db.commit()
+
+    def _disk_error(self, action, error):
+        """Called with the lock held. Undoes the failed statement's changes."""
+        self.metrics["disk_errors"] += 1
+        print(f"(Response cache): Disk {action} failed, using memory only for it: {error}")
+        try:
+            self.db.rollback()
+        except sqlite3.Error:
+            pass
+
+    def _remember(self, key, reply, created):
+        self.memory[key] = (reply, created)
+        self.memory.move_to_end(key)
+        while len(self.memory) > self.max_entries:
+            self.memory.popitem(last=False)
+            self.metrics["evictions"] += 1
+
+    def format_metrics(self):
+        with self.lock:
+            stats = dict(self.metrics, memory_entries=len(self.memory))
+        lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        stats["hit_rate"] = f"{hits / lookups:.0%}" if lookups else "n/a"
+        return ", ".join(f"{name}={value}" for name, value in stats.items())
+
+    def close(self):
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db = None
@@ -0,0 +1,148 @@
+import bisect
+import time
+
+# --- DEFAULT FILTER CONFIG ---
+# Filters run in the order listed, per field. Fields not listed pass through.
+#   ("spike", max_jump, max_rejects)  drop single-sample jumps bigger than
+#                                     max_jump, but accept a level that
+#                                     persists for more than max_rejects samples
+#   ("median", window)                rolling median over the last window samples
+#   ("ewma", alpha)                   exponential moving average
+FILTER_CONFIG = {
+    "soil_perc": [("spike", 15.0, 2), ("median", 5)],
+    "lux": [("spike", 400.0, 2), ("median", 5), ("ewma", 0.3)],
+    "temp": [("ewma", 0.2)],
+    "humidity": [("ewma", 0.2)],
+}
+# --- END DEFAULT FILTER CONFIG ---
+
+
+class EWMA:
+    """Exponential moving average. O(1) time and memory per sample."""
+
+    def __init__(self, alpha):
+        if not 0.0 < alpha <= 1.0:
+            raise ValueError("alpha must be in (0, 1]")
+        self.alpha = alpha
+        self.value = None
+
+    def update(self, x):
+        if self.value is None:
+            self.value = x
+        else:
+            self.value += self.alpha * (x - self.value)
+        return self.value
+
+
+class RollingMedian:
+    """
+    Median of the last `window` samples.
+
+    Keeps a fixed-size ring buffer plus a sorted copy of it, so each sample
+    costs O(window) regardless of how long the stream runs.
+    """
+
+    def __init__(self, window):
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.window = window
+        self.ring = [0.0] * window
+        self.sorted = []
+        self.index = 0
+
+    def update(self, x):
+        if len(self.sorted) == self.window:
+            old = self.ring[self.index]
+            del self.sorted[bisect.bisect_left(self.sorted, old)]
+        self.ring[self.index] = x
+        self.index = (self.index + 1) % self.window
+        bisect.insort(self.sorted, x)
+        n = len(self.sorted)
+        mid = n // 2
+        if n % 2:
+            return self.sorted[mid]
+        return (self.sorted[mid - 1] + self.sorted[mid]) / 2
+
+
+class SpikeRejector:
+    """
+    Holds the last accepted value when a sample jumps more than max_jump.
+
+    If the new level persists for more than max_rejects samples in a row it
+    is a real change, not a spike, and is accepted.
+    """
+
+    def __init__(self, max_jump, max_rejects=2):
+        self.max_jump = max_jump
+        self.max_rejects = max_rejects
+        self.value = None
+        self.rejected = 0
+        self.total_rejected = 0
+
+    def update(self, x):
+        if self.value is None or abs(x - self.value) <= self.max_jump or self.rejected >= self.max_rejects:
+            self.value = x
+            self.rejected = 0
+        else:
+            self.rejected += 1
+            self.total_rejected += 1
+        return self.value
+
+
+FILTER_TYPES = {
+    "ewma": EWMA,
+    "median": RollingMedian,
+    "spike": SpikeRejector,
+}
+
+
+def build_filter(spec):
+    """Turns a config entry like ("median", 5) into a filter instance."""
+    name, *args = spec
+    try:
+        return FILTER_TYPES[name](*args)
+    except KeyError:
+        raise ValueError(f"Unknown filter type '{name}'") from None
+
+
+class FilterPipeline:
+    """
+    Runs each field of a reading through its own chain of filters.
+
+    apply() returns a new dict with the filtered values; the raw reading is
+    left untouched so both can be published. None values skip the chain and
+    stay None. Per-field timing is kept so the cost of each chain can be
+    checked with stats().
+    """
+
+    def __init__(self, config=None):
+        config = FILTER_CONFIG if config is None else config
+        self.chains = {field: [build_filter(spec) for spec in specs] for field, specs in config.items()}
+        self.samples = {field: 0 for field in self.chains}
+        self.seconds = {field: 0.0 for field in self.chains}
+
+    def apply(self, reading):
+        filtered = dict(reading)
+        for field, chain in self.chains.items():
+            value = reading.get(field)
+            if value is None:
+                continue
+            start = time.perf_counter()
+            for f in chain:
+                value = f.update(value)
+            self.seconds[field] += time.perf_counter() - start
+            self.samples[field] += 1
+            filtered[field] = round(value, 2)
+        return filtered
+
+    def stats(self):
+        """Returns {field: {"samples", "avg_us", "spikes_rejected"}}."""
+        out = {}
+        for field, chain in self.chains.items():
+            n = self.samples[field]
+            out[field] = {
+                "samples": n,
+                "avg_us": round(self.seconds[field] / n * 1e6, 2) if n else 0.0,
+                "spikes_rejected": sum(getattr(f, "total_rejected", 0) for f in chain),
+            }
+        return out
@@ -0,0 +1,302 @@
+"""
+Multi-port sensor gateway.
+
+Runs several ESP32 pots from one process: every serial port is registered
+with a single selector loop and all readings go out through one shared
+MQTT connection, each pot on its own topic.
+
+Usage:
+    python sensor_gateway.py pot1=/dev/ttyUSB0 pot2=/dev/ttyUSB1
+"""
+import argparse
+import json
+import selectors
+import socket
+import sys
+import time
+
+import paho.mqtt.client as mqtt
+import serial
+
+from payload_codec import WireCodec
+from publish_stage import PublishStage
+from read_requests import ManualReadRequests, parse_request_id
+from sensor_filters import FilterPipeline
+from serial_parser import FrameParser
+
+# --- CONFIGURATION ---
+BAUD_RATE = 115200
+RECONNECT_INTERVAL = 5.0  # seconds between attempts to reopen a lost port
+# --- END CONFIGURATION ---
+
+# --- MQTT Settings ---
+BROKER_ADDRESS = "localhost"
+CLIENT_ID = "plant_sensor_gateway"
+TOPIC_SENSOR_DATA = "plant/{pot_id}/sensor/data"
+TOPIC_SENSOR_REQUEST = "plant/{pot_id}/sensor/request"
+TOPIC_SENSOR_RESPONSE = "plant/{pot_id}/sensor/response"
+TOPIC_SENSOR_REQUEST_ALL = "plant/sensor/request"
+# --- END MQTT ---
+
+
+class PortState:
+    """Everything the gateway keeps per pot: port, parser, filters, stages, topics."""
+
+    def __init__(self, pot_id, port, baud):
+        self.pot_id = pot_id
+        self.port = port
+        self.baud = baud
+        self.ser = None
+        self.parser = FrameParser()
+        self.filters = FilterPipeline()
+        self.stage = PublishStage()
+        self.read_requests = ManualReadRequests()
+        self.last_raw = None
+        self.last_filtered = None
+        self.topic_data = TOPIC_SENSOR_DATA.format(pot_id=pot_id)
+        self.topic_request = TOPIC_SENSOR_REQUEST.format(pot_id=pot_id)
+        self.topic_response = TOPIC_SENSOR_RESPONSE.format(pot_id=pot_id)
+        self.next_retry = 0.0
+
+    def open(self):
+        try:
+            # timeout=0: reads never block, the selector tells us when to read
+            self.ser = serial.Serial(self.port, self.baud, timeout=0, write_timeout=1)
+            self.ser.reset_input_buffer()
+            print(f"[{self.pot_id}] Connected to {self.port} at {self.baud} baud.")
+            return True
+        except serial.SerialException as e:
+            print(f"[{self.pot_id}] Could not open port {self.port}: {e}")
+            self.ser = None
+            self.next_retry = time.monotonic() + RECONNECT_INTERVAL
+            return False
+
+    def close(self):
+        if self.ser:
+            try:
+                self.ser.close()
+            except Exception:
+                pass
+        self.ser = None
+
+
+class SensorGateway:
+    """Selector loop multiplexing N serial ports onto one MQTT client."""
+
+    def __init__(self, ports, baud=BAUD_RATE):
+        self.ports = {pot_id: PortState(pot_id, port, baud) for pot_id, port in ports.items()}
+        self.selector = selectors.DefaultSelector()
+        self.client = None
+        self.running = False
+
+        # Manual read requests arrive on paho's network thread. They are
+        # queued on the pot's ManualReadRequests and the socketpair wakes
+        # the selector so the write happens on the loop thread that owns
+        # the ports.
+        self.wake_r, self.wake_w = socket.socketpair()
+        self.wake_r.setblocking(False)
+        self.wake_w.setblocking(False)
+        self.selector.register(self.wake_r, selectors.EVENT_READ, None)
+        # Readings go out in the most compact format the other clients accept
+        self.codec = WireCodec(CLIENT_ID)
+
+    # --- MQTT ---
+    def connect_mqtt(self):
+        def on_connect(client, userdata, flags, rc, properties=None):
+            if rc == 0:
+                print("Sensor gateway connected to MQTT Broker.")
+                client.subscribe(TOPIC_SENSOR_REQUEST_ALL)
+                for state in self.ports.values():
+                    client.subscribe(state.topic_request)
+                print(f"Subscribed to request topics for {len(self.ports)} pots")
+                self.codec.announce(client)
+            else:
+                print(f"Failed to connect to MQTT, return code {rc}")
+
+        def on_message(client, userdata, msg):
+            if self.codec.handle(msg):
+                return
+            if msg.topic == TOPIC_SENSOR_REQUEST_ALL:
+                targets = list(self.ports)
+            else:
+                targets = [s.pot_id for s in self.ports.values() if s.topic_request == msg.topic]
+            request_id = parse_request_id(msg.payload)
+            print(f"Received manual update request {request_id} on {msg.topic} for {targets}")
+            for pot_id in targets:
+                self.ports[pot_id].read_requests.submit(request_id)
+            self._wake()
+
+        client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID)
+        client.on_connect = on_connect
+        client.on_message = on_message
+        self.codec.attach(client)
+        try:
+            client.connect(BROKER_ADDRESS)
+        except Exception as e:
+            print(f"Could not connect to MQTT broker: {e}")
+            return None
+        self.client = client
+        return client
+
+    def _wake(self):
+        try:
+            self.wake_w.send(b"\0")
+        except (BlockingIOError, OSError):
+            pass  # already woken, the loop will see the pending requests
+
+    # --- PORTS ---
+    def _register(self, state):
+        if state.open():
+            self.selector.register(state.ser.fileno(), selectors.EVENT_READ, state)
+
+    def _drop(self, state, reason):
+        print(f"[{state.pot_id}] Lost {state.port}: {reason}. Retrying in {RECONNECT_INTERVAL:.0f}s.")
+        try:
+            self.selector.unregister(state.ser.fileno())
+        except (KeyError, ValueError, OSError):
+            pass
+        state.close()
+        state.next_retry = time.monotonic() + RECONNECT_INTERVAL
+
+    def _read_port(self, state):
+        try:
+            chunk = state.ser.read(state.ser.in_waiting or 1)
+        except (serial.SerialException, OSError) as e:
+            self._drop(state, e)
+            return
+        frames = state.parser.feed(chunk)
+        for data in frames:
+            state.last_raw = data
+            state.last_filtered = state.filters.apply(data)
+            state.stage.offer(state.last_filtered)
+        answered = state.read_requests.complete(len(frames)) if frames else None
+        if answered:
+            request_ids, latency_ms = answered
+            response = {"request_ids": request_ids, "latency_ms": round(latency_ms, 1),
+                        "data": dict(state.last_filtered, raw=state.last_raw)}
+            self.client.publish(state.topic_response, json.dumps(response))
+        self._publish_ready(state)
+
+    def _publish_ready(self, state):
+        data = state.stage.poll()
+        if data:
+            payload = self.codec.encode_sensors(data, raw=state.last_raw)
+            result = self.client.publish(state.topic_data, payload)
+            if result[0] != 0:
+                print(f"[{state.pot_id}] ...Failed to publish to MQTT.")
+
+    def _service_requests(self):
+        try:
+            while self.wake_r.recv(64):
+                pass
+        except (BlockingIOError, OSError):
+            pass
+        for state in self.ports.values():
+            if state.ser and state.read_requests.has_pending():
+                try:
+                    waiting = state.ser.in_waiting
+                except (serial.SerialException, OSError) as e:
+                    self._drop(state, e)
+                    continue
+                if waiting:
+                    # Frames already buffered were measured before the 'r'
+                    # command, so they are handled before it's sent
+                    self._read_port(state)
+            if not state.ser or not state.read_requests.start(partial=bool(state.parser.buffer)):
+                continue
+            state.stage.request_force()
+            try:
+                state.ser.write(b'r\n')
+            except (serial.SerialException, OSError) as e:
+                self._drop(state, e)
+
+    def _expire_requests(self, state):
+        expired = state.read_requests.expire()
+        if expired:
+            response = {"request_ids": expired, "error": "timeout"}
+            self.client.publish(state.topic_response, json.dumps(response))
+            print(f"[{state.pot_id}] ESP32 did not answer {len(expired)} request(s) in time.")
+
+    def _retry_closed_ports(self):
+        now = time.monotonic()
+        for state in self.ports.values():
+            if state.ser is None and now >= state.next_retry:
+                self._register(state)
+
+    # --- MAIN LOOP ---
+    def run(self):
+        for state in self.ports.values():
+            self._register(state)
+
+        self.running = True
+        print(f"\n--- Gateway running for {len(self.ports)} pots (Press Ctrl+C to stop) ---")
+        while self.running:
+            for key, _ in self.selector.select(timeout=1.0):
+                if key.data is None:
+                    self._service_requests()
+                else:
+                    self._read_port(key.data)
+            # Flush readings whose coalescing window closed while idle
+            for state in self.ports.values():
+                self._publish_ready(state)
+                self._expire_requests(state)
+                if state.stage.maybe_report():
+                    print(f"[{state.pot_id}] (Filters): {state.filters.stats()}")
+                    print(f"[{state.pot_id}] (Manual reads): {state.read_requests.format_counters()}")
+            self._retry_closed_ports()
+
+    def close(self):
+        self.running = False
+        for state in self.ports.values():
+            state.close()
+        self.selector.close()
+        self.wake_r.close()
+        self.wake_w.close()
+
+
+def parse_port_args(specs):
+    """Turns ['pot1=/dev/ttyUSB0', ...] into {'pot1': '/dev/ttyUSB0', ...}."""
+    ports = {}
+    for spec in specs:
+        pot_id, sep, port = spec.partition("=")
+        if not sep or not pot_id or not port:
+            raise ValueError(f"Expected POT_ID=PORT, got '{spec}'")
+        if "/" in pot_id or "+" in pot_id or "#" in pot_id:
+            raise ValueError(f"Pot id '{pot_id}' can't be used in an MQTT topic")
+        ports[pot_id] = port
+    return ports
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve several plant pots from one process.")
+    parser.add_argument("ports", nargs="+", metavar="POT_ID=PORT")
+    parser.add_argument("--baud", type=int, default=BAUD_RATE)
+    args = parser.parse_args()
+
+    try:
+        ports = parse_port_args(args.ports)
+    except ValueError as e:
+        parser.error(str(e))
+
+    gateway = SensorGateway(ports, args.baud)
+    client = gateway.connect_mqtt()
+    if not client:
+        print("Could not connect to MQTT. Exiting.")
+        sys.exit(1)
+    client.loop_start()
+
+    try:
+        gateway.run()
+    except KeyboardInterrupt:
+        print("\nStopping gateway...")
+    finally:
+        gateway.codec.withdraw(client)
+        client.loop_stop()
+        client.disconnect()
+        print("MQTT connection closed.")
+        gateway.close()
+        print("Serial connections closed.")
+
+
+if __name__ == "__main__":
+    main()
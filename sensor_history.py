@@ -0,0 +1,70 @@
+from array import array
+
+# --- SENSOR HISTORY SETTINGS ---
+HISTORY_SAMPLES = 600   # per field: 10 minutes at one reading a second
+# Starting chart range per field; it widens if a reading falls outside it
+FIELD_RANGES = {
+    "temp": (10.0, 35.0),
+    "humidity": (20.0, 90.0),
+    "soil_perc": (0.0, 100.0),
+    "lux": (0.0, 2000.0),
+}
+# --- END SENSOR HISTORY SETTINGS ---
+
+
+class RingBuffer:
+    """
+    The last `capacity` values of one field, in a preallocated float array.
+
+    Sample n (counting from the first one ever added) lives in slot
+    n % capacity, so adding is O(1) and memory never grows.
+    """
+
+    def __init__(self, capacity=HISTORY_SAMPLES, value_range=(0.0, 1.0)):
+        self.capacity = capacity
+        self.values = array("f", bytes(4 * capacity))
+        self.count = 0
+        self.low, self.high = value_range
+
+    def add(self, value):
+        self.values[self.count % self.capacity] = value
+        self.count += 1
+        if value < self.low:
+            self.low = value
+        elif value > self.high:
+            self.high = value
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def oldest(self):
+        """Sample number of the oldest value still held."""
+        return max(0, self.count - self.capacity)
+
+    def value(self, n):
+        return self.values[n % self.capacity]
+
+    def latest(self):
+        return self.value(self.count - 1) if self.count else None
+
+
+class SensorHistory:
+    """A ring buffer per sensor field, fed with the UI's sensor payloads."""
+
+    def __init__(self, fields=FIELD_RANGES, capacity=HISTORY_SAMPLES):
+        self.buffers = {
+            field: RingBuffer(capacity, value_range) for field, value_range in fields.items()
+        }
+
+    def add(self, data):
+        """Records the fields present in data. Returns True if any were."""
+        added = False
+        for field, buffer in self.buffers.items():
+            value = data.get(field)
+            if value is not None:
+                buffer.add(float(value))
+                added = True
+        return added
+
+    def memory_bytes(self):
+        return sum(buffer.values.itemsize * buffer.capacity for buffer in self.buffers.values())
@@ -0,0 +1,147 @@
+import re
+import time
+
+# --- FRAME LAYOUT ---
+# The ESP32 sends one frame per line, e.g.
+#   temp: 24.5, humidity: 61.0, soil_perc: 43, lux: 812\r\n
+# These are the fields every valid frame must carry.
+SENSOR_FIELDS = ("temp", "humidity", "soil_perc", "lux")
+# --- END FRAME LAYOUT ---
+
+# Drop whatever is buffered if a "line" grows past this without a newline
+# (wrong baud rate, binary garbage, unplugged mid-frame...).
+MAX_FRAME_BYTES = 1024
+
+
+def compile_layout(fields=SENSOR_FIELDS):
+    """
+    Precompiles the field layout into one regex for the firmware's field
+    order (the fast path) plus (name, b"name:") pairs for frames that
+    arrive with fields in a different order.
+    """
+    keys = tuple((name, name.encode("ascii") + b":") for name in fields)
+    pattern = rb" *, *".join(re.escape(key) + rb"([^,]*)" for _, key in keys)
+    return re.compile(rb" *" + pattern), keys
+
+
+class FrameParser:
+    """
+    Streaming parser for the ESP32 serial stream.
+
+    Bytes go in with feed() (or straight from the port with drain()),
+    complete frames come out as dicts. Partial lines stay in a reusable
+    bytearray until the rest of the frame arrives.
+    """
+
+    def __init__(self, fields=SENSOR_FIELDS, max_frame_bytes=MAX_FRAME_BYTES, verbose=True):
+        self.names = tuple(fields)
+        self.frame_re, self.keys = compile_layout(fields)
+        self.max_frame_bytes = max_frame_bytes
+        self.verbose = verbose
+        self.buffer = bytearray()
+
+        # Counters, handy for benchmarks and for spotting a noisy cable
+        self.frames_parsed = 0
+        self.frames_junk = 0
+        self.bytes_dropped = 0
+
+    def feed(self, data):
+        """Appends raw bytes and returns a list of the frames they completed."""
+        if data:
+            self.buffer += data
+        return self._parse_buffer()
+
+    def drain(self, ser):
+        """
+        Reads everything the port has in one go and returns the parsed frames.
+
+        Blocks for at most the port's timeout if nothing is waiting yet,
+        then picks up whatever else arrived in the meantime.
+        """
+        waiting = ser.in_waiting
+        chunk = ser.read(waiting or 1)
+        if chunk and not waiting:
+            # We blocked for the first byte, grab the rest of the burst too
+            waiting = ser.in_waiting
+            if waiting:
+                chunk += ser.read(waiting)
+        return self.feed(chunk)
+
+    def _parse_buffer(self):
+        buf = self.buffer
+        frames = []
+        start = 0
+        end = buf.find(b"\n")
+
+        while end != -1:
+            frame = self._parse_frame(buf, start, end)
+            if frame is not None:
+                frames.append(frame)
+            start = end + 1
+            end = buf.find(b"\n", start)
+
+        if start:
+            # Compact in place so the bytearray keeps its allocation
+            del buf[:start]
+
+        if len(buf) > self.max_frame_bytes:
+            if self.verbose:
+                print(f"(ESP32 JUNK): Dropping {len(buf)} bytes without a line ending.")
+            self.bytes_dropped += len(buf)
+            del buf[:]
+
+        return frames
+
+    def _parse_frame(self, buf, start, end):
+        """Parses buf[start:end] in place. Returns a dict or None for junk."""
+        # The trailing \r is left in place, float() treats it as whitespace
+        match = self.frame_re.match(buf, start, end)
+        if match:
+            try:
+                sensor_data = dict(zip(self.names, map(float, match.groups())))
+            except ValueError:
+                sensor_data = self._parse_fields(buf, start, end)
+        else:
+            if buf[start:end].isspace() or start == end:
+                return None
+            sensor_data = self._parse_fields(buf, start, end)
+            if sensor_data is None:
+                self.frames_junk += 1
+                if self.verbose:
+                    line = buf[start:end].decode("utf-8", errors="ignore").strip()
+                    print(f"(ESP32 JUNK): Ignoring line: {line}")
+                return None
+
+        self.frames_parsed += 1
+        return sensor_data
+
+    def _parse_fields(self, buf, start, end):
+        """Slow path: look each field up on its own. None if one is missing."""
+        sensor_data = {}
+        for name, key in self.keys:
+            value_start = buf.find(key, start, end)
+            if value_start == -1:
+                return None
+            value_start += len(key)
+            value_end = buf.find(b",", value_start, end)
+            if value_end == -1:
+                value_end = end
+            try:
+                # float() accepts bytes and ignores surrounding whitespace
+                sensor_data[name] = float(buf[value_start:value_end])
+            except ValueError:
+                if self.verbose:
+                    raw = buf[value_start:value_end].decode("utf-8", errors="ignore").strip()
+                    print(f"(Warning) Could not parse value: {raw}")
+                sensor_data[name] = None
+        return sensor_data
+
+
+def read_frames(ser, parser):
+    """Convenience wrapper used by the main loops: drain the port, return frames."""
+    try:
+        return parser.drain(ser)
+    except Exception as e:
+        print(f"An error occurred while reading: {e}")
+        time.sleep(0.1)
+        return []
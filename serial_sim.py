@@ -0,0 +1,235 @@
+"""
+Record-and-replay serial simulator.
+
+record: captures the raw ESP32 stream with timestamps to a file.
+    python serial_sim.py record capture.log --port /dev/ttyUSB0 --duration 600
+
+replay: feeds a capture back through a pseudo-terminal so live_sensor.py
+(or sensor_gateway.py) can run without hardware. Answers the 'r' request
+command with the most recent frame, like the firmware does.
+    python serial_sim.py replay capture.log --speed 100 --loop
+    PLANT_SERIAL_PORT=/dev/pts/5 python live_sensor.py
+
+Capture format: one chunk per line, "<seconds since start>\\t<hex bytes>".
+"""
+import argparse
+import os
+import pty
+import select
+import sys
+import time
+import tty
+
+# --- CONFIGURATION ---
+SERIAL_PORT = '/dev/ttyUSB0'
+BAUD_RATE = 115200
+# --- END CONFIGURATION ---
+
+
+# --- CAPTURE FILE ---
+def write_chunk(f, offset, data):
+    f.write(f"{offset:.6f}\t{data.hex()}\n")
+
+
+def load_capture(path):
+    """Returns a list of (offset_seconds, bytes) chunks."""
+    chunks = []
+    with open(path) as f:
+        for line_no, line in enumerate(f, 1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                offset, hex_data = line.split("\t")
+                chunks.append((float(offset), bytes.fromhex(hex_data)))
+            except ValueError:
+                print(f"(Warning) Skipping bad capture line {line_no}")
+    return chunks
+# --- END CAPTURE FILE ---
+
+
+def record(path, port, baud, duration=None):
+    """Captures everything the port sends until Ctrl+C or duration runs out."""
+    import serial  # only needed when talking to real hardware
+
+    ser = serial.Serial(port, baud, timeout=0.5)
+    print(f"Recording {port} at {baud} baud to {path} (Press Ctrl+C to stop)...")
+    total = 0
+    start = time.monotonic()
+    try:
+        with open(path, "w") as f:
+            f.write(f"# port={port} baud={baud} started={time.ctime()}\n")
+            while duration is None or time.monotonic() - start < duration:
+                data = ser.read(ser.in_waiting or 1)
+                if not data:
+                    continue
+                write_chunk(f, time.monotonic() - start, data)
+                total += len(data)
+    except KeyboardInterrupt:
+        print("\nStopping recorder...")
+    finally:
+        ser.close()
+    print(f"Recorded {total} bytes in {time.monotonic() - start:.1f}s.")
+
+
+class Replayer:
+    """Plays a capture into the master side of a pty."""
+
+    def __init__(self, chunks, speed=1.0, loop=False):
+        self.chunks = chunks
+        self.speed = speed  # 0 means as fast as the reader can take it
+        self.loop = loop
+        self.master_fd, self.slave_fd = pty.openpty()
+        tty.setraw(self.slave_fd)
+        self.slave_name = os.ttyname(self.slave_fd)
+
+        self.last_frame = self._first_frame()
+        self.partial = bytearray()
+        self.command_buf = bytearray()
+        self.reads_pending = 0   # 'r' commands waiting for the line being sent to end
+
+        self.bytes_sent = 0
+        self.frames_sent = 0
+        self.requests_answered = 0
+
+    def _first_frame(self):
+        data = b"".join(chunk for _, chunk in self.chunks[:50])
+        for line in data.split(b"\n"):
+            if b"temp:" in line:
+                return line + b"\n"
+        return None
+
+    def _send(self, data):
+        os.write(self.master_fd, data)
+        self.bytes_sent += len(data)
+        self.frames_sent += data.count(b"\n")
+
+        # Remember the last complete frame so 'r' can be answered with it
+        self.partial += data
+        end = self.partial.rfind(b"\n")
+        if end != -1:
+            start = self.partial.rfind(b"\n", 0, end) + 1
+            line = bytes(self.partial[start:end + 1])
+            if b"temp:" in line:
+                self.last_frame = line
+            del self.partial[:end + 1]
+
+    def _handle_commands(self, timeout):
+        """Waits up to timeout for commands from the reader and answers them."""
+        readable, _, _ = select.select([self.master_fd], [], [], max(timeout, 0))
+        if not readable:
+            return
+        try:
+            self.command_buf += os.read(self.master_fd, 256)
+        except OSError:
+            return  # reader not attached yet
+        while b"\n" in self.command_buf:
+            line, _, rest = bytes(self.command_buf).partition(b"\n")
+            self.command_buf = bytearray(rest)
+            if line.strip() == b"r" and self.last_frame:
+                self.reads_pending += 1
+        self._answer_reads()
+
+    def _answer_reads(self):
+        """Answers 'r' commands, but never in the middle of a capture line."""
+        if self.partial:
+            return  # the rest of the line comes with a later chunk
+        while self.reads_pending:
+            self.reads_pending -= 1
+            self._send(self.last_frame)
+            self.requests_answered += 1
+
+    def run(self):
+        start = time.monotonic()
+        passes = 0
+        while True:
+            pass_start = time.monotonic()
+            for offset, data in self.chunks:
+                if self.speed:
+                    due = pass_start + offset / self.speed
+                    while True:
+                        wait = due - time.monotonic()
+                        if wait <= 0:
+                            break
+                        self._handle_commands(wait)
+                else:
+                    self._handle_commands(0)
+                self._send(data)
+                self._answer_reads()
+            passes += 1
+            if not self.loop:
+                break
+        elapsed = time.monotonic() - start
+        return passes, elapsed
+
+    def close(self):
+        os.close(self.master_fd)
+        os.close(self.slave_fd)
+
+
+def replay(path, speed, loop, link=None):
+    chunks = load_capture(path)
+    if not chunks:
+        print(f"No data in capture {path}.")
+        return 1
+
+    replayer = Replayer(chunks, speed, loop)
+    port = replayer.slave_name
+    if link:
+        if os.path.islink(link):
+            os.unlink(link)
+        os.symlink(replayer.slave_name, link)
+        port = link
+    speed_text = f"{speed:g}x" if speed else "max speed"
+    print(f"Replaying {len(chunks)} chunks at {speed_text} on {port}")
+    print(f"Point the reader at it, e.g. PLANT_SERIAL_PORT={port} python live_sensor.py")
+
+    try:
+        passes, elapsed = replayer.run()
+        print(f"Replayed {passes} pass(es) in {elapsed:.2f}s: "
+              f"{replayer.bytes_sent} bytes, {replayer.frames_sent} lines "
+              f"({replayer.frames_sent / max(elapsed, 1e-9):,.0f} lines/sec), "
+              f"{replayer.requests_answered} 'r' requests answered.")
+    except KeyboardInterrupt:
+        print("\nStopping replayer...")
+    finally:
+        replayer.close()
+        if link and os.path.islink(link):
+            os.unlink(link)
+    return 0
+
+
+def parse_speed(text):
+    if text in ("max", "0"):
+        return 0.0
+    speed = float(text.rstrip("x"))
+    if speed <= 0:
+        raise argparse.ArgumentTypeError("speed must be positive or 'max'")
+    return speed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Record or replay the ESP32 serial stream.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rec = sub.add_parser("record", help="capture a real serial port to a file")
+    rec.add_argument("capture")
+    rec.add_argument("--port", default=SERIAL_PORT)
+    rec.add_argument("--baud", type=int, default=BAUD_RATE)
+    rec.add_argument("--duration", type=float, help="stop after this many seconds")
+
+    rep = sub.add_parser("replay", help="replay a capture through a pseudo-terminal")
+    rep.add_argument("capture")
+    rep.add_argument("--speed", type=parse_speed, default=1.0, help="e.g. 1, 100 or max (default 1)")
+    rep.add_argument("--loop", action="store_true", help="repeat the capture until stopped")
+    rep.add_argument("--link", help="also expose the pty under this path, e.g. /tmp/ttyPLANT")
+
+    args = parser.parse_args()
+    if args.command == "record":
+        record(args.capture, args.port, args.baud, args.duration)
+        return 0
+    return replay(args.capture, args.speed, args.loop, args.link)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
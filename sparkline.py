@@ -0,0 +1,102 @@
+from kivy.graphics import Color, Mesh, PopMatrix, PushMatrix, Scale, Translate
+from kivy.properties import ListProperty
+from kivy.uix.widget import Widget
+
+# Sample numbers go into float32 vertices; start over before they lose precision
+REBASE_AFTER = 1_000_000
+
+
+class Sparkline(Widget):
+    """
+    Line chart of a RingBuffer, drawn as one Mesh.
+
+    Vertex slot i holds sample n (n % capacity == i) at x = n, y = value, and
+    line segment i joins slot i to slot i + 1. Adding a sample rewrites one
+    vertex and moves the one "gap" segment that would join the newest value
+    back to the oldest, so the loop over new samples is constant work per
+    sample. Scrolling and fitting the values to the widget are done by the
+    Translate/Scale instructions around the mesh, not by moving vertices.
+
+    Kivy's Mesh can't take part of an array, though: each sync() hands it
+    the whole vertex and index lists, which are copied and uploaded again,
+    O(capacity). So sync() once per frame at most, with everything that
+    came in since (the UI does it from apply_ui_state), not per sample.
+    """
+
+    color = ListProperty([0.2, 0.8, 0.4, 1])
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.ring = None
+        self.synced = 0
+        self.base = 0
+        self.bind(pos=self._update_transform, size=self._update_transform)
+
+    def set_ring(self, ring):
+        """Draws ring from now on. Builds the mesh once for its capacity."""
+        self.ring = ring
+        capacity = ring.capacity
+        self.vertices = [0.0] * (4 * capacity)
+        # Every segment starts out degenerate (hidden) until both ends exist
+        self.indices = [0] * (2 * capacity)
+        for i in range(capacity):
+            self.indices[2 * i] = self.indices[2 * i + 1] = i
+        self.synced = ring.oldest()
+        self.base = self.synced
+
+        self.canvas.clear()
+        with self.canvas:
+            self.color_instruction = Color(*self.color)
+            PushMatrix()
+            self.translate_to_widget = Translate()
+            self.scale = Scale()
+            self.translate_to_data = Translate()
+            self.mesh = Mesh(vertices=self.vertices, indices=self.indices, mode="lines")
+            PopMatrix()
+        self.sync()
+
+    def on_color(self, instance, value):
+        if self.ring is not None:
+            self.color_instruction.rgba = value
+
+    def sync(self):
+        """
+        Draws the samples added to the ring since the last call. Costs
+        O(new samples) in Python plus one O(capacity) mesh upload.
+        """
+        ring = self.ring
+        if ring is None or ring.count == self.synced:
+            return
+        capacity = ring.capacity
+        if ring.count - self.base > REBASE_AFTER:
+            self.set_ring(ring)
+            return
+
+        start = max(self.synced, ring.oldest())
+        for n in range(start, ring.count):
+            slot = n % capacity
+            self.vertices[4 * slot] = n - self.base
+            self.vertices[4 * slot + 1] = ring.value(n)
+            # The segment into this slot from the previous sample is real now
+            prev = (slot - 1) % capacity
+            if n > ring.oldest():
+                self.indices[2 * prev + 1] = slot
+            # ...and the one out of it would wrap around to the oldest sample
+            self.indices[2 * slot] = self.indices[2 * slot + 1] = slot
+        self.synced = ring.count
+
+        self.mesh.vertices = self.vertices
+        self.mesh.indices = self.indices
+        self._update_transform()
+
+    def _update_transform(self, *args):
+        ring = self.ring
+        if ring is None or not ring.count:
+            return
+        span = max(ring.capacity - 1, 1)
+        value_span = (ring.high - ring.low) or 1.0
+        newest = ring.count - 1 - self.base
+        # Newest sample at the right edge, the full capacity across the width
+        self.translate_to_widget.xy = (self.x, self.y)
+        self.scale.xyz = (self.width / span, self.height / value_span, 1)
+        self.translate_to_data.xy = (span - newest, -ring.low)
@@ -0,0 +1,57 @@
+import os
+import threading
+import time
+
+
+def seconds_since_process_start():
+    """
+    How long the process has been running, from /proc (Linux). Falls back
+    to 0, i.e. timing from when this module was imported.
+    """
+    try:
+        with open("/proc/self/stat") as f:
+            # Fields after the "(command)" part; starttime is field 22 overall
+            fields = f.read().rsplit(")", 1)[1].split()
+        with open("/proc/uptime") as f:
+            uptime = float(f.read().split()[0])
+        return max(0.0, uptime - int(fields[19]) / os.sysconf("SC_CLK_TCK"))
+    except (OSError, ValueError, IndexError):
+        return 0.0
+
+
+class StartupTimer:
+    """
+    Named milestones in seconds since the process started, e.g. "imports",
+    "first_frame", "mqtt_connected". Each is recorded once; marks can come
+    from any thread. The report is printed once all the `until` marks are in.
+    """
+
+    def __init__(self, until=("first_frame", "mqtt_connected")):
+        self.origin = time.perf_counter() - seconds_since_process_start()
+        self.until = until
+        self.lock = threading.Lock()
+        self.marks = {}
+        self.reported = False
+
+    def mark(self, name):
+        with self.lock:
+            if name in self.marks:
+                return
+            self.marks[name] = time.perf_counter() - self.origin
+            ready = not self.reported and all(mark in self.marks for mark in self.until)
+            if ready:
+                self.reported = True
+        if ready:
+            print(f"(Startup): {self.format_report()}")
+
+    def format_report(self):
+        with self.lock:
+            marks = sorted(self.marks.items(), key=lambda item: item[1])
+            ready = [self.marks[m] for m in self.until if m in self.marks]
+        parts = [f"{name}={seconds * 1000:.0f}ms" for name, seconds in marks]
+        if len(ready) == len(self.until):
+            parts.append(f"time_to_interactive={max(ready) * 1000:.0f}ms")
+        return ", ".join(parts)
+
+
+STARTUP = StartupTimer()
@@ -0,0 +1,107 @@
+import os
+import time
+from collections import OrderedDict
+
+from kivy.clock import Clock
+from kivy.core.image import Image as CoreImage
+
+# Decoded RGBA textures kept in memory (bytes). A 1024x1024 image is 4 MB.
+TEXTURE_CACHE_BYTES = 64 * 1024 * 1024
+
+
+class TextureCache:
+    """
+    Mood images decoded once and kept as textures, so a transition only
+    swaps textures instead of reading and decoding the file again.
+
+    Least recently used textures are evicted once the decoded size goes over
+    max_bytes. Files that failed to load are remembered and not retried.
+    Paths can also be atlas:// urls (see build_assets.py); Kivy then loads
+    the whole atlas on first use and the entries are regions of it.
+    Must be used from the Kivy main thread (textures live on the GPU).
+    """
+
+    def __init__(self, max_bytes=TEXTURE_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.textures = OrderedDict()  # path -> (texture, size in bytes)
+        self.missing = set()
+        self.bytes = 0
+
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "loads": 0,
+            "failures": 0,
+            "evictions": 0,
+            "load_ms": 0.0,
+            "max_load_ms": 0.0,
+        }
+
+    def get(self, path):
+        """Returns the texture for path, loading it if needed, or None."""
+        entry = self.textures.get(path)
+        if entry is not None:
+            self.textures.move_to_end(path)
+            self.stats["hits"] += 1
+            return entry[0]
+        self.stats["misses"] += 1
+        return self._load(path)
+
+    def _load(self, path):
+        if path in self.missing:
+            return None
+        if not path.startswith("atlas://") and not os.path.exists(path):
+            print(f"(Texture cache): Image file not found: {path}")
+            self.missing.add(path)
+            self.stats["failures"] += 1
+            return None
+
+        start = time.perf_counter()
+        try:
+            texture = CoreImage(path).texture
+        except Exception as e:
+            print(f"(Texture cache): Could not load {path}: {e}")
+            self.missing.add(path)
+            self.stats["failures"] += 1
+            return None
+        load_ms = (time.perf_counter() - start) * 1000
+        self.stats["loads"] += 1
+        self.stats["load_ms"] += load_ms
+        self.stats["max_load_ms"] = max(self.stats["max_load_ms"], load_ms)
+
+        size = texture.width * texture.height * 4
+        self.textures[path] = (texture, size)
+        self.bytes += size
+        while self.bytes > self.max_bytes and len(self.textures) > 1:
+            _, (_, evicted_size) = self.textures.popitem(last=False)
+            self.bytes -= evicted_size
+            self.stats["evictions"] += 1
+        return texture
+
+    def preload(self, paths, on_done=None):
+        """
+        Loads the given images in the background of the UI, one per frame,
+        so startup isn't blocked and nothing stutters. Duplicates are loaded
+        once; anything asked for before its turn is loaded on first use.
+        """
+        pending = [p for p in dict.fromkeys(paths) if p not in self.textures]
+
+        def load_next(dt):
+            while pending:
+                path = pending.pop(0)
+                if path not in self.textures and path not in self.missing:
+                    self._load(path)
+                    Clock.schedule_once(load_next)
+                    return
+            print(f"(Texture cache): Preload done. {self.format_stats()}")
+            if on_done:
+                on_done()
+
+        Clock.schedule_once(load_next)
+
+    def format_stats(self):
+        stats = dict(self.stats, entries=len(self.textures), mb=round(self.bytes / 2 ** 20, 1))
+        loads = stats["loads"]
+        stats["avg_load_ms"] = round(stats.pop("load_ms") / loads, 1) if loads else 0.0
+        stats["max_load_ms"] = round(stats["max_load_ms"], 1)
+        return ", ".join(f"{name}={value}" for name, value in stats.items())
@@ -0,0 +1,64 @@
+import threading
+
+# Keys that describe the current state: only the newest value matters
+STATE_KEYS = ("mood", "temp", "humidity", "soil_perc", "lux")
+# A payload with one of these is (part of) a chat reply and must not be merged
+CHAT_KEYS = ("speech", "message_id")
+
+
+class UiStateStore:
+    """
+    Collects UI payloads from the MQTT thread until the next frame.
+
+    State values (mood, sensor readings) are merged, so a burst of updates
+    costs one widget update per frame with the newest values. Chat pieces
+    are kept in arrival order, since every one of them has to be shown.
+
+    put() returns True when the store was empty, i.e. when the caller needs
+    to schedule a flush; take() hands over everything collected so far.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.state = {}
+        self.chat = []
+
+        self.stats = {
+            "messages": 0,
+            "flushes": 0,
+            "merged": 0,        # state values overwritten before they were shown
+            "max_batch": 0,
+        }
+        self.batch = 0
+
+    def put(self, data):
+        state = {key: data[key] for key in STATE_KEYS if data.get(key) is not None}
+        chat = None
+        if any(key in data for key in CHAT_KEYS):
+            chat = {key: value for key, value in data.items() if key not in STATE_KEYS}
+
+        with self.lock:
+            was_empty = not self.batch
+            self.batch += 1
+            self.stats["messages"] += 1
+            self.stats["merged"] += sum(1 for key in state if key in self.state)
+            self.state.update(state)
+            if chat is not None:
+                self.chat.append(chat)
+            return was_empty
+
+    def take(self):
+        """Returns (state, chat payloads) and empties the store."""
+        with self.lock:
+            state, chat = self.state, self.chat
+            self.state, self.chat = {}, []
+            self.stats["flushes"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], self.batch)
+            self.batch = 0
+            return state, chat
+
+    def format_stats(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats["avg_batch"] = round(stats["messages"] / stats["flushes"], 2) if stats["flushes"] else 0.0
+        return ", ".join(f"{name}={value}" for name, value in stats.items())
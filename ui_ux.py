@@ -1,3 +1,6 @@
+# First, so the import time of everything else shows up in the startup report
+from startup_timing import STARTUP
+
 from kivy.app import App
 from kivy.lang import Builder
 from kivy.uix.floatlayout import FloatLayout
@@ -10,11 +13,24 @@ from kivy.uix.modalview import ModalView
 from kivy.uix.spinner import Spinner
 import os
 import json
+import time
+import uuid
 
 # --- VOICE & MQTT IMPORTS ---
 import paho.mqtt.client as mqtt
 
+from chat_history import ChatHistory
+from sensor_history import SensorHistory
+from sparkline import Sparkline
+from texture_cache import TextureCache
+from ui_state import UiStateStore
+from video_decode import can_play
+from mood_assets import atlas_image_map
+from payload_codec import WireCodec, decode
+from video_player import VideoPlayer, format_playback_stats
+
 # --- NO AI OR SENSOR IMPORTS HERE ---
+STARTUP.mark("imports")
 
 KV_STRING = """
 <MainLayout>:
@@ -65,6 +81,20 @@ KV_STRING = """
         pos_hint: {'right': 0.98, 'y': 0.02}
         on_press: root.show_plant_info()
         background_color: 0.2, 0.7, 0.3, 0.9
+"""
+Builder.load_string(KV_STRING)
+STARTUP.mark("main_kv")
+
+# Popup rules are only loaded the first time each popup is opened
+POPUP_KV = {
+    "PlantAiPopup": """
+<ChatLine@Label>:
+    markup: True
+    font_size: '16sp'
+    size_hint_y: None
+    height: self.texture_size[1]
+    text_size: self.width, None
+    padding: '0dp', '2dp'
 
 # --- MODIFIED: Changed from Popup to ModalView ---
 <PlantAiPopup>:
@@ -97,17 +127,19 @@ KV_STRING = """
                 size: '40dp', '40dp'
                 on_press: root.dismiss()
         
-        ScrollView:
+        # Only the lines on screen are rendered; see PlantAiPopup.history
+        RecycleView:
+            id: chat_history
             size_hint: 1, 1
-            scroll_y: 0 
-            Label:
-                id: chat_history
-                text: "[color=AAAAAA]Chat history will appear here...[/color]\\n"
-                markup: True
-                font_size: '16sp'
+            scroll_y: 0
+            viewclass: 'ChatLine'
+            on_scroll_y: root.on_chat_scroll(self.scroll_y)
+            RecycleBoxLayout:
+                orientation: 'vertical'
+                default_size: None, None
+                default_size_hint: 1, None
                 size_hint_y: None
-                height: self.texture_size[1]
-                text_size: self.width, None
+                height: self.minimum_height
                 padding: '10dp', '10dp'
                 
         BoxLayout:
@@ -131,7 +163,8 @@ KV_STRING = """
                 text: "Mic"
                 size_hint_x: 0.15
                 on_press: root.mic_pressed()
-
+""",
+    "PlantInfoPopup": """
 # --- MODIFIED: Changed from Popup to ModalView ---
 <PlantInfoPopup>:
     id: info_popup
@@ -192,7 +225,8 @@ KV_STRING = """
                     "Use any well-draining potting mix.\\n\\n" + \\
                     "[b]Toxicity:[/b]\\n" + \\
                     "Mildly toxic to pets and humans if ingested. Keep out of reach."
-
+""",
+    "LiveDataPopup": """
 # --- MODIFIED: Changed from Popup to ModalView ---
 <LiveDataPopup>:
     id: data_popup
@@ -226,36 +260,152 @@ KV_STRING = """
             orientation: 'vertical'
             padding: '10dp'
             spacing: '15dp'
-            Label:
-                id: temp_label
-                text: "Temperature: -- °C"
-                font_size: '18sp'
-            Label:
-                id: humidity_label
-                text: "Humidity: -- %"
-                font_size: '18sp'
-            Label:
-                id: light_label
-                text: "Ambient Light: -- lux"
-                font_size: '18sp'
-            Label:
-                id: moisture_label
-                text: "Soil Moisture: -- %"
-                font_size: '18sp'
-""" 
-Builder.load_string(KV_STRING)
+            SensorRow:
+                Label:
+                    id: temp_label
+                    text: "Temperature: -- °C"
+                    font_size: '18sp'
+                Sparkline:
+                    id: temp_chart
+                    color: 1, 0.5, 0.2, 1
+            SensorRow:
+                Label:
+                    id: humidity_label
+                    text: "Humidity: -- %"
+                    font_size: '18sp'
+                Sparkline:
+                    id: humidity_chart
+                    color: 0.4, 0.7, 1, 1
+            SensorRow:
+                Label:
+                    id: light_label
+                    text: "Ambient Light: -- lux"
+                    font_size: '18sp'
+                Sparkline:
+                    id: lux_chart
+                    color: 1, 0.9, 0.3, 1
+            SensorRow:
+                Label:
+                    id: moisture_label
+                    text: "Soil Moisture: -- %"
+                    font_size: '18sp'
+                Sparkline:
+                    id: soil_perc_chart
+                    color: 0.3, 0.9, 0.5, 1
+
+<SensorRow@BoxLayout>:
+    spacing: '10dp'
+""",
+}
 
 # --- MQTT Settings ---
 BROKER_ADDRESS = "localhost"
 CLIENT_ID = "plant_ui"
 TOPIC_UI_UPDATE = "plant/ui/update"
+TOPIC_UI_SENSORS = "plant/ui/sensors"
 TOPIC_SENSOR_REQUEST = "plant/sensor/request"
 TOPIC_CHAT_REQUEST = "plant/chat/request"
+TOPIC_CHAT_CANCEL = "plant/chat/cancel"
+# Sent with every chat request so replies meant for another UI can be ignored
+CHAT_CLIENT_ID = f"{CLIENT_ID}-{uuid.uuid4().hex[:8]}"
+
+_loaded_popup_kv = set()
+
+def load_popup_kv(name):
+    """Loads a popup's KV rules the first time it's needed."""
+    if name in _loaded_popup_kv:
+        return
+    start = time.perf_counter()
+    Builder.load_string(POPUP_KV[name])
+    _loaded_popup_kv.add(name)
+    print(f"(Startup): Loaded KV for {name} in {(time.perf_counter() - start) * 1000:.1f} ms")
 
 
 # --- MODIFIED: Changed from Popup to ModalView ---
 class PlantAiPopup(ModalView):
     main_layout = ObjectProperty(None)
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        # One entry per chat line, only a window of them in memory (older
+        # ones are read back from disk on scroll). Replies still being
+        # streamed in are lines too: message_id -> {"index", "text",
+        # "next_seq", "early"}
+        self.history = ChatHistory()
+        self.streams = {}
+        self.waiting = set()  # request ids sent and not answered yet
+        self.append_chat_line("[color=AAAAAA]Chat history will appear here...[/color]")
+
+    def append_chat_line(self, line, finished=True):
+        """Adds a line and returns its index in the history."""
+        start = self.history.start
+        following = self.history.at_end()
+        index = self.history.add(line, finished)
+        if following:
+            if self.history.start != start:
+                self._show_history()
+            else:
+                self.ids.chat_history.data.append({"text": line})
+        return index
+
+    def set_chat_line(self, index, line, finished=False):
+        self.history.set_text(index, line, finished)
+        if self.history.start <= index < self.history.end:
+            self.ids.chat_history.data[index - self.history.start] = {"text": line}
+
+    def _show_history(self):
+        self.ids.chat_history.data = [{"text": text} for text in self.history.messages]
+
+    def on_chat_scroll(self, scroll_y):
+        """Slides the history window when the list is scrolled to either end."""
+        if scroll_y >= 1 and self.history.has_older():
+            loaded = self.history.load_older()
+            self._show_history()
+            # Stay roughly on the line that was at the top
+            self.ids.chat_history.scroll_y = 1 - loaded / len(self.history.messages)
+        elif scroll_y <= 0 and self.history.has_newer():
+            loaded = self.history.load_newer()
+            self._show_history()
+            self.ids.chat_history.scroll_y = loaded / len(self.history.messages)
+
+    def add_reply_chunk(self, data):
+        """Adds one streamed piece of a reply, in sequence order, in place."""
+        message_id = data["message_id"]
+        stream = self.streams.get(message_id)
+        if stream is None:
+            stream = self.streams[message_id] = {"index": None, "text": "", "next_seq": 0, "early": {}}
+
+        delta = data.get("delta")
+        if delta is not None:
+            # MQTT doesn't promise order across reconnects, so hold early pieces
+            stream["early"][data.get("seq", stream["next_seq"])] = delta
+            while stream["next_seq"] in stream["early"]:
+                stream["text"] += stream["early"].pop(stream["next_seq"])
+                stream["next_seq"] += 1
+
+        if data.get("done"):
+            # The last message has the whole reply, which covers any lost piece
+            text = data.get("speech") or stream["text"]
+            del self.streams[message_id]
+            self.waiting.discard(message_id)
+            line = f"[color=00FF7F]PlantAI:[/color] {text}"
+            if data.get("cancelled"):
+                # Replaced by a newer message: keep what arrived, if anything
+                if not text:
+                    if stream["index"] is not None:
+                        self.set_chat_line(stream["index"], "", finished=True)
+                    return
+                line += "[color=AAAAAA]...[/color]"
+            if stream["index"] is None:
+                self.append_chat_line(line)
+            else:
+                self.set_chat_line(stream["index"], line, finished=True)
+        elif stream["text"]:
+            line = f"[color=00FF7F]PlantAI:[/color] {stream['text']}"
+            if stream["index"] is None:
+                stream["index"] = self.append_chat_line(line, finished=False)
+            else:
+                self.set_chat_line(stream["index"], line)
     
     def on_open(self):
         # --- MODIFIED: Schedule focus to fix keyboard ---
@@ -268,10 +418,23 @@ class PlantAiPopup(ModalView):
         
     def on_dismiss(self):
         """Called when the popup is closed."""
+        print(f"(Chat history): {self.history.format_stats()}")
         if self.main_layout:
+            # Nobody will read the reply now, so stop the model working on it
+            if self.waiting and self.main_layout.mqtt_client:
+                cancel = {"client_id": CHAT_CLIENT_ID}
+                self.main_layout.mqtt_client.publish(TOPIC_CHAT_CANCEL, json.dumps(cancel))
             self.main_layout.ai_popup = None
             # --- MODIFIED: Clear the focus flag ---
             self.main_layout.popup_is_open = False
+        # The popup is reused: replies still streaming won't reach it any more,
+        # so keep their lines as they stand for the next time it's opened
+        for stream in self.streams.values():
+            if stream["index"] is not None:
+                line = f"[color=00FF7F]PlantAI:[/color] {stream['text']}[color=AAAAAA]...[/color]"
+                self.set_chat_line(stream["index"], line, finished=True)
+        self.streams.clear()
+        self.waiting.clear()
 
     def send_chat_message(self, text_input_widget):
         message = text_input_widget.text
@@ -279,24 +442,26 @@ class PlantAiPopup(ModalView):
             print("No message to send.")
             return
 
-        self.ids.chat_history.text += f"[color=3399FF]You:[/color] {message}\n"
+        self.append_chat_line(f"[color=3399FF]You:[/color] {message}")
         
         if self.main_layout and self.main_layout.mqtt_client:
             try:
                 print(f"Sending chat message: '{message}'")
-                self.main_layout.mqtt_client.publish(TOPIC_CHAT_REQUEST, message)
+                request = {"request_id": uuid.uuid4().hex, "client_id": CHAT_CLIENT_ID, "text": message}
+                self.main_layout.mqtt_client.publish(TOPIC_CHAT_REQUEST, json.dumps(request))
+                self.waiting.add(request["request_id"])
                 text_input_widget.text = ""
                 # --- MODIFIED: Re-focus after sending ---
                 self.ids.text_input.focus = True
             except Exception as e:
                 print(f"CRITICAL ERROR: Failed to publish MQTT message: {e}")
-                self.ids.chat_history.text += f"[color=FF0000]Error: Could not send message.[/color]\n"
+                self.append_chat_line("[color=FF0000]Error: Could not send message.[/color]")
         else:
             print("ERROR: Cannot send message. No main_layout or mqtt_client found.")
 
     def mic_pressed(self):
         print("Mic button pressed! (Voice input not implemented yet)")
-        self.ids.chat_history.text += f"[color=AAAAAA]Voice input is not connected yet...[/color]\n"
+        self.append_chat_line("[color=AAAAAA]Voice input is not connected yet...[/color]")
 
 
 # --- MODIFIED: Changed from Popup to ModalView ---
@@ -311,6 +476,32 @@ class PlantInfoPopup(ModalView):
 # --- MODIFIED: Changed from Popup to ModalView ---
 class LiveDataPopup(ModalView):
     main_layout = ObjectProperty(None)
+
+    def show_history(self, history):
+        """Draws the history kept so far and the latest values right away."""
+        for field, ring in history.buffers.items():
+            chart = self.ids[f"{field}_chart"]
+            if chart.ring is ring:
+                chart.sync()  # reopened: only draw what came in since
+            else:
+                chart.set_ring(ring)
+        latest = {field: ring.latest() for field, ring in history.buffers.items()}
+        self.set_labels(latest.get("temp"), latest.get("humidity"),
+                        latest.get("lux"), latest.get("soil_perc"))
+
+    def sync_charts(self):
+        for field in ("temp", "humidity", "lux", "soil_perc"):
+            self.ids[f"{field}_chart"].sync()
+
+    def set_labels(self, temperature, humidity, light, moisture):
+        if temperature is not None:
+            self.ids.temp_label.text = f"Temperature: {temperature:.1f} °C"
+        if humidity is not None:
+            self.ids.humidity_label.text = f"Humidity: {humidity:.1f} %"
+        if light is not None:
+            self.ids.light_label.text = f"Ambient Light: {int(light)} lux"
+        if moisture is not None:
+            self.ids.moisture_label.text = f"Soil Moisture: {int(moisture)} %"
     
     def on_dismiss(self):
         print("Live Data popup closed.")
@@ -331,7 +522,10 @@ class MainLayout(FloatLayout):
     
     # --- MODIFIED: Added new flag for focus fix ---
     popup_is_open = BooleanProperty(False)
+    pending_mood = StringProperty("")
 
+    # Used when there's no asset build (python build_assets.py), which
+    # replaces these with pre-scaled atlas entries of the repo's images
     base_image_path = os.path.expanduser("~/Documents/MiniProject/images")
     image_map = {
         "happy": os.path.join(base_image_path, "happy_plant.jpeg"),
@@ -344,54 +538,134 @@ class MainLayout(FloatLayout):
         "touched": os.path.join(base_image_path, "plant_touched.jpeg"),
         "neutral": os.path.join(base_image_path, "happy_plant.jpeg"),
     }
+
+    # Looping clips shown instead of the stills when they can be played
+    # (needs OpenCV); moods without a clip keep their image
+    base_video_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "videos")
+    video_map = {
+        "happy": os.path.join(base_video_path, "Plant_Swaying_Video_Generation.mp4"),
+        "thirsty": os.path.join(base_video_path, "Thirsty_Plant_Video_Generation.mp4"),
+        "sad": os.path.join(base_video_path, "Plant_Scared_of_the_Dark_Video.mp4"),
+        "low_light": os.path.join(base_video_path, "Plant_Scared_of_the_Dark_Video.mp4"),
+        "high_light": os.path.join(base_video_path, "Plant_Enjoys_Sun_In_Looping_Video.mp4"),
+        "smart": os.path.join(base_video_path, "Plant_Acting_Smart_Video_Generation.mp4"),
+        "touched": os.path.join(base_video_path, "Plant_Touched.mp4"),
+        "neutral": os.path.join(base_video_path, "Plant_Swaying_Video_Generation.mp4"),
+    }
+    VIDEO_EXTENSIONS = (".mp4", ".mkv", ".webm", ".avi")
     
     def on_kv_post(self, base_widget):
         print("UI is ready. Starting with default image.")
-        default_image = self.image_map.get('neutral', list(self.image_map.values())[0])
-        self.ids.video_screen_a.source = default_image
+        # Every mood image is decoded once and kept, so transitions don't
+        # hit the disk (the rest load over the next few frames)
+        self.textures = TextureCache()
+        atlas_map = atlas_image_map(Window.size)
+        if atlas_map:
+            self.image_map = atlas_map
+        # One instance of each popup, built the first time it's opened
+        self.popup_pool = {}
+        self.players = {
+            'a': VideoPlayer(self.ids.video_screen_a, on_failed=self._clip_failed),
+            'b': VideoPlayer(self.ids.video_screen_b, on_failed=self._clip_failed),
+        }
+        # Clip or image for every mood, worked out once instead of per transition
+        self.mood_sources = {mood: self._find_source(mood) for mood in self.image_map}
+        default_image = self._source_for('neutral')
+        if not (default_image.endswith(self.VIDEO_EXTENSIONS) and self.players['a'].play(default_image)):
+            default_image = self.image_map.get('neutral', list(self.image_map.values())[0])
+            texture = self.textures.get(default_image)
+            if texture is not None:
+                self.ids.video_screen_a.texture = texture
         self.current_image_path = default_image
+        self.textures.preload(self.image_map.values())
         self.setup_mqtt()
 
+    def _find_source(self, mood):
+        """The clip for a mood if it can be played, otherwise its image."""
+        video = self.video_map.get(mood)
+        if video and can_play(video):
+            return video
+        return self.image_map.get(mood, self.image_map["neutral"])
+
+    def _source_for(self, mood):
+        return self.mood_sources.get(mood, self.mood_sources["neutral"])
+
+    def _clip_failed(self, widget, path):
+        """A clip couldn't be decoded: show its mood's image and don't try it again."""
+        image = self.image_map["neutral"]
+        for mood, source in self.mood_sources.items():
+            if source == path:
+                image = self.image_map.get(mood, image)
+                self.mood_sources[mood] = image
+        texture = self.textures.get(image)
+        if texture is not None:
+            widget.texture = texture
+        if self.current_image_path == path:
+            self.current_image_path = image
+
     def setup_mqtt(self):
+        # Updates from the bus are collected here and applied once per frame
+        self.ui_state = UiStateStore()
+        # Recent readings for the Live Data charts (fixed size)
+        self.sensor_history = SensorHistory()
+        # Reads JSON and the binary formats; tells the agents which it takes
+        self.codec = WireCodec(CHAT_CLIENT_ID)
+
         def on_connect(client, userdata, flags, rc, properties=None):
             if rc == 0:
                 print("UI connected to MQTT Broker.")
-                client.subscribe(TOPIC_UI_UPDATE)
-                print(f"Subscribed to {TOPIC_UI_UPDATE}")
+                STARTUP.mark("mqtt_connected")
+                client.subscribe([(TOPIC_UI_UPDATE, 0), (TOPIC_UI_SENSORS, 0)])
+                print(f"Subscribed to {TOPIC_UI_UPDATE} and {TOPIC_UI_SENSORS}")
+                self.codec.announce(client)
             else:
                 print(f"Failed to connect, return code {rc}")
 
         def on_message(client, userdata, msg):
+            if self.codec.handle(msg):
+                return
             print(f"Received UI update on {msg.topic}")
             try:
-                data = json.loads(msg.payload.decode())
-                Clock.schedule_once(lambda dt: self.update_ui_visuals(data))
-            except json.JSONDecodeError:
-                print(f"Error: Received non-JSON message: {msg.payload}")
+                data = decode(msg.payload)
+                if self.ui_state.put(data):
+                    Clock.schedule_once(self.apply_ui_state)
+            except ValueError as e:
+                print(f"Error: Received unreadable message ({e}): {msg.payload}")
             except Exception as e:
                 print(f"Error processing message: {e}")
 
         self.mqtt_client = mqtt.Client(mqtt.CallbackAPIVersion.VERSION2, client_id=CLIENT_ID)
         self.mqtt_client.on_connect = on_connect
         self.mqtt_client.on_message = on_message
+        self.codec.attach(self.mqtt_client)
         try:
             self.mqtt_client.connect(BROKER_ADDRESS)
             self.mqtt_client.loop_start()
         except Exception as e:
             print(f"MQTT Connection Error: {e}. Check if broker is running.")
 
+    def apply_ui_state(self, dt):
+        """Shows everything that arrived since the last frame."""
+        state, chat = self.ui_state.take()
+        for data in chat:
+            self.update_ui_visuals(data)
+        if state:
+            self.update_ui_visuals(state)
+
     def update_with_live_data(self, *args):
         if self.live_data_popup:
             return
         print("--- 'Live Data' button pressed. Opening popup and sending request. ---")
         # --- MODIFIED: Set the focus flag ---
         self.popup_is_open = True
-        popup = LiveDataPopup()
-        popup.main_layout = self
+        popup = self._get_popup(LiveDataPopup)
+        popup.show_history(self.sensor_history)
         self.live_data_popup = popup
         popup.open()
         if self.mqtt_client and self.mqtt_client.is_connected():
-            self.mqtt_client.publish(TOPIC_SENSOR_REQUEST, "update_now")
+            # The request id comes back on plant/sensor/response with the latency
+            request = {"request_id": uuid.uuid4().hex}
+            self.mqtt_client.publish(TOPIC_SENSOR_REQUEST, json.dumps(request))
         else:
             print("MQTT not connected. Cannot request sensor data.")
 
@@ -400,56 +674,83 @@ class MainLayout(FloatLayout):
         
         mood = data.get("mood")
         speech_text = data.get("speech") # This is now just "chat_text"
-        moisture = data.get("moisture")
-        light = data.get("light")
-        temperature = data.get("temperature")
+        # Sensor values keep the names the sensors send them with
+        moisture = data.get("soil_perc")
+        light = data.get("lux")
+        temperature = data.get("temp")
         humidity = data.get("humidity")
 
         # --- Update Chat (from chat agent) ---
-        if speech_text:
+        if data.get("client_id", CHAT_CLIENT_ID) != CHAT_CLIENT_ID:
+            print("Ignoring a chat reply meant for another UI.")
+        elif "message_id" in data:
+            # A streamed reply: append the piece in place
+            if data.get("done"):
+                print(f"AI Chat Response (streamed): '{speech_text}'")
+            if self.ai_popup:
+                self.ai_popup.add_reply_chunk(data)
+        elif speech_text:
             print(f"AI Chat Response: '{speech_text}'")
             # --- MODIFIED: Check if popup exists before updating ---
             if self.ai_popup:
-                self.ai_popup.ids.chat_history.text += f"[color=00FF7F]PlantAI:[/color] {speech_text}\n"
+                self.ai_popup.waiting.discard(data.get("request_id"))
+                self.ai_popup.append_chat_line(f"[color=00FF7F]PlantAI:[/color] {speech_text}")
 
         # --- Update Mood/Image (from mood agent) ---
         # --- MODIFIED: Added check for popup_is_open ---
-        if mood and not self.popup_is_open:
+        # The mood agent only sends a mood when it changes, so one that
+        # arrives while a popup is open is kept and applied on close.
+        if mood and self.popup_is_open:
             print(f"AI Decision: Mood='{mood}' (Not updating image, popup is open)")
+            self.pending_mood = mood
         elif mood:
             print(f"AI Decision: Mood='{mood}'")
-            new_image_source = self.image_map.get(mood, self.image_map["neutral"])
-            print(f"Updating image to mood: {mood}")
-            self._transition_to_image(new_image_source)
+            self._show_mood(mood)
+
+        # --- Record the readings, even with the Live Data popup closed ---
+        recorded = self.sensor_history.add(data)
 
         # --- Update the Live Data Popup (if it's open) ---
-        if self.live_data_popup:
-            print("Live Data popup is open. Updating labels.")
-            popup_ids = self.live_data_popup.ids
-            if temperature is not None:
-                popup_ids.temp_label.text = f"Temperature: {temperature:.1f} °C"
-            if humidity is not None:
-                popup_ids.humidity_label.text = f"Humidity: {humidity:.1f} %"
-            if light is not None:
-                popup_ids.light_label.text = f"Ambient Light: {int(light)} lux"
-            if moisture is not None:
-                popup_ids.moisture_label.text = f"Soil Moisture: {int(moisture)} %"
+        if self.live_data_popup and recorded:
+            self.live_data_popup.set_labels(temperature, humidity, light, moisture)
+            self.live_data_popup.sync_charts()
                 
+    def _show_mood(self, mood):
+        self.pending_mood = ""
+        new_image_source = self._source_for(mood)
+        print(f"Updating image to mood: {mood}")
+        self._transition_to_image(new_image_source)
+
+    def on_popup_is_open(self, instance, is_open):
+        if not is_open and self.pending_mood:
+            self._show_mood(self.pending_mood)
+
     def _transition_to_image(self, new_source):
         if self.current_image_path == new_source:
             return
         print(f"Transition requested to: {new_source}")
-        if not os.path.exists(new_source):
-            print(f"ERROR: Failed to find image file: {new_source}")
+        inactive_screen_id = 'b' if self.active_screen_id == 'a' else 'a'
+        if new_source.endswith(self.VIDEO_EXTENSIONS):
+            # The clip plays on the hidden screen and fades in like an image
+            if self.players[inactive_screen_id].play(new_source):
+                self.current_image_path = new_source
+                Clock.schedule_once(self.start_transition)
+                return
+            new_source = self.image_map["neutral"]
+        self.players[inactive_screen_id].stop()
+        texture = self.textures.get(new_source)
+        if texture is None:
+            print(f"ERROR: Failed to load image file: {new_source}")
             new_source = self.image_map["neutral"]
-            if not os.path.exists(new_source):
-                print("ERROR: Could not find neutral image either. Aborting transition.")
+            texture = self.textures.get(new_source)
+            if texture is None:
+                print("ERROR: Could not load neutral image either. Aborting transition.")
                 return
         self.current_image_path = new_source
-        inactive_screen_id = 'b' if self.active_screen_id == 'a' else 'a'
         inactive_screen = getattr(self.ids, f'video_screen_{inactive_screen_id}')
-        inactive_screen.source = new_source
-        Clock.schedule_once(self.start_transition, 0.05)
+        inactive_screen.texture = texture
+        # The texture is ready, so the fade can start on the next frame
+        Clock.schedule_once(self.start_transition)
 
     def start_transition(self, dt):
         active_screen = getattr(self.ids, f'video_screen_{self.active_screen_id}')
@@ -461,6 +762,8 @@ class MainLayout(FloatLayout):
         Animation(opacity=1, duration=0.7).start(inactive_screen)
 
     def on_fade_out_complete(self, animation, faded_out_widget):
+        # The old clip is hidden now, stop decoding it
+        self.players[self.active_screen_id].stop()
         self.active_screen_id = 'b' if self.active_screen_id == 'a' else 'a'
         print(f"Fade complete. Active screen is now: video_screen_{self.active_screen_id}")
 
@@ -475,7 +778,7 @@ class MainLayout(FloatLayout):
             self.touch_revert_event = None
         if "touched" in self.image_map:
             print("Plant touched!")
-            touched_image_source = self.image_map['touched']
+            touched_image_source = self._source_for('touched')
             if self.current_image_path == touched_image_source:
                 return
             self.image_to_revert_to = self.current_image_path
@@ -487,7 +790,7 @@ class MainLayout(FloatLayout):
     def on_touch_effect_finished(self, dt):
         print("Touch effect finished. Reverting...")
         self.touch_revert_event = None
-        revert_target = self.image_to_revert_to if self.image_to_revert_to else self.image_map['neutral']
+        revert_target = self.image_to_revert_to if self.image_to_revert_to else self._source_for('neutral')
         self._transition_to_image(revert_target)
         self.image_to_revert_to = ""
 
@@ -497,8 +800,7 @@ class MainLayout(FloatLayout):
             return
         # --- MODIFIED: Set the focus flag ---
         self.popup_is_open = True
-        popup = PlantAiPopup()
-        popup.main_layout = self 
+        popup = self._get_popup(PlantAiPopup)
         self.ai_popup = popup
         popup.open()
         
@@ -506,23 +808,47 @@ class MainLayout(FloatLayout):
         print("Plant Info button pressed.")
         # --- MODIFIED: Set the focus flag ---
         self.popup_is_open = True
-        popup = PlantInfoPopup()
-        # --- MODIFIED: Pass main_layout to the info popup ---
-        popup.main_layout = self
+        popup = self._get_popup(PlantInfoPopup)
         popup.open()
+
+    def _get_popup(self, popup_class):
+        """The popup's single instance, built (and its KV loaded) on first use."""
+        popup = self.popup_pool.get(popup_class)
+        if popup is None:
+            load_popup_kv(popup_class.__name__)
+            popup = self.popup_pool[popup_class] = popup_class()
+            # --- MODIFIED: Pass main_layout to the popup ---
+            popup.main_layout = self
+        return popup
         
 class PlantApp(App):
     def build(self):
         self.main_layout = MainLayout()
+        STARTUP.mark("build")
+        Window.bind(on_flip=self.on_first_flip)
         return self.main_layout
 
+    def on_first_flip(self, window):
+        STARTUP.mark("first_frame")
+        window.unbind(on_flip=self.on_first_flip)
+
     def on_stop(self):
         print("Application is stopping. Cleaning up resources.")
+        print(f"(Texture cache): {self.main_layout.textures.format_stats()}")
+        print(f"(UI state): {self.main_layout.ui_state.format_stats()}")
+        for player in self.main_layout.players.values():
+            player.stop(wait=True)
+        print(f"(Video): {format_playback_stats()}")
+        ai_popup = self.main_layout.popup_pool.get(PlantAiPopup)
+        if ai_popup is not None:
+            ai_popup.history.close()
+        print(f"(Startup): {STARTUP.format_report()}")
         if self.main_layout.touch_revert_event:
             self.main_layout.touch_revert_event.cancel()
         
         if self.main_layout.mqtt_client:
             if self.main_layout.mqtt_client.is_connected():
+                self.main_layout.codec.withdraw(self.main_layout.mqtt_client)
                 self.main_layout.mqtt_client.loop_stop()
                 self.main_layout.mqtt_client.disconnect()
             else:
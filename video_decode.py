@@ -0,0 +1,296 @@
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+try:
+    import cv2
+except ImportError:
+    cv2 = None  # no video playback, the UI shows the still images instead
+
+# --- VIDEO SETTINGS ---
+DECODE_MAX_WIDTH = 480                     # frames are scaled down to this when decoded
+CLIP_CACHE_MAX_BYTES = 72 * 1024 * 1024    # clips smaller than this once decoded loop from memory
+# All clips kept in memory together. The mood clips are ~70 MB each at 480
+# px, so by default one stays cached: enough for the Pi's RAM, with the
+# others decoded again when shown. PLANT_FRAME_CACHE_MB raises it.
+FRAME_CACHE_BYTES = int(float(os.environ.get("PLANT_FRAME_CACHE_MB", "80")) * 1024 * 1024)
+STREAM_BUFFER_FRAMES = 12                  # decoded ahead for clips that are too long to keep
+# --- END VIDEO SETTINGS ---
+
+
+def can_play(path):
+    return cv2 is not None and os.path.exists(path)
+
+
+class PlaybackStats:
+    """Decode time, memory and frame counters shared by all players."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counters = {
+            "decoded": 0,      # frames decoded and converted
+            "skipped": 0,      # frames the decoder skipped to catch up
+            "shown": 0,
+            "dropped": 0,      # frames never shown because the UI fell behind
+            "late": 0,         # UI frames where the next video frame wasn't decoded yet
+            "clips_cached": 0,
+            "clips_shared": 0,   # plays that joined a first-pass decode already running
+            "clips_failed": 0,   # clips that couldn't be decoded at all
+            "decode_seconds": 0.0,
+            "max_decode_ms": 0.0,
+        }
+
+    def add(self, name, amount=1):
+        with self.lock:
+            self.counters[name] += amount
+
+    def add_decode(self, seconds):
+        with self.lock:
+            self.counters["decoded"] += 1
+            self.counters["decode_seconds"] += seconds
+            self.counters["max_decode_ms"] = max(self.counters["max_decode_ms"], seconds * 1000)
+
+    def format_stats(self, cache=None):
+        with self.lock:
+            stats = dict(self.counters)
+        decoded = stats["decoded"]
+        decode_seconds = stats.pop("decode_seconds")
+        stats["avg_decode_ms"] = round(decode_seconds / decoded * 1000, 2) if decoded else 0.0
+        stats["max_decode_ms"] = round(stats["max_decode_ms"], 2)
+        if cache is not None:
+            stats["cache_mb"] = round(cache.bytes / 2 ** 20, 1)
+        return ", ".join(f"{name}={value}" for name, value in stats.items())
+
+
+class FrameCache:
+    """
+    Fully decoded short clips, least recently used evicted past max_bytes.
+    Also knows which clips are being decoded for the first time, so a second
+    player of the same clip shares that decode instead of starting another.
+    """
+
+    def __init__(self, max_bytes=FRAME_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.clips = OrderedDict()  # path -> (frames, fps, size, bytes)
+        self.bytes = 0
+        self.decoding = {}          # path -> ClipSource on its first pass
+
+    def get(self, path):
+        with self.lock:
+            entry = self.clips.get(path)
+            if entry is not None:
+                self.clips.move_to_end(path)
+            return entry
+
+    def first_pass(self, path):
+        with self.lock:
+            return self.decoding.get(path)
+
+    def start_first_pass(self, path, source):
+        with self.lock:
+            self.decoding[path] = source
+
+    def end_first_pass(self, path, source):
+        with self.lock:
+            if self.decoding.get(path) is source:
+                del self.decoding[path]
+
+    def put(self, path, frames, fps, size):
+        nbytes = sum(len(frame) for frame in frames)
+        with self.lock:
+            self.clips[path] = (frames, fps, size, nbytes)
+            self.bytes += nbytes
+            while self.bytes > self.max_bytes and len(self.clips) > 1:
+                _, (_, _, _, evicted) = self.clips.popitem(last=False)
+                self.bytes -= evicted
+
+
+class ClipSource:
+    """
+    Decoded frames of one looping clip, as BGR bytes ready for a texture.
+
+    Clips that fit in CLIP_CACHE_MAX_BYTES are decoded once on a background
+    thread; the first pass plays as frames come in, and from then on every
+    loop (and every later play) comes from the FrameCache with no decoding.
+    A second source for a clip that is still on its first pass reads the
+    same frames, and the decode only stops once every source using it has
+    stopped. Longer clips are decoded on the fly into a small buffer and
+    rewound at the end.
+
+    frame_at(n) gives frame n of the endless loop (for streamed clips, the
+    newest decoded frame up to n), or None if there is nothing new to show.
+    Asking for a later frame than the decoder has reached makes it skip
+    frames to catch up instead of decoding every one. If not a single frame
+    could be decoded, `failed` is set and the player should show the still
+    image instead.
+    """
+
+    def __init__(self, path, cache, stats, max_width=DECODE_MAX_WIDTH):
+        self.path = path
+        self.cache = cache
+        self.stats = stats
+        self.cond = threading.Condition()
+        self.running = True
+        self.wanted = 0
+        self.thread = None
+        self.failed = False
+        self.leader = None   # the source whose first-pass decode this one shares
+        self.users = 1       # sources reading this one's decode, itself included
+        self.stopped = False
+
+        cached = cache.get(path)
+        if cached is not None:
+            self.frames, self.fps, self.size, _ = cached
+            self.complete = True
+            return
+
+        leader = cache.first_pass(path)
+        if leader is not None:
+            with leader.cond:
+                if leader.running:
+                    leader.users += 1
+                    self.leader = leader
+            if self.leader is not None:
+                self.frames, self.fps, self.size = leader.frames, leader.fps, leader.size
+                self.complete = False
+                stats.add("clips_shared")
+                return
+
+        if cv2 is None:
+            raise IOError("OpenCV (cv2) is not installed")
+        self.capture = cv2.VideoCapture(path)
+        if not self.capture.isOpened():
+            raise IOError(f"Could not open video {path}")
+        self.fps = self.capture.get(cv2.CAP_PROP_FPS) or 24.0
+        count = int(self.capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        width = int(self.capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(self.capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        scale = min(1.0, max_width / width) if width else 1.0
+        self.size = (int(width * scale), int(height * scale))
+        self.complete = False
+
+        if 0 < count * self.size[0] * self.size[1] * 3 <= CLIP_CACHE_MAX_BYTES:
+            self.frames = []
+            target = self._decode_all
+            cache.start_first_pass(path, self)
+        else:
+            self.frames = None
+            self.buffer = deque()  # (frame index, frame)
+            target = self._decode_stream
+        self.thread = threading.Thread(target=target, name="video-decode", daemon=True)
+        self.thread.start()
+
+    def _read(self):
+        """Decodes the next frame, scaled to self.size. None at the end (or on an error)."""
+        start = time.perf_counter()
+        try:
+            ok, frame = self.capture.read()
+        except cv2.error as e:
+            print(f"(Video): Decoding {os.path.basename(self.path)} failed: {e}")
+            return None
+        if not ok:
+            return None
+        if (frame.shape[1], frame.shape[0]) != self.size:
+            frame = cv2.resize(frame, self.size, interpolation=cv2.INTER_AREA)
+        data = frame.tobytes()
+        self.stats.add_decode(time.perf_counter() - start)
+        return data
+
+    def _decode_all(self):
+        while self.running:
+            data = self._read()
+            if data is None:
+                break
+            self.frames.append(data)
+        self.capture.release()
+        if self.running and self.frames:
+            self.cache.put(self.path, self.frames, self.fps, self.size)
+            self.complete = True
+            self.stats.add("clips_cached")
+            mb = len(self.frames) * len(self.frames[0]) / 2 ** 20
+            print(f"(Video): Cached {os.path.basename(self.path)}: {len(self.frames)} frames, {mb:.1f} MB")
+        elif self.running:
+            self._fail()
+        self.cache.end_first_pass(self.path, self)
+
+    def _decode_stream(self):
+        index = 0
+        decoded = False
+        while True:
+            with self.cond:
+                while self.running and len(self.buffer) >= STREAM_BUFFER_FRAMES:
+                    self.cond.wait()
+                if not self.running:
+                    break
+                wanted = self.wanted
+
+            if index < wanted:
+                # Behind the player: skip without converting the frame
+                if self.capture.grab():
+                    index += 1
+                    self.stats.add("skipped")
+                    continue
+                data = None
+            else:
+                data = self._read()
+
+            if data is None:
+                # End of the clip, start it over
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                if not decoded or not self.capture.grab():
+                    print(f"(Video): Could not rewind {self.path}")
+                    if not decoded:
+                        self._fail()
+                    break
+                self.capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                continue
+
+            with self.cond:
+                self.buffer.append((index, data))
+                self.cond.notify_all()
+            decoded = True
+            index += 1
+        self.capture.release()
+
+    def _fail(self):
+        self.failed = True
+        self.stats.add("clips_failed")
+        print(f"(Video): No frames could be decoded from {self.path}")
+
+    def frame_at(self, n):
+        frames = self.frames
+        if frames is not None:
+            source = self.leader or self
+            if source.complete:
+                return frames[n % len(frames)]
+            if source.failed:
+                self.failed = True
+            return frames[n] if n < len(frames) else None
+
+        # Streaming: the newest decoded frame that is due, older ones are dropped
+        frame = None
+        with self.cond:
+            self.wanted = n
+            while self.buffer and self.buffer[0][0] <= n:
+                frame = self.buffer.popleft()[1]
+            self.cond.notify_all()
+        return frame
+
+    def stop(self, wait=False):
+        """
+        Stops decoding, once no other source shares it. wait=True also waits
+        for the decoder thread (on exit).
+        """
+        if self.stopped:
+            return
+        self.stopped = True
+        source = self.leader or self
+        with source.cond:
+            source.users -= 1
+            if source.users <= 0:
+                source.running = False
+                source.cond.notify_all()
+        if wait and source.thread is not None and not source.running:
+            source.thread.join(timeout=1.0)
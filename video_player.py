@@ -0,0 +1,83 @@
+import time
+
+from kivy.clock import Clock
+from kivy.graphics.texture import Texture
+
+from video_decode import ClipSource, FrameCache, PlaybackStats
+
+# Shared by every player, so a clip decoded on one screen loops from memory
+# on the other too
+FRAME_CACHE = FrameCache()
+PLAYBACK_STATS = PlaybackStats()
+
+
+class VideoPlayer:
+    """
+    Plays a looping clip into an Image widget.
+
+    Runs on the Kivy clock: each frame it works out which video frame is due
+    from the time since play() and blits it into a texture that is reused
+    for the whole clip. If the UI falls behind, the frames in between are
+    skipped (and counted as dropped) rather than played late. If the clip
+    turns out to have no decodable frames, playback stops and
+    on_failed(widget, path) is called so a still image can be shown.
+    """
+
+    def __init__(self, image_widget, on_failed=None):
+        self.widget = image_widget
+        self.on_failed = on_failed
+        self.source = None
+        self.texture = None
+        self.event = None
+        self.shown = -1
+
+    def play(self, path):
+        """Starts looping path. Returns False if it can't be played."""
+        self.stop()
+        try:
+            self.source = ClipSource(path, FRAME_CACHE, PLAYBACK_STATS)
+        except IOError as e:
+            print(f"(Video): {e}")
+            return False
+        if self.texture is None or tuple(self.texture.size) != self.source.size:
+            self.texture = Texture.create(size=self.source.size, colorfmt="bgr")
+            self.texture.flip_vertical()  # decoded frames start with the top row
+        self.widget.texture = self.texture
+        self.start = time.perf_counter()
+        self.shown = -1
+        self._tick(0)
+        self.event = Clock.schedule_interval(self._tick, 0)
+        return True
+
+    def _tick(self, dt):
+        n = int((time.perf_counter() - self.start) * self.source.fps)
+        if n <= self.shown:
+            return
+        frame = self.source.frame_at(n)
+        if frame is None:
+            if self.source.failed:
+                path = self.source.path
+                self.stop()
+                if self.on_failed is not None:
+                    self.on_failed(self.widget, path)
+                return
+            PLAYBACK_STATS.add("late")
+            return
+        if n > self.shown + 1 and self.shown >= 0:
+            PLAYBACK_STATS.add("dropped", n - self.shown - 1)
+        self.texture.blit_buffer(frame, colorfmt="bgr", bufferfmt="ubyte")
+        self.widget.canvas.ask_update()
+        PLAYBACK_STATS.add("shown")
+        self.shown = n
+
+    def stop(self, wait=False):
+        if self.event is not None:
+            self.event.cancel()
+            self.event = None
+        if self.source is not None:
+            self.source.stop(wait)
+            self.source = None
+
+
+def format_playback_stats():
+    return PLAYBACK_STATS.format_stats(FRAME_CACHE)
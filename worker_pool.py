@@ -0,0 +1,144 @@
+import threading
+import time
+from collections import deque
+
+# How often maybe_report() prints the metrics (seconds)
+REPORT_INTERVAL = 300.0
+
+
+class KeyedWorkerPool:
+    """
+    A small fixed pool of worker threads fed by per-key queues.
+
+    Items for the same key (a plant, a chat client...) are handled one at a
+    time and in order; different keys run in parallel on up to `workers`
+    threads. submit() never blocks, so it is safe to call from paho's
+    network thread.
+
+    latest_only=True keeps a single slot per key: a newer item replaces one
+    that hasn't started yet and the stale one is counted as dropped.
+    Otherwise each key is a FIFO of at most max_pending items (None for no
+    limit) and submit() returns False when it is full.
+    """
+
+    def __init__(self, handler, workers=2, latest_only=True, max_pending=None, name="pool"):
+        self.handler = handler
+        self.latest_only = latest_only
+        self.max_pending = max_pending
+        self.name = name
+
+        self.cond = threading.Condition()
+        self.queues = {}      # key -> deque of waiting items
+        self.ready = deque()  # keys with waiting items and no worker on them
+        self.busy = set()     # keys a worker is handling right now
+        self.running = True
+
+        self.metrics = {
+            "submitted": 0,
+            "processed": 0,
+            "dropped": 0,
+            "rejected": 0,
+            "errors": 0,
+            "max_depth": 0,
+            "eval_seconds": 0.0,
+            "max_eval_seconds": 0.0,
+        }
+        self.depth = 0
+        self.last_report = time.monotonic()
+
+        self.threads = [
+            threading.Thread(target=self._worker, name=f"{name}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def submit(self, key, item):
+        """Queues item for key. Returns False if it was rejected."""
+        with self.cond:
+            if not self.running:
+                return False
+            self.metrics["submitted"] += 1
+            queue = self.queues.get(key)
+            if queue is None:
+                queue = self.queues[key] = deque()
+
+            if self.latest_only and queue:
+                queue[0] = item  # the stale reading is never evaluated
+                self.metrics["dropped"] += 1
+                return True
+            if self.max_pending is not None and len(queue) >= self.max_pending:
+                self.metrics["rejected"] += 1
+                return False
+
+            queue.append(item)
+            self.depth += 1
+            self.metrics["max_depth"] = max(self.metrics["max_depth"], self.depth)
+            if len(queue) == 1 and key not in self.busy:
+                self.ready.append(key)
+                self.cond.notify()
+            return True
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                while self.running and not self.ready:
+                    self.cond.wait()
+                if not self.ready:
+                    return  # shutting down and nothing left to do
+                key = self.ready.popleft()
+                item = self.queues[key].popleft()
+                self.depth -= 1
+                self.busy.add(key)
+
+            start = time.perf_counter()
+            try:
+                self.handler(key, item)
+            except Exception as e:
+                print(f"({self.name}): Error handling item for '{key}': {e}")
+                with self.cond:
+                    self.metrics["errors"] += 1
+            elapsed = time.perf_counter() - start
+
+            with self.cond:
+                self.busy.discard(key)
+                self.metrics["processed"] += 1
+                self.metrics["eval_seconds"] += elapsed
+                self.metrics["max_eval_seconds"] = max(self.metrics["max_eval_seconds"], elapsed)
+                if self.queues[key]:
+                    self.ready.append(key)
+                    self.cond.notify()
+                else:
+                    del self.queues[key]
+
+    def snapshot(self):
+        """Current metrics, with queue depth and average handler time."""
+        with self.cond:
+            stats = dict(self.metrics)
+            stats["depth"] = self.depth
+            stats["busy"] = len(self.busy)
+        processed = stats["processed"]
+        stats["avg_eval_ms"] = round(stats.pop("eval_seconds") / processed * 1000, 2) if processed else 0.0
+        stats["max_eval_ms"] = round(stats.pop("max_eval_seconds") * 1000, 2)
+        return stats
+
+    def format_metrics(self):
+        return ", ".join(f"{name}={value}" for name, value in self.snapshot().items())
+
+    def maybe_report(self, now=None):
+        """Prints the metrics every REPORT_INTERVAL. Returns True if it did."""
+        now = time.monotonic() if now is None else now
+        if now - self.last_report < REPORT_INTERVAL:
+            return False
+        self.last_report = now
+        print(f"({self.name}): {self.format_metrics()}")
+        return True
+
+    def shutdown(self, wait=True, timeout=5.0):
+        """Stops taking new items; workers finish what is already queued."""
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        if wait:
+            for thread in self.threads:
+                thread.join(timeout)